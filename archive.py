@@ -0,0 +1,367 @@
+"""지난 달 방문 기록을 연도별 SQLite 파일로 옮기는 보관(아카이브) 파티션
+
+    python manage.py archive --keep-months 12   # 12개월보다 오래된 마감 월을 보관
+    python manage.py verify-archive             # 보관 파일과 카탈로그 비교
+
+모든 방문이 퇴실 처리된 지난 달의 visitors/missed_checkouts 행을
+{archive_dir}/visitor_log_{연도}.db로 옮기고 hot DB에서 지운다. 어떤 연도가
+보관되어 있는지는 hot DB의 archive_partitions 테이블(카탈로그)에 있다.
+
+카탈로그를 바꿀 때마다 hot DB의 PRAGMA user_version을 올린다. 풀의 커넥션은 빌릴 때
+이 버전만 확인하고, 바뀌었을 때만 카탈로그를 다시 읽어 보관 파일을 읽기 전용으로
+ATTACH한다. 조회는 기간이 겹치는 연도만 UNION ALL로 묶어 읽는다. 일별 집계 테이블은
+hot DB에 남으므로 통계 API는 보관 후에도 그대로 hot DB만 읽는다.
+
+hot DB가 WAL 모드라 여러 파일에 걸친 트랜잭션은 원자적이지 않다. 그래서
+보관 파일에 먼저 복사해 커밋하고, 그다음 hot DB에서 카탈로그 갱신과 삭제를
+한 트랜잭션으로 처리한다. 중간에 실패하면 다시 실행하면 된다 (복사는 INSERT OR IGNORE).
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from datetime import date
+from urllib.parse import quote
+
+from rows import Visitor
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_PREFIX = 'archive_'
+DEFAULT_KEEP_MONTHS = 12  # hot DB에 남겨둘 최근 개월 수 (이번 달 포함하지 않음)
+
+# 행 객체(rows.py) 컬럼 순서의 SELECT 목록
+VISITOR_COLUMNS = Visitor.select()
+MISSED_CHECKOUT_COLUMNS = ', '.join([
+    'm.id', 'v.company', 'v.name', 'v.position', 'v.visit_location', 'v.check_in_time',
+    'm.original_date', 'm.checkout_date', 'm.reason'])
+MISSED_TABLE_COLUMNS = 'id, visitor_id, original_date, checkout_date, reason'
+
+# 보관 파일 스키마 (visitors 컬럼은 hot DB와 같은 순서, id는 hot DB의 id를 그대로 쓴다)
+ARCHIVE_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS {schema}.visitors (
+           id INTEGER PRIMARY KEY,
+           date TEXT NOT NULL,
+           company TEXT NOT NULL,
+           name TEXT NOT NULL,
+           position TEXT,
+           contact TEXT,
+           visit_location TEXT NOT NULL,
+           visit_purpose TEXT NOT NULL,
+           check_in_time TEXT NOT NULL,
+           check_out_time TEXT,
+           manager TEXT NOT NULL,
+           status TEXT,
+           duration_seconds INTEGER
+       )''',
+    '''CREATE TABLE IF NOT EXISTS {schema}.missed_checkouts (
+           id INTEGER PRIMARY KEY,
+           visitor_id INTEGER NOT NULL,
+           original_date TEXT NOT NULL,
+           checkout_date TEXT NOT NULL,
+           reason TEXT NOT NULL
+       )''',
+    'CREATE INDEX IF NOT EXISTS {schema}.idx_visitors_date_checkin ON visitors (date, check_in_time)',
+    '''CREATE INDEX IF NOT EXISTS {schema}.idx_visitors_company_duration
+       ON visitors (company, duration_seconds)''',
+    '''CREATE INDEX IF NOT EXISTS {schema}.idx_missed_checkouts_original_date
+       ON missed_checkouts (original_date)''',
+    'CREATE INDEX IF NOT EXISTS {schema}.idx_missed_checkouts_visitor ON missed_checkouts (visitor_id)',
+]
+
+
+def schema_name(year):
+    return f'{SCHEMA_PREFIX}{year}'
+
+
+def visitors_source(schemas):
+    """schemas의 visitors를 합친 FROM 절 (hot DB만이면 visitors 그대로)"""
+    if schemas == ['main']:
+        return 'visitors'
+    return '(' + ' UNION ALL '.join(f'SELECT {VISITOR_COLUMNS} FROM {schema}.visitors'
+                                    for schema in schemas) + ')'
+
+
+def missed_source(schemas):
+    """schemas의 퇴실 누락 기록(방문 기록과 조인)을 합친 FROM 절
+
+    결과 컬럼은 MissedCheckout 컬럼 이름 (id, company, ..., reason).
+    퇴실 누락 기록은 방문 기록과 같은 파일로 옮겨지므로 파일마다 따로 조인한다.
+    """
+    return '(' + ' UNION ALL '.join(f'''
+        SELECT {MISSED_CHECKOUT_COLUMNS}
+        FROM {schema}.missed_checkouts m
+        JOIN {schema}.visitors v ON m.visitor_id = v.id''' for schema in schemas) + ')'
+
+
+def archive_cutoff(today=None, keep_months=DEFAULT_KEEP_MONTHS):
+    """이번 달과 그 전 keep_months개월을 남기는 보관 기준일 (이 날짜 전까지 보관)"""
+    today = today or date.today()
+    months = today.year * 12 + today.month - 1 - keep_months
+    return date(months // 12, months % 12 + 1, 1).isoformat()
+
+
+class ArchiveCatalog:
+    """연도별 보관 파일 위치와 커넥션별 ATTACH 관리"""
+
+    def __init__(self, db_path, archive_dir=None):
+        self.archive_dir = archive_dir or os.environ.get('VISITAPP_ARCHIVE_DIR') \
+            or os.path.join(os.path.dirname(os.path.abspath(db_path)), 'archive')
+        self.prefix = os.path.splitext(os.path.basename(db_path))[0]
+        self._lock = threading.Lock()
+        self._version = None
+        self._partitions = {}
+
+    def filename(self, year):
+        return f'{self.prefix}_{year}.db'
+
+    def path(self, filename):
+        return os.path.join(self.archive_dir, filename)
+
+    def partitions(self, conn):
+        """{연도: 파일 이름} 카탈로그 (user_version이 바뀌었을 때만 다시 읽는다)"""
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        with self._lock:
+            if version != self._version:
+                self._partitions = dict(conn.execute('SELECT year, filename FROM archive_partitions'))
+                self._version = version
+            return version, self._partitions
+
+    def attach(self, conn):
+        """카탈로그에 있는 보관 파일을 conn에 읽기 전용으로 ATTACH (커넥션을 빌릴 때마다 호출)
+
+        다른 워커가 새 연도를 보관해도 다음에 커넥션을 빌릴 때 반영된다.
+        conn.archive_partitions에는 ATTACH에 성공한 연도만 남긴다.
+        """
+        version, partitions = self.partitions(conn)
+        if getattr(conn, 'archive_version', None) == version:
+            return
+        attached = dict(getattr(conn, 'archive_partitions', {}))
+        for year in [year for year in attached if partitions.get(year) != attached[year]]:
+            conn.execute(f'DETACH DATABASE {schema_name(year)}')
+            del attached[year]
+        for year in sorted(partitions.keys() - attached.keys()):
+            path = os.path.abspath(self.path(partitions[year]))
+            try:
+                _attach_readonly(conn, path, schema_name(year))
+            except sqlite3.DatabaseError as e:
+                # 그 연도만 조회 대상에서 빠지고 hot DB와 다른 연도 조회는 계속 된다
+                # (다시 시도는 카탈로그가 바뀔 때, 확인은 manage.py verify-archive)
+                logger.error("Cannot attach archive %s: %s", path, e)
+            else:
+                attached[year] = partitions[year]
+        conn.archive_partitions = attached
+        conn.archive_version = version
+
+    def missing(self, conn):
+        """카탈로그에 있지만 conn에 ATTACH되지 않은 연도 목록"""
+        _, partitions = self.partitions(conn)
+        attached = getattr(conn, 'archive_partitions', {})
+        return sorted(year for year in partitions if attached.get(year) != partitions[year])
+
+    def schemas(self, conn, start=None, end=None):
+        """[start, end) 방문일과 겹치는 스키마 목록 (hot DB인 main이 항상 처음)"""
+        years = sorted(getattr(conn, 'archive_partitions', {}))
+        return ['main'] + [schema_name(year) for year in years
+                           if (start is None or year >= int(start[:4]))
+                           and (end is None or f'{year}-01-01' < end)]
+
+
+def _attach_readonly(conn, path, schema):
+    """보관 파일을 읽기 전용으로 ATTACH (DB가 아니거나 테이블이 없으면 DETACH하고 DatabaseError)"""
+    conn.execute(f'ATTACH DATABASE ? AS {schema}', (f'file:{quote(path)}?mode=ro',))
+    try:
+        tables = {name for (name,) in conn.execute(
+            f"SELECT name FROM {schema}.sqlite_master WHERE type = 'table'")}
+        if not {'visitors', 'missed_checkouts'} <= tables:
+            raise sqlite3.DatabaseError('archive tables are missing')
+    except sqlite3.DatabaseError:
+        conn.execute(f'DETACH DATABASE {schema}')
+        raise
+
+
+def _plan(conn, before):
+    """before 전의 (연도, 월, 방문 수, 미퇴실 수) 목록"""
+    return conn.execute('''
+        SELECT substr(date, 1, 4), substr(date, 1, 7), COUNT(*), SUM(check_out_time IS NULL)
+        FROM main.visitors
+        WHERE date < ?
+        GROUP BY substr(date, 1, 7)
+        ORDER BY 2
+    ''', (before,)).fetchall()
+
+
+def _checksum(conn, schema):
+    digest = hashlib.sha1()
+    for table, columns in (('visitors', VISITOR_COLUMNS),
+                           ('missed_checkouts', MISSED_TABLE_COLUMNS)):
+        for row in conn.execute(f'SELECT {columns} FROM {schema}.{table} ORDER BY id'):
+            digest.update(repr(row).encode())
+    return digest.hexdigest()
+
+
+def _counts(conn, schema):
+    return tuple(conn.execute(f'''
+        SELECT (SELECT COUNT(*) FROM {schema}.visitors),
+               (SELECT COUNT(*) FROM {schema}.missed_checkouts)
+    ''').fetchone())
+
+
+def archive_months(db, before, dry_run=False):
+    """before(YYYY-MM-01) 전의 마감된 달을 연도별 보관 파일로 옮긴다
+
+    [(연도, 보관한 방문 수, 보관 파일 경로)]를 돌려준다. 미퇴실 방문이 남은 달이
+    있거나 이번 달 이후를 보관하려 하면 ValueError.
+    """
+    cutoff = date.fromisoformat(before)
+    if cutoff.day != 1 or cutoff > date.today().replace(day=1):
+        raise ValueError(f"before must be the first day of a month up to this month: {before}")
+
+    conn = sqlite3.connect(db.db_path, timeout=30)
+    try:
+        conn.execute('PRAGMA busy_timeout = 30000')
+        months = _plan(conn, before)
+        open_months = [month for _, month, _, open_count in months if open_count]
+        if open_months:
+            raise ValueError(f"Months with open visits cannot be archived: {', '.join(open_months)}")
+        years = sorted({year for year, _, _, _ in months})
+        if dry_run:
+            return [(int(year), sum(count for y, _, count, _ in months if y == year),
+                     db.archive.path(db.archive.filename(year))) for year in years]
+
+        known = {year for (year,) in conn.execute('SELECT year FROM archive_partitions')}
+        limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        if len(known | {int(year) for year in years}) > limit:
+            raise ValueError(f"SQLite can attach at most {limit} archive files")
+
+        os.makedirs(db.archive.archive_dir, exist_ok=True)
+        return [_archive_year(db, conn, int(year), before) for year in years]
+    finally:
+        conn.close()
+
+
+def _archive_year(db, conn, year, before):
+    start = f'{year}-01-01'
+    end = min(before, f'{year + 1}-01-01')
+    filename = db.archive.filename(year)
+    path = db.archive.path(filename)
+    conn.execute('ATTACH DATABASE ? AS dest', (path,))
+    try:
+        conn.execute('PRAGMA dest.journal_mode = DELETE')
+        for statement in ARCHIVE_SCHEMA:
+            conn.execute(statement.format(schema='dest'))
+
+        # 1) 보관 파일에 복사하고 커밋 (다시 실행해도 같은 행은 건너뜀)
+        conn.execute('BEGIN')
+        conn.execute(f'''
+            INSERT OR IGNORE INTO dest.visitors ({VISITOR_COLUMNS})
+            SELECT {VISITOR_COLUMNS} FROM main.visitors WHERE date >= ? AND date < ?
+        ''', (start, end))
+        conn.execute(f'''
+            INSERT OR IGNORE INTO dest.missed_checkouts ({MISSED_TABLE_COLUMNS})
+            SELECT m.id, m.visitor_id, m.original_date, m.checkout_date, m.reason
+            FROM main.missed_checkouts m
+            JOIN main.visitors v ON m.visitor_id = v.id
+            WHERE v.date >= ? AND v.date < ?
+        ''', (start, end))
+        conn.commit()
+        visitor_count, missed_count = _counts(conn, 'dest')
+        checksum = _checksum(conn, 'dest')
+
+        # 2) hot DB: 모두 복사됐는지 확인한 뒤 카탈로그 갱신과 삭제를 한 트랜잭션으로
+        conn.execute('BEGIN IMMEDIATE')
+        missing = conn.execute('''
+            SELECT COUNT(*) FROM main.visitors v
+            WHERE v.date >= ? AND v.date < ?
+            AND NOT EXISTS (SELECT 1 FROM dest.visitors d WHERE d.id = v.id)
+        ''', (start, end)).fetchone()[0]
+        if missing:
+            conn.rollback()
+            raise sqlite3.DatabaseError(f"{missing} visits were not copied to {path}")
+        conn.execute('''
+            DELETE FROM main.missed_checkouts
+            WHERE visitor_id IN (SELECT id FROM main.visitors WHERE date >= ? AND date < ?)
+        ''', (start, end))
+        moved = conn.execute('DELETE FROM main.visitors WHERE date >= ? AND date < ?',
+                             (start, end)).rowcount
+        conn.execute('''
+            INSERT INTO archive_partitions
+                (year, filename, archived_until, visitor_count, missed_count, checksum, archived_at)
+            VALUES (?, ?, ?, ?, ?, ?, datetime('now', 'localtime'))
+            ON CONFLICT (year) DO UPDATE SET
+                filename = excluded.filename,
+                archived_until = MAX(archived_until, excluded.archived_until),
+                visitor_count = excluded.visitor_count,
+                missed_count = excluded.missed_count,
+                checksum = excluded.checksum,
+                archived_at = excluded.archived_at
+        ''', (year, filename, end, visitor_count, missed_count, checksum))
+        # 카탈로그 버전: 커넥션들이 다음에 빌려질 때 카탈로그를 다시 읽는다
+        version = conn.execute('PRAGMA main.user_version').fetchone()[0]
+        conn.execute(f'PRAGMA main.user_version = {version + 1}')
+        conn.commit()
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.execute('DETACH DATABASE dest')
+    logger.info("Archived %d visits before %s into %s", moved, end, path)
+    return year, moved, path
+
+
+def verify(db):
+    """카탈로그와 보관 파일을 비교해 문제 목록 [(연도, 설명)]을 돌려준다"""
+    problems = []
+    with db.connection() as conn:
+        partitions = conn.execute('''
+            SELECT year, filename, archived_until, visitor_count, missed_count, checksum
+            FROM archive_partitions ORDER BY year
+        ''').fetchall()
+        for year, filename, archived_until, visitor_count, missed_count, checksum in partitions:
+            path = db.archive.path(filename)
+            schema = schema_name(year)
+            if not os.path.exists(path):
+                problems.append((year, f'보관 파일 없음: {path}'))
+                continue
+            if conn.archive_partitions.get(year) != filename:
+                problems.append((year, f'ATTACH 실패: {path}'))
+                continue
+            result = conn.execute(f'PRAGMA {schema}.quick_check').fetchone()[0]
+            if result != 'ok':
+                problems.append((year, f'파일 손상: {result}'))
+                continue
+            counts = _counts(conn, schema)
+            if counts != (visitor_count, missed_count):
+                problems.append((year, f'행 수 불일치: 카탈로그 {(visitor_count, missed_count)}, '
+                                       f'파일 {counts}'))
+            if _checksum(conn, schema) != checksum:
+                problems.append((year, '체크섬 불일치'))
+            outside = conn.execute(f'''
+                SELECT COUNT(*) FROM {schema}.visitors WHERE date < ? OR date >= ?
+            ''', (f'{year}-01-01', archived_until)).fetchone()[0]
+            if outside:
+                problems.append((year, f'보관 범위 밖의 방문 {outside}건'))
+            left = conn.execute('''
+                SELECT COUNT(*) FROM main.visitors WHERE date >= ? AND date < ?
+            ''', (f'{year}-01-01', archived_until)).fetchone()[0]
+            if left:
+                problems.append((year, f'hot DB에 남은 보관 대상 방문 {left}건'))
+            duplicated = conn.execute(f'''
+                SELECT COUNT(*) FROM {schema}.visitors a JOIN main.visitors v ON v.id = a.id
+            ''').fetchone()[0]
+            if duplicated:
+                problems.append((year, f'hot DB와 id가 겹치는 방문 {duplicated}건'))
+            orphaned = conn.execute(f'''
+                SELECT COUNT(*) FROM {schema}.missed_checkouts m
+                WHERE NOT EXISTS (SELECT 1 FROM {schema}.visitors v WHERE v.id = m.visitor_id)
+            ''').fetchone()[0]
+            if orphaned:
+                problems.append((year, f'방문 기록이 없는 퇴실 누락 기록 {orphaned}건'))
+    return problems
+
+
+def vacuum(db):
+    """보관 후 hot DB 파일 크기를 줄인다 (쓰기를 잠시 막음)"""
+    with db.connection() as conn:
+        conn.execute('VACUUM main')
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
@@ -0,0 +1,140 @@
+"""ASGI 진입점: SSE는 이벤트 루프에서 직접 처리하고 나머지 요청은 스레드 풀에서 Flask로 전달
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+WSGI 서버(gunicorn 동기 워커 등)로 /api/sse를 서비스하면 대시보드 연결마다
+스레드 하나가 묶이지만, 여기서는 모든 SSE 연결이 하나의 이벤트 루프를 공유한다.
+
+asgiref의 WsgiToAsgi는 모든 WSGI 요청을 한 스레드(thread_sensitive=True)에서
+차례로 실행하므로 내보내기 하나가 다른 요청을 모두 막는다. 대신 Flask 요청은
+VISITAPP_ASGI_THREADS개(기본 16) 스레드 풀에서 동시에 처리한다.
+"""
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+from main import app as flask_app, hub
+
+SSE_PATHS = ('/api/sse', '/visit/api/sse')
+DEFAULT_ASGI_THREADS = 16
+BODY_SPOOL_SIZE = 1024 * 1024  # 이보다 큰 요청 본문은 임시 파일로
+
+
+def wsgi_environ(scope, body):
+    """ASGI HTTP scope를 WSGI environ으로 변환 (PEP 3333)"""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf8').decode('latin1'),
+        'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = scope['client'][0], str(scope['client'][1])
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        environ[name] = environ[name] + ',' + value if name in environ else value
+    return environ
+
+
+class ThreadPoolWSGI:
+    """WSGI 앱을 스레드 풀에서 실행하는 ASGI 어댑터
+
+    응답 청크는 이벤트 루프로 넘겨 보내고, 응답이 끝나거나 중간에 실패하면
+    이터러블의 close()를 불러 스트리밍 내보내기가 빌린 DB 커넥션을 반납하게 한다.
+    """
+
+    def __init__(self, wsgi_app, threads=DEFAULT_ASGI_THREADS):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='asgi-wsgi')
+
+    async def __call__(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        body = SpooledTemporaryFile(max_size=BODY_SPOOL_SIZE)
+        try:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body.write(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+
+            def send_sync(message):
+                asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+            await loop.run_in_executor(self.executor, self.run_wsgi, scope, body, send_sync)
+        finally:
+            body.close()
+
+    def run_wsgi(self, scope, body, send):
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['start'] = {
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin1'), value.encode('latin1'))
+                            for name, value in headers],
+            }
+
+        def send_start():
+            if not response.get('sent'):
+                send(response['start'])
+                response['sent'] = True
+
+        result = self.wsgi_app(wsgi_environ(scope, body), start_response)
+        try:
+            for chunk in result:
+                if chunk:
+                    send_start()
+                    send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            send_start()
+            send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+wsgi_app = ThreadPoolWSGI(flask_app, int(os.environ.get('VISITAPP_ASGI_THREADS', DEFAULT_ASGI_THREADS)))
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await asyncio.get_running_loop().run_in_executor(None, wsgi_app.shutdown)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+    elif scope['type'] == 'http' and scope['path'] in SSE_PATHS:
+        await hub.serve_asgi(scope, receive, send)
+    elif scope['type'] == 'http':
+        await wsgi_app(scope, receive, send)
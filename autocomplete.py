@@ -0,0 +1,254 @@
+"""담당자/방문자 히스토리 자동 완성용 메모리 인덱스
+
+부분 문자열과 한글 초성(예: 'ㄱㅌㄱ' → '김태건')을 함께 찾는다. 글자를 초성으로
+접은 문자열의 1·2글자 n-gram 역색인으로 후보를 좁힌 뒤 실제 일치 여부를 확인하고,
+앞부분 일치, 선택(방문) 횟수, 최근 방문일 순으로 정렬한다.
+"""
+import heapq
+import threading
+from collections import defaultdict
+
+from rows import Manager, VisitorHistory
+
+CHOSUNG = 'ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ'
+_CHOSUNG_SET = frozenset(CHOSUNG)
+_HANGUL_START, _HANGUL_END = ord('가'), ord('힣')
+RANKED_SCAN_THRESHOLD = 256  # 후보가 이보다 많으면 전체 순위 목록을 훑는다
+
+
+def fold_char(c):
+    """한글 음절은 초성으로, 나머지는 소문자로"""
+    code = ord(c)
+    if _HANGUL_START <= code <= _HANGUL_END:
+        return CHOSUNG[(code - _HANGUL_START) // 588]
+    return c.lower()
+
+
+def fold(text):
+    return ''.join(fold_char(c) for c in text if not c.isspace())
+
+
+def _grams(text):
+    """1글자와 2글자 n-gram"""
+    return set(text) | {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def _query_grams(query):
+    # 2글자 이상이면 2글자 n-gram만 (교집합이 더 작다)
+    if len(query) == 1:
+        return {query}
+    return {query[i:i + 2] for i in range(len(query) - 1)}
+
+
+def _char_matches(q, c):
+    # 초성만 입력한 글자는 같은 초성의 음절과 일치
+    return q == c or (q in _CHOSUNG_SET and fold_char(c) == q)
+
+
+def match_position(query, text):
+    """query가 text 안에서 일치하는 첫 위치 (없으면 -1)"""
+    for start in range(len(text) - len(query) + 1):
+        if all(_char_matches(q, text[start + i]) for i, q in enumerate(query)):
+            return start
+    return -1
+
+
+def _normalize(text):
+    return ''.join(c.lower() for c in text if not c.isspace())
+
+
+class Entry:
+    __slots__ = ('key', 'text', 'folded', 'payload', 'count', 'recency')
+
+    def __init__(self, key, text, payload, count, recency):
+        self.key = key
+        self.text = _normalize(text)
+        self.folded = fold(text)
+        self.payload = payload
+        self.count = count
+        self.recency = recency
+
+    def rank(self):
+        # 선택 횟수가 많고 최근에 방문한 순
+        return (-self.count, -int(self.recency.replace('-', '') or 0))
+
+    def index_keys(self):
+        """원문/초성 n-gram과 앞 1·2글자 (검색어 종류에 따라 골라 쓴다)"""
+        keys = {('raw', gram) for gram in _grams(self.text)}
+        keys |= {('fold', gram) for gram in _grams(self.folded)}
+        keys |= {('raw^', self.text[:n]) for n in (1, 2)}
+        keys |= {('fold^', self.folded[:n]) for n in (1, 2)}
+        return keys
+
+
+class AutocompleteIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._postings = defaultdict(set)
+        self._ranked = None  # 순위순 키 목록 (변경되면 다음 검색 때 다시 정렬)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def put(self, key, text, payload, count=0, recency=''):
+        entry = Entry(key, text, payload, count, recency)
+        with self._lock:
+            old = self._entries.get(key)
+            if old is not None and old.text != entry.text:
+                self._unindex(old)
+            self._entries[key] = entry
+            self._ranked = None
+            for index_key in entry.index_keys():
+                self._postings[index_key].add(key)
+        return entry
+
+    def _unindex(self, entry):
+        for index_key in entry.index_keys():
+            keys = self._postings.get(index_key)
+            if keys is not None:
+                keys.discard(entry.key)
+                if not keys:
+                    del self._postings[index_key]
+
+    def remove(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._unindex(entry)
+                self._ranked = None
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        return entry.payload if entry else None
+
+    def count(self, key):
+        entry = self._entries.get(key)
+        return entry.count if entry else 0
+
+    def bump(self, key, amount=1):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.count += amount
+                self._ranked = None
+
+    def _candidates(self, query):
+        """(앞부분 일치 후보, 나머지 후보, 대조 필요 여부)"""
+        chosung = [c in _CHOSUNG_SET for c in query]
+        kind = 'fold' if any(chosung) else 'raw'
+        grams_of = fold(query) if kind == 'fold' else query
+        postings = [self._postings.get((kind, gram), ()) for gram in _query_grams(grams_of)]
+        if kind == 'fold':
+            # '이ㅈ'처럼 섞어 입력하면 완성된 글자로도 좁힌다
+            postings += [self._postings.get(('raw', c), ()) for c, is_chosung
+                         in zip(query, chosung) if not is_chosung]
+        postings.sort(key=len)
+        candidates = set(postings[0]).intersection(*postings[1:])
+        prefix = candidates & self._postings.get((kind + '^', grams_of[:2]), set())
+        # 2글자 이하 원문/초성만 입력한 검색어는 n-gram 일치가 곧 일치
+        exact = len(query) <= 2 and (kind == 'raw' or all(chosung))
+        return prefix, candidates - prefix, not exact
+
+    def _ranked_keys(self):
+        if self._ranked is None:
+            self._ranked = sorted(self._entries, key=lambda key: self._entries[key].rank())
+        return self._ranked
+
+    def _top(self, keys, limit, accept):
+        """keys 중 accept를 통과한 상위 limit개"""
+        if len(keys) > RANKED_SCAN_THRESHOLD:
+            # 후보가 많으면 전체 순위 목록을 앞에서부터 훑는 편이 정렬보다 빠르다
+            top = []
+            for key in self._ranked_keys():
+                if key in keys and accept(self._entries[key]):
+                    top.append(self._entries[key])
+                    if len(top) >= limit:
+                        break
+            return top
+        entries = (self._entries[key] for key in keys)
+        return heapq.nsmallest(limit, (entry for entry in entries if accept(entry)),
+                               key=Entry.rank)
+
+    def search(self, query, limit=10, where=None):
+        """query와 일치하는 payload 목록 (where(payload)로 추가 필터)
+
+        앞부분이 일치하는 항목이 먼저 오고, 같은 그룹 안에서는 선택 횟수와 최근 방문일 순.
+        """
+        query = _normalize(query)
+
+        def accepts(is_prefix, verify):
+            def accept(entry):
+                if where is not None and not where(entry.payload):
+                    return False
+                if verify:
+                    # 혼합 입력이나 3글자 이상 검색어는 후보를 실제로 대조
+                    position = match_position(query, entry.text)
+                    return position == 0 if is_prefix else position > 0
+                return True
+            return accept
+
+        with self._lock:
+            if not query:
+                # 빈 검색어는 전체를 순위대로
+                groups = [(self._entries.keys(), accepts(False, False))]
+            else:
+                prefix, rest, verify = self._candidates(query)
+                groups = [(prefix, accepts(True, verify)), (rest | prefix if verify else rest,
+                                                            accepts(False, verify))]
+            results = []
+            for keys, accept in groups:
+                results.extend(self._top(keys, limit - len(results), accept))
+                if len(results) >= limit:
+                    break
+            return [entry.payload for entry in results]
+
+
+class Autocomplete:
+    """담당자 검색과 방문자 히스토리 조회를 메모리 인덱스로 처리
+
+    시작할 때 DB에서 한 번 읽고, 이후에는 입실 이벤트(다른 워커 포함)로 갱신한다.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.managers = AutocompleteIndex()
+        self.history = AutocompleteIndex()
+        self.reload()
+
+    def reload(self):
+        managers = AutocompleteIndex()
+        manager_keys = defaultdict(list)  # 선택 횟수는 이름 기준으로 올라간다
+        for manager_id, name, position, department, selection_count in self.db.get_manager_entries():
+            managers.put(manager_id, name, Manager(name, position, department),
+                         count=selection_count)
+            manager_keys[name].append(manager_id)
+
+        history = AutocompleteIndex()
+        for company, name, position, contact, last_visit_date, visit_count \
+                in self.db.get_visitor_history_entries():
+            history.put((company, name), name, VisitorHistory(company, name, position, contact),
+                        count=visit_count, recency=last_visit_date)
+        self.managers, self.history, self._manager_keys = managers, history, manager_keys
+
+    def search_managers(self, query, limit=20):
+        return self.managers.search(query, limit)
+
+    def suggest_visitors(self, query, company=None, limit=10):
+        where = (lambda payload: payload.company == company) if company else None
+        return self.history.search(query, limit, where)
+
+    def visitor_history(self, company, name):
+        """VisitorHistory 행 또는 None"""
+        return self.history.get((company, name))
+
+    def record_visit(self, visitor):
+        """입실 이벤트의 방문자(dict)로 히스토리와 담당자 선택 횟수를 갱신"""
+        visit_date, company, name, position, contact, manager = (
+            visitor['date'], visitor['company'], visitor['name'], visitor['position'],
+            visitor['contact'], visitor['manager'])
+        key = (company, name)
+        self.history.put(key, name, VisitorHistory(company, name, position, contact),
+                         count=self.history.count(key) + 1, recency=visit_date)
+        for manager_id in self._manager_keys.get(manager, ()):
+            self.managers.bump(manager_id)
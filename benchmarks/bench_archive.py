@@ -0,0 +1,66 @@
+"""보관(아카이브) 전후 비교: hot DB 크기, VACUUM 시간, 조회 시간
+
+합성 데이터를 넣고 최근 --keep-months개월만 hot DB에 남긴 뒤
+오늘 방문자, 이번 달, 보관된 날짜, 전체 기간 조회를 보관 전과 비교한다.
+
+    python benchmarks/bench_archive.py --rows 200000 --years 3
+"""
+import argparse
+import os
+from datetime import date
+
+from common import measure, seed_visitors, temp_db
+
+import archive
+from db import month_range
+
+
+def file_size(path):
+    return sum(os.path.getsize(path + suffix) for suffix in ('', '-wal')
+               if os.path.exists(path + suffix))
+
+
+def queries(db, old_day):
+    today = date.today()
+    return {
+        'current visitors': db.get_current_visitors,
+        'this month': lambda: db.get_visitors_in_range(*month_range(today.year, today.month)),
+        'archived day': lambda: db.get_visitors_by_date(old_day),
+        'all (export)': lambda: sum(1 for _ in db.iter_visitors_in_range('0000-01-01', '9999-12-31')),
+    }
+
+
+def snapshot(db, old_day, repeat):
+    vacuum_ms = measure(lambda: archive.vacuum(db), 1)
+    timings = {name: measure(fn, repeat) for name, fn in queries(db, old_day).items()}
+    return file_size(db.db_path), vacuum_ms, timings
+
+
+def run(row_count, years, keep_months, repeat):
+    db = temp_db()
+    seed_visitors(db, row_count, days=years * 365)
+    with db.connection() as conn:
+        old_day = conn.execute('SELECT MIN(date) FROM visitors').fetchone()[0]
+
+    before = snapshot(db, old_day, repeat)
+    results = archive.archive_months(db, archive.archive_cutoff(keep_months=keep_months))
+    after = snapshot(db, old_day, repeat)
+    moved = sum(count for _, count, _ in results)
+
+    print(f"rows: {row_count:,}, archived: {moved:,} into {len(results)} files")
+    print(f"{'':<18}{'before':>12}{'after':>12}")
+    print(f"{'hot DB (MiB)':<18}{before[0] / 2**20:>12.1f}{after[0] / 2**20:>12.1f}")
+    print(f"{'VACUUM (ms)':<18}{before[1]:>12.1f}{after[1]:>12.1f}")
+    for name in before[2]:
+        print(f"{name + ' (ms)':<18}{before[2][name]:>12.2f}{after[2][name]:>12.2f}")
+    db.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--keep-months', type=int, default=archive.DEFAULT_KEEP_MONTHS)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    run(args.rows, args.years, args.keep_months, args.repeat)
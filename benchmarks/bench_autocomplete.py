@@ -0,0 +1,71 @@
+"""방문자 히스토리 자동 완성: LIKE '%q%' 조회와 메모리 n-gram/초성 인덱스 비교
+
+    python benchmarks/bench_autocomplete.py --entries 50000
+"""
+import argparse
+import random
+import time
+
+from common import GIVEN_NAMES, POSITIONS, SURNAMES, company_names, measure, temp_db
+
+from autocomplete import Autocomplete
+
+QUERIES = ['김', '민수', 'ㄱㅁ', '이ㅈ', 'ㅂㅅㅂ', '정태']
+
+
+def seed_history(db, entries, seed=42):
+    rng = random.Random(seed)
+    companies = company_names(200)
+    with db.connection() as conn:
+        # 같은 (업체, 이름)은 한 행이므로 다시 나오면 재방문으로 센다
+        conn.executemany('''
+            INSERT INTO visitor_history (company, name, position, contact, last_visit_date)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (company, name) DO UPDATE SET
+                visit_count = visit_count + 1,
+                last_visit_date = MAX(last_visit_date, excluded.last_visit_date)
+        ''', [(rng.choice(companies), rng.choice(SURNAMES) + rng.choice(GIVEN_NAMES),
+               rng.choice(POSITIONS), f'010-{i:04d}',
+               f'2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}')
+              for i in range(entries)])
+        conn.commit()
+
+
+def run(entries, repeat):
+    db = temp_db()
+    seed_history(db, entries)
+    start = time.perf_counter()
+    autocomplete = Autocomplete(db)
+    build = (time.perf_counter() - start) * 1000
+
+    def like(query):
+        with db.connection() as conn:
+            return conn.execute('''
+                SELECT company, name, position, contact FROM visitor_history
+                WHERE name LIKE ? ORDER BY last_visit_date DESC LIMIT 10
+            ''', (f'%{query}%',)).fetchall()
+
+    print(f"\n## {entries:,} history rows ({len(autocomplete.history):,} unique), "
+          f"index build {build:.0f} ms")
+    print(f"{'query':<10}{'LIKE (ms)':>12}{'index (ms)':>12}{'results':>10}")
+    for query in QUERIES:
+        # LIKE는 초성 검색을 못 하므로 초성 검색어는 결과가 0건
+        like_ms = measure(lambda: like(query), repeat)
+        index_ms = measure(lambda: autocomplete.suggest_visitors(query), repeat)
+        print(f"{query:<10}{like_ms:>12.3f}{index_ms:>12.3f}"
+              f"{len(autocomplete.suggest_visitors(query)):>10}")
+
+    company, name = db.get_visitor_history_entries()[0][:2]
+    lookup_sql = measure(lambda: db.get_visitor_history(company, name), repeat)
+    lookup_index = measure(lambda: autocomplete.visitor_history(company, name), repeat)
+    print(f"{'exact':<10}{lookup_sql:>12.3f}{lookup_index:>12.3f}")
+    db.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, nargs='+', default=[50000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    for entries in args.entries:
+        run(entries, args.repeat)
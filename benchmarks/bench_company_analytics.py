@@ -0,0 +1,118 @@
+"""업체별 통계 쿼리: 기존 상관 서브쿼리 방식과 단일 패스/일별 집계 방식 비교
+
+    python benchmarks/bench_company_analytics.py --rows 1000000
+"""
+import argparse
+import time
+from datetime import datetime
+
+from common import seed_visitors, temp_db
+
+# 상관 서브쿼리 3개로 업체마다 visitors를 다시 스캔하던 기존 쿼리
+LEGACY_SQL = '''
+    SELECT 
+        company,
+        COUNT(*) as visit_count,
+        SUM(CASE WHEN date = ? AND check_out_time IS NULL THEN 1 ELSE 0 END) as current_visitors,
+        SUM(CASE 
+            WHEN check_out_time IS NOT NULL 
+            AND status = 'NORMAL'
+            THEN (
+                strftime('%s', date || ' ' || check_out_time) - 
+                strftime('%s', date || ' ' || check_in_time)
+            )
+            ELSE 0 
+        END) as total_duration,
+        (
+            SELECT name 
+            FROM visitors v2 
+            WHERE v2.company = v1.company 
+            AND v2.check_out_time IS NOT NULL
+            AND v2.status = 'NORMAL'
+            ORDER BY (
+                strftime('%s', v2.date || ' ' || v2.check_out_time) - 
+                strftime('%s', v2.date || ' ' || v2.check_in_time)
+            ) DESC LIMIT 1
+        ) as longest_visitor_name,
+        (
+            SELECT position 
+            FROM visitors v2 
+            WHERE v2.company = v1.company 
+            AND v2.check_out_time IS NOT NULL
+            AND v2.status = 'NORMAL'
+            ORDER BY (
+                strftime('%s', v2.date || ' ' || v2.check_out_time) - 
+                strftime('%s', v2.date || ' ' || v2.check_in_time)
+            ) DESC LIMIT 1
+        ) as longest_visitor_position,
+        (
+            SELECT MAX(
+                strftime('%s', date || ' ' || check_out_time) - 
+                strftime('%s', date || ' ' || check_in_time)
+            )
+            FROM visitors v2 
+            WHERE v2.company = v1.company 
+            AND v2.check_out_time IS NOT NULL
+            AND v2.status = 'NORMAL'
+        ) as longest_duration
+    FROM visitors v1
+    GROUP BY company
+    ORDER BY visit_count DESC
+'''
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def compare(legacy, current):
+    """업체별로 결과를 비교해 다른 행 목록을 돌려준다
+
+    기존 쿼리는 최장 체류시간이 같은 방문자 중 누구를 고를지 정해져 있지 않으므로
+    이름/직급은 최장 체류시간이 없는 경우에만 비교한다.
+    """
+    legacy = {row[0]: row for row in legacy}
+    current = {row[0]: row for row in current}
+    mismatches = []
+    for company in sorted(legacy.keys() | current.keys()):
+        old, new = legacy.get(company), current.get(company)
+        if old is None or new is None or old[:4] != new[:4] or old[6] != new[6] \
+                or (old[6] is None and old[4:6] != new[4:6]):
+            mismatches.append((company, old, new))
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--companies', type=int, default=50)
+    args = parser.parse_args()
+
+    db = temp_db()
+    seed_visitors(db, args.rows, companies=args.companies)
+    today = datetime.now().strftime('%Y-%m-%d')
+
+    with db.connection() as conn:
+        conn.execute('ANALYZE')
+        legacy, legacy_ms = timed(lambda: conn.execute(LEGACY_SQL, (today,)).fetchall())
+    current, current_ms = timed(db.get_company_analytics_raw)
+    rollup, rollup_ms = timed(db.get_company_analytics)
+
+    mismatches = compare(legacy, current)
+    print(f"rows={args.rows:,} companies={args.companies}")
+    print(f"legacy (correlated subqueries): {legacy_ms:10.1f} ms")
+    print(f"single pass (CTE + index join): {current_ms:10.1f} ms")
+    print(f"daily rollup tables           : {rollup_ms:10.1f} ms")
+    print(f"speedup: {legacy_ms / max(current_ms, 1e-6):.1f}x (single pass), "
+          f"{legacy_ms / max(rollup_ms, 1e-6):.1f}x (rollup)")
+    print(f"result rows: {len(current)}, mismatches: {len(mismatches)}, "
+          f"rollup mismatches: {len(compare(legacy, rollup))}")
+    for company, old, new in mismatches[:10]:
+        print(f"  {company}: legacy={old} new={new}")
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""여러 워커 프로세스가 같은 DB로 입실 처리를 하면서 서로의 SSE 이벤트를 모두 받는지 확인
+
+    python benchmarks/bench_event_bus.py --workers 4 --events 200
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import queue
+import statistics
+import threading
+import time
+
+from common import temp_db
+
+from db import VisitorDB
+from events import EventHub, SQLiteBackend
+
+
+def worker(index, db_path, workers, events, poll_interval, barrier, results):
+    db = VisitorDB(db_path, checkpoint_interval=0)
+    expected = workers * events
+    hub = EventHub(SQLiteBackend(db, poll_interval=poll_interval), client_buffer=expected)
+    subscription = hub.subscribe()
+    latencies = {'local': [], 'remote': []}
+
+    def consume():
+        deadline = time.time() + 60
+        received = 0
+        while received < expected and time.time() < deadline:
+            try:
+                event = subscription.queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            received += 1
+            kind = 'local' if event.data['worker'] == index else 'remote'
+            latencies[kind].append((time.time() - event.data['sent']) * 1000)
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    barrier.wait()
+    for i in range(events):
+        with contextlib.redirect_stdout(io.StringIO()):  # check_in의 디버그 출력 숨김
+            visitor = db.check_in('BUSCO', f'워커{index}-{i}', '사원', '010', '1층 로비',
+                                  '미팅/회의', '김태건')
+        hub.publish('checkin', {'visitor': visitor, 'worker': index, 'sent': time.time()})
+    consumer.join()
+    hub.close()
+    db.close()
+    results.put((index, latencies))
+
+
+def percentile(values, q):
+    return values[min(int(len(values) * q), len(values) - 1)] if values else float('nan')
+
+
+def run(workers, events, poll_interval):
+    db = temp_db()
+    db_path = db.db_path
+    db.close()
+
+    ctx = multiprocessing.get_context('spawn')
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    processes = [ctx.Process(target=worker, args=(i, db_path, workers, events, poll_interval,
+                                                  barrier, results))
+                 for i in range(workers)]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    collected = [results.get(timeout=120) for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+
+    expected = workers * events
+    print(f"workers={workers} events/worker={events} poll={poll_interval}s "
+          f"elapsed={elapsed:.2f}s")
+    for index, latencies in sorted(collected):
+        received = len(latencies['local']) + len(latencies['remote'])
+        status = 'OK' if received == expected else 'MISSING'
+        print(f"  worker {index}: {received}/{expected} {status}")
+    for kind in ('local', 'remote'):
+        values = sorted(v for _, latencies in collected for v in latencies[kind])
+        print(f"{kind:<7} latency ms: p50={statistics.median(values):.1f} "
+              f"p95={percentile(values, 0.95):.1f} max={values[-1]:.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--events', type=int, default=200)
+    parser.add_argument('--poll-interval', type=float, default=0.1)
+    args = parser.parse_args()
+    run(args.workers, args.events, args.poll_interval)
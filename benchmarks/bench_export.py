@@ -0,0 +1,152 @@
+"""월별 내보내기: 기존 메모리 워크북, write-only XLSX(ExportJobs), CSV/NDJSON 스트리밍의 시간/최대 RSS 비교
+
+    python benchmarks/bench_export.py --rows 100000
+
+모드마다 별도 프로세스에서 실행해 ru_maxrss(최대 RSS)를 따로 잰다.
+"""
+import argparse
+import json
+import resource
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+from io import BytesIO
+
+from common import seed_visitors, temp_db
+
+from db import VisitorDB, month_range
+from exports import ExportJobs, iter_gzip, stream_rows
+
+
+def legacy_export(db, year, month):
+    """변경 전 export_excel: 셀마다 Alignment를 만들고 전체 워크북을 BytesIO에 저장"""
+    from openpyxl import Workbook
+    from openpyxl.styles import Alignment, Font, PatternFill
+    from openpyxl.utils import get_column_letter
+
+    def adjust_column_width(worksheet):
+        for column in worksheet.columns:
+            max_length = 0
+            column_letter = get_column_letter(column[0].column)
+            for cell in column:
+                if len(str(cell.value)) > max_length:
+                    max_length = len(str(cell.value))
+                korean_char_count = sum(1 for c in str(cell.value) if ord('가') <= ord(c) <= ord('힣'))
+                max_length += korean_char_count * 0.5
+            worksheet.column_dimensions[column_letter].width = max(max_length + 2, 10)
+
+    visitors = db.get_visitors_by_month(year, month)
+    missed_checkouts = db.get_missed_checkouts_by_month(year, month)
+    wb = Workbook()
+    ws1 = wb.active
+    ws1.title = "방문 기록"
+    header_font = Font(bold=True)
+    header_fill = PatternFill(start_color="CCE5FF", end_color="CCE5FF", fill_type="solid")
+    headers = ['날짜', '업체명', '성명', '직급', '연락처', '방문장소',
+               '방문목적', '입실시간', '퇴실시간', '담당자', '상태']
+    for col, header in enumerate(headers, 1):
+        cell = ws1.cell(row=1, column=col, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = Alignment(horizontal='center')
+    for row, v in enumerate(visitors, 2):
+        v = v.values()
+        status = '정상' if v[9] else '미퇴실'
+        data = [v[1], v[2], v[3], v[4], v[5], v[6], v[7], v[8], v[9] or '-', v[10], status]
+        for col, value in enumerate(data, 1):
+            cell = ws1.cell(row=row, column=col, value=value)
+            cell.alignment = Alignment(horizontal='center')
+    adjust_column_width(ws1)
+    ws2 = wb.create_sheet(title="퇴실 누락 기록")
+    missed_headers = ['날짜', '업체명', '성명', '직급', '방문장소', '입실시간', '처리일자', '처리사유']
+    for col, header in enumerate(missed_headers, 1):
+        cell = ws2.cell(row=1, column=col, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = Alignment(horizontal='center')
+    for row, m in enumerate(missed_checkouts, 2):
+        m = m.values()
+        data = [m[6], m[1], m[2], m[3], m[4], m[5], m[7], m[8]]
+        for col, value in enumerate(data, 1):
+            cell = ws2.cell(row=row, column=col, value=value)
+            cell.alignment = Alignment(horizontal='center')
+    adjust_column_width(ws2)
+    excel_file = BytesIO()
+    wb.save(excel_file)
+    return len(excel_file.getvalue())
+
+
+def streaming_export(db, year, month):
+    """앱의 /api/export/<year>/<month>와 같이 ExportJobs로 파일을 만들고 내려받는다"""
+    start, end = month_range(year, month)
+    jobs = ExportJobs(db, tempfile.mkdtemp(prefix='visitapp-export-'), workers=1)
+    path = jobs.export(start, end)
+    jobs.shutdown()
+    with open(path, 'rb') as fileobj:
+        # send_file처럼 나눠 읽는다
+        size = 0
+        while chunk := fileobj.read(64 * 1024):
+            size += len(chunk)
+        return size
+
+
+def text_export(fmt, gzip=False):
+    def export(db, year, month):
+        start, end = month_range(year, month)
+        chunks = stream_rows(db, 'visitors', fmt, start, end)
+        if gzip:
+            return sum(len(chunk) for chunk in iter_gzip(chunks))
+        return sum(len(chunk.encode() if isinstance(chunk, str) else chunk) for chunk in chunks)
+    return export
+
+
+MODES = {'legacy': legacy_export, 'streaming': streaming_export,
+         'csv': text_export('csv'), 'ndjson.gz': text_export('ndjson', gzip=True),
+         'baseline': None}
+
+
+def child(mode, db_path, year, month):
+    db = VisitorDB(db_path, checkpoint_interval=0)
+    start = time.perf_counter()
+    size = MODES[mode](db, year, month) if MODES[mode] else 0
+    elapsed = time.perf_counter() - start
+    db.close()
+    print(json.dumps({'seconds': elapsed, 'bytes': size,
+                      'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+
+
+def run(rows):
+    today = date.today()
+    db = temp_db()
+    # 모든 행이 이번 달에 들어가도록 기간을 이번 달로 제한
+    seed_visitors(db, rows, days=today.day, end=today)
+    db_path = db.db_path
+    db.close()
+
+    print(f"\n## {rows:,} rows in {today.year}-{today.month:02d}")
+    print(f"{'mode':<12}{'time (s)':>10}{'max RSS (MB)':>15}{'size (KB)':>12}")
+    for mode in MODES:
+        output = subprocess.run([sys.executable, __file__, '--child', mode, '--db', db_path,
+                                 '--year', str(today.year), '--month', str(today.month)],
+                                check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:<12}{result['seconds']:>10.2f}{result['max_rss_mb']:>15.1f}"
+              f"{result['bytes'] / 1024:>12.0f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000])
+    parser.add_argument('--child', choices=MODES)
+    parser.add_argument('--db')
+    parser.add_argument('--year', type=int)
+    parser.add_argument('--month', type=int)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.db, args.year, args.month)
+    else:
+        for rows in args.rows:
+            run(rows)
@@ -0,0 +1,67 @@
+"""인덱스 유무에 따른 주요 조회 쿼리 지연 시간 비교
+
+    python benchmarks/bench_indexes.py --rows 100000 1000000
+"""
+import argparse
+from datetime import date, timedelta
+
+from common import measure, seed_visitors, temp_db
+
+from db import MIGRATIONS
+
+INDEX_NAMES = ['idx_visitors_date_checkin', 'idx_visitors_open', 'idx_visitors_company_duration',
+               'idx_missed_checkouts_original_date', 'idx_missed_checkouts_visitor']
+
+
+def hot_queries(today):
+    yesterday = (today - timedelta(days=1)).strftime('%Y-%m-%d')
+    today = today.strftime('%Y-%m-%d')
+    month_start = today[:8] + '01'
+    return {
+        '날짜별 방문 기록': ('SELECT * FROM visitors WHERE date = ? ORDER BY check_in_time DESC',
+                       (today,)),
+        '이중 입실 체크': ('''SELECT id FROM visitors WHERE date = ? AND company = ? AND name = ?
+                         AND position = ? AND check_out_time IS NULL''',
+                     (today, 'PIXEL', '김민수', '과장')),
+        '전날 미퇴실자': ('SELECT id, date FROM visitors WHERE date = ? AND check_out_time IS NULL',
+                    (yesterday,)),
+        '업체별 방문 수': ('SELECT COUNT(*) FROM visitors WHERE company = ?', ('PIXEL',)),
+        '월별 퇴실 누락': ('''SELECT m.id FROM missed_checkouts m JOIN visitors v ON m.visitor_id = v.id
+                         WHERE m.original_date >= ? AND m.original_date <= ?''',
+                     (month_start, today)),
+    }
+
+
+def run(rows, repeat):
+    db = temp_db()
+    seed_visitors(db, rows)
+    queries = hot_queries(date.today())
+
+    def timings():
+        with db.connection() as conn:
+            conn.execute('ANALYZE')
+            return {label: measure(lambda: conn.execute(sql, params).fetchall(), repeat)
+                    for label, (sql, params) in queries.items()}
+
+    indexed = timings()
+    with db.connection() as conn:
+        for name in INDEX_NAMES:
+            conn.execute(f'DROP INDEX IF EXISTS {name}')
+        conn.commit()
+    full_scan = timings()
+    db.close()
+
+    print(f"\n## {rows:,} rows (schema version {MIGRATIONS[-1][0]})")
+    print(f"{'query':<20}{'no index (ms)':>15}{'indexed (ms)':>15}{'speedup':>10}")
+    for label in queries:
+        before, after = full_scan[label], indexed[label]
+        print(f"{label:<20}{before:>15.3f}{after:>15.3f}{before / max(after, 1e-6):>9.1f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    for rows in args.rows:
+        run(rows, args.repeat)
@@ -0,0 +1,87 @@
+"""JSON 인코더 비교: 표준 json(dict), rows.dumps(행 객체), orjson(설치된 경우)
+
+실제 응답 모양으로 잰다.
+- month: 한 달치 방문 기록 (Visitor 행 목록)
+- analytics: /api/analytics/companies 배열
+- sse: 입실 이벤트 하나를 연결 수만큼 보낼 때 (연결마다 인코딩 vs Event.encode 캐시)
+
+    python benchmarks/bench_json.py --rows 100000 --clients 200
+"""
+import argparse
+import json
+from datetime import date
+
+from common import measure, seed_visitors, temp_db
+
+import rows
+from db import month_range
+from events import Event
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def encoders():
+    result = {
+        'json (dict)': lambda data: json.dumps(_plain(data), ensure_ascii=False,
+                                               separators=(',', ':')).encode(),
+        'rows.dumps': lambda data: rows.dumps(data, ensure_ascii=False).encode(),
+    }
+    if orjson is not None:
+        result['orjson'] = lambda data: orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return result
+
+
+def _plain(data):
+    # 행 객체를 쓰기 전처럼 dict로 바꿔 표준 json에 넘긴다
+    if isinstance(data, list) and data and isinstance(data[0], rows.Row):
+        return [row.to_dict() for row in data]
+    return data
+
+
+def sse_fanout(payload, clients, encode):
+    """연결마다 인코딩 (이벤트 객체 없이)"""
+    for _ in range(clients):
+        b'id: 1\nevent: checkin\ndata: %s\n\n' % encode(payload)
+
+
+def sse_cached(payload, clients):
+    event = Event(1, 'checkin', payload)
+    for _ in range(clients):
+        event.encode()
+
+
+def run(row_count, clients, repeat):
+    db = temp_db()
+    seed_visitors(db, row_count, days=365)
+    today = date.today()
+    month = db.get_visitors_in_range(*month_range(today.year, today.month))
+    shapes = {
+        'month': month,
+        'analytics': db.get_company_analytics(),
+    }
+    print(f"rows: {row_count:,}, month rows: {len(month):,}, SSE clients: {clients}")
+    print(f"{'shape':<12}{'encoder':<14}{'ms':>10}{'KiB':>10}")
+    for shape, data in shapes.items():
+        for name, encode in encoders().items():
+            elapsed = measure(lambda: encode(data), repeat)
+            print(f"{shape:<12}{name:<14}{elapsed:>10.2f}{len(encode(data)) / 1024:>10,.1f}")
+
+    payload = month[0].to_dict()
+    for name, encode in encoders().items():
+        elapsed = measure(lambda: sse_fanout(payload, clients, encode), repeat)
+        print(f"{'sse':<12}{name:<14}{elapsed:>10.2f}")
+    elapsed = measure(lambda: sse_cached(payload, clients), repeat)
+    print(f"{'sse':<12}{'Event cache':<14}{elapsed:>10.2f}")
+    db.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    run(args.rows, args.clients, args.repeat)
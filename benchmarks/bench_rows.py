@@ -0,0 +1,78 @@
+"""방문 기록 행 표현 비교: 위치 튜플 / dict / __slots__ 행 객체
+
+같은 SELECT 결과를 세 가지 row_factory로 읽어 조회 시간, 할당 메모리(tracemalloc 최대치),
+JSON 직렬화 시간과 크기를 비교한다. 'row (to_dict)'는 행 객체를 dict로 바꿔 표준
+json으로 인코딩하는 경우 (rows.dumps 템플릿 인코더를 쓰지 않을 때의 응답 경로)다.
+직렬화는 모두 응답과 같은 공백 없는 형식이다.
+
+    python benchmarks/bench_rows.py --rows 10000
+"""
+import argparse
+import json
+import sqlite3
+import tracemalloc
+
+from common import measure, seed_visitors, temp_db
+
+import rows
+from rows import Visitor
+
+QUERY = f'SELECT {Visitor.select()} FROM visitors ORDER BY date DESC, check_in_time DESC'
+
+
+def dict_factory(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+def compact(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+# 이름 -> (row_factory, 직렬화 함수)
+VARIANTS = {
+    'tuple': (None, compact),
+    'dict': (dict_factory, compact),
+    'row (to_dict)': (Visitor.from_row, lambda data: compact([row.to_dict() for row in data])),
+    'row': (Visitor.from_row, lambda data: rows.dumps(data, ensure_ascii=False)),
+}
+
+
+def fetch(conn, row_factory):
+    cursor = conn.cursor()
+    cursor.row_factory = row_factory
+    return cursor.execute(QUERY).fetchall()
+
+
+def peak_allocation(conn, row_factory):
+    tracemalloc.start()
+    data = fetch(conn, row_factory)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return data, peak
+
+
+def run(row_count, repeat):
+    db = temp_db()
+    seed_visitors(db, row_count)
+    conn = sqlite3.connect(db.db_path)
+
+    print(f"rows: {row_count:,}")
+    print(f"{'variant':<15}{'fetch (ms)':>12}{'peak (KiB)':>12}{'dumps (ms)':>12}{'total (ms)':>12}"
+          f"{'size (KiB)':>12}")
+    for name, (row_factory, dump) in VARIANTS.items():
+        fetch_ms = measure(lambda: fetch(conn, row_factory), repeat)
+        data, peak = peak_allocation(conn, row_factory)
+        dumps_ms = measure(lambda: dump(data), repeat)
+        size = len(dump(data).encode())
+        print(f"{name:<15}{fetch_ms:>12.2f}{peak / 1024:>12,.0f}{dumps_ms:>12.2f}"
+              f"{fetch_ms + dumps_ms:>12.2f}{size / 1024:>12,.0f}")
+    conn.close()
+    db.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
@@ -0,0 +1,97 @@
+"""하나의 이벤트 루프에서 수백 개의 ASGI SSE 연결에 이벤트를 전달하는 부하 테스트
+
+    python benchmarks/bench_sse_hub.py --clients 500 --events 200
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import threading
+import time
+
+import common  # noqa: F401  (저장소 루트를 sys.path에 추가)
+
+from events import EventHub
+
+
+class FakeClient:
+    """ASGI receive/send를 흉내 내며 받은 이벤트의 전달 지연을 기록"""
+
+    def __init__(self, hub, delay=0.0):
+        self.hub = hub
+        self.delay = delay
+        self.latencies = []
+        self.received = 0
+        self.closed = False
+        self.disconnect = asyncio.Event()
+
+    async def receive(self):
+        await self.disconnect.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message['type'] != 'http.response.body':
+            return
+        if not message.get('more_body', False):
+            self.closed = True
+            return
+        for line in message['body'].decode().splitlines():
+            if line.startswith('data: {"sent":'):
+                self.received += 1
+                self.latencies.append(time.perf_counter() - json.loads(line[6:])['sent'])
+        if self.delay:
+            await asyncio.sleep(self.delay)
+
+    async def run(self):
+        scope = {'type': 'http', 'path': '/api/sse', 'headers': [], 'query_string': b''}
+        await self.hub.serve_asgi(scope, self.receive, self.send)
+
+
+def publish(hub, events, interval):
+    for _ in range(events):
+        hub.publish('company_added', {'sent': time.perf_counter()})
+        time.sleep(interval)
+
+
+async def run(clients, events, interval, slow):
+    hub = EventHub(client_buffer=50, heartbeat=5.0)
+    fast = [FakeClient(hub) for _ in range(clients)]
+    laggards = [FakeClient(hub, delay=1.0) for _ in range(slow)]
+    tasks = [asyncio.ensure_future(c.run()) for c in fast + laggards]
+    while hub.subscriber_count() < len(tasks):
+        await asyncio.sleep(0.01)
+    threads_before = threading.active_count()
+
+    start = time.perf_counter()
+    publisher = threading.Thread(target=publish, args=(hub, events, interval))
+    publisher.start()
+    await asyncio.get_running_loop().run_in_executor(None, publisher.join)
+    # 버퍼를 넘겨 끊긴 연결은 더 기다리지 않는다
+    while any(c.received < events and not c.closed for c in fast):
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    evicted_fast = sum(c.closed for c in fast)
+    evicted_slow = sum(c.closed for c in laggards)
+
+    for client in fast + laggards:
+        client.disconnect.set()
+    await asyncio.wait_for(asyncio.gather(*tasks), 10)
+
+    latencies = sorted(l * 1000 for c in fast for l in c.latencies)
+    print(f"clients={clients} (+{slow} slow) events={events} elapsed={elapsed:.2f}s")
+    print(f"threads during stream: {threads_before}")
+    print(f"delivered: {sum(c.received for c in fast):,} / {clients * events:,}")
+    print(f"latency ms: p50={statistics.median(latencies):.2f} "
+          f"p95={latencies[int(len(latencies) * 0.95)]:.2f} max={latencies[-1]:.2f}")
+    print(f"evicted: slow {evicted_slow} / {slow}, fast {evicted_fast} / {clients}, "
+          f"subscribers after disconnect: {hub.subscriber_count()}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=500)
+    parser.add_argument('--events', type=int, default=200)
+    parser.add_argument('--interval', type=float, default=0.02)
+    parser.add_argument('--slow', type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.clients, args.events, args.interval, args.slow))
@@ -0,0 +1,84 @@
+"""방문자 히스토리: 예전 INSERT OR REPLACE(유니크 키 없음)와 (company, name) upsert 비교
+
+방문이 늘어날 때 테이블 크기와 조회 시간이 어떻게 변하는지 본다.
+
+    python benchmarks/bench_visitor_history.py --visits 10000 100000 500000
+"""
+import argparse
+import random
+import time
+
+from common import GIVEN_NAMES, POSITIONS, SURNAMES, company_names, measure, temp_db
+
+from db import VISITOR_HISTORY_UPSERT_SQL
+
+LEGACY_SCHEMA = '''
+    CREATE TABLE legacy_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        company TEXT NOT NULL,
+        name TEXT NOT NULL,
+        position TEXT,
+        contact TEXT,
+        last_visit_date TEXT NOT NULL
+    )
+'''
+LEGACY_INSERT = '''
+    INSERT OR REPLACE INTO legacy_history (company, name, position, contact, last_visit_date)
+    VALUES (?, ?, ?, ?, ?)
+'''
+LEGACY_LOOKUP = '''
+    SELECT position, contact FROM legacy_history
+    WHERE company = ? AND name = ?
+    ORDER BY last_visit_date DESC LIMIT 1
+'''
+LOOKUP = 'SELECT position, contact FROM visitor_history WHERE company = ? AND name = ?'
+
+
+def visits(count, people, seed=42):
+    rng = random.Random(seed)
+    companies = company_names(100)
+    population = [(rng.choice(companies), rng.choice(SURNAMES) + rng.choice(GIVEN_NAMES))
+                  for _ in range(people)]
+    for i in range(count):
+        company, name = rng.choice(population)
+        yield company, name, rng.choice(POSITIONS), f'010-{i % 10000:04d}', f'2024-01-{i % 28 + 1:02d}'
+
+
+def run(visit_counts, people, repeat):
+    db = temp_db()
+    with db.connection() as conn:
+        conn.execute(LEGACY_SCHEMA)
+        conn.commit()
+
+    print(f"population: {people:,} people")
+    print(f"{'visits':>10}{'legacy rows':>14}{'rows':>10}{'legacy ins/s':>14}{'ins/s':>10}"
+          f"{'legacy lookup (ms)':>20}{'lookup (ms)':>13}")
+    done = 0
+    probe = None
+    for total in visit_counts:
+        batch = list(visits(total, people))[done:]
+        probe = probe or batch[0][:2]
+        with db.connection() as conn:
+            timings = []
+            for sql in (LEGACY_INSERT, VISITOR_HISTORY_UPSERT_SQL):
+                start = time.perf_counter()
+                conn.executemany(sql, batch)
+                conn.commit()
+                timings.append(len(batch) / (time.perf_counter() - start))
+            legacy_rows = conn.execute('SELECT COUNT(*) FROM legacy_history').fetchone()[0]
+            rows = conn.execute('SELECT COUNT(*) FROM visitor_history').fetchone()[0]
+            legacy_ms = measure(lambda: conn.execute(LEGACY_LOOKUP, probe).fetchone(), repeat)
+            lookup_ms = measure(lambda: conn.execute(LOOKUP, probe).fetchone(), repeat)
+        done = total
+        print(f"{total:>10,}{legacy_rows:>14,}{rows:>10,}{timings[0]:>14,.0f}{timings[1]:>10,.0f}"
+              f"{legacy_ms:>20.3f}{lookup_ms:>13.3f}")
+    db.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--visits', type=int, nargs='+', default=[10000, 100000, 500000])
+    parser.add_argument('--people', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    run(sorted(args.visits), args.people, args.repeat)
@@ -0,0 +1,110 @@
+"""벤치마크 공용 도구: 임시 DB 생성, 합성 데이터 시딩, 시간 측정"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from db import VisitorDB, duration_sql  # noqa: E402
+
+SURNAMES = '김이박최정강조윤장임한오서신권황안송류홍'
+GIVEN_NAMES = ['민수', '지훈', '서연', '현우', '지민', '수빈', '태호', '은지', '동현',
+               '하늘', '성민', '유진', '재원', '다은', '승현', '예린', '준호', '소희']
+POSITIONS = ['사원', '주임', '계장', '대리', '과장', '팀장', '차장', '이사', '상무']
+LOCATIONS = ['1층 현장', '2층 현장', '1층 로비', '1층 회의실', '2층 회의실']
+PURPOSES = ['미팅/회의', '현장 점검', '현장 방문', '설비 점검', '설비 셋업']
+MANAGERS = ['김태건', '정태훈', '천을수', '김찬우', '한동권', '이성민', '여상덕', '이슬기',
+            '정운교', '조현석', '김정수']
+
+
+def temp_db(**kwargs):
+    path = os.path.join(tempfile.mkdtemp(prefix='visitapp-bench-'), 'visitor_log.db')
+    kwargs.setdefault('checkpoint_interval', 0)
+    return VisitorDB(path, **kwargs)
+
+
+def company_names(count):
+    base = ['PIXEL', 'GENESEM', 'DAEDUCK', 'KCC', 'LGIT', 'KINSUS', 'ATI']
+    return (base + [f'업체{i:03d}' for i in range(count)])[:count]
+
+
+def _clock(seconds):
+    return f'{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}'
+
+
+def generate_visitors(rows, days=3 * 365, companies=50, missed_ratio=0.02,
+                      seed=42, end=None):
+    """(date, company, name, position, contact, location, purpose,
+    check_in, check_out, manager, status) 튜플을 날짜 오름차순으로 생성"""
+    rng = random.Random(seed)
+    end = end or date.today()
+    company_list = company_names(companies)
+    people = [(rng.choice(company_list), rng.choice(SURNAMES) + rng.choice(GIVEN_NAMES),
+               rng.choice(POSITIONS)) for _ in range(max(rows // 20, 50))]
+    per_day = max(rows // days, 1)
+
+    produced = 0
+    day = end - timedelta(days=days - 1)
+    while produced < rows:
+        visit_date = day.strftime('%Y-%m-%d')
+        for _ in range(min(per_day, rows - produced)):
+            company, name, position = rng.choice(people)
+            check_in = rng.randint(8 * 3600, 17 * 3600)
+            check_out = min(check_in + rng.randint(300, 8 * 3600), 86399)
+            status = 'MISSED' if rng.random() < missed_ratio else 'NORMAL'
+            yield (visit_date, company, name, position, f'010-{rng.randint(0, 9999):04d}',
+                   rng.choice(LOCATIONS), rng.choice(PURPOSES), _clock(check_in),
+                   _clock(check_out), rng.choice(MANAGERS), status)
+            produced += 1
+        day = min(day + timedelta(days=1), end)
+
+
+def seed_visitors(db, rows, batch_size=10000, **kwargs):
+    """합성 방문 기록을 직접 INSERT (퇴실 누락 건은 missed_checkouts에도 기록)"""
+    batch = []
+    with db.connection() as conn:
+        cursor = conn.cursor()
+
+        def flush():
+            for row in batch:
+                cursor.execute('''
+                    INSERT INTO visitors (date, company, name, position, contact,
+                                          visit_location, visit_purpose, check_in_time,
+                                          check_out_time, manager, status)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', row)
+                if row[10] == 'MISSED':
+                    cursor.execute('''
+                        INSERT INTO missed_checkouts (visitor_id, original_date, checkout_date, reason)
+                        VALUES (?, ?, ?, '자동 퇴실 처리 (자정)')
+                    ''', (cursor.lastrowid, row[0], row[0]))
+            batch.clear()
+
+        for row in generate_visitors(rows, **kwargs):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+        # 퇴실 시 기록되는 체류시간도 채워둔다
+        cursor.execute(f'''
+            UPDATE visitors SET duration_seconds = {duration_sql()}
+            WHERE check_out_time IS NOT NULL AND status = 'NORMAL'
+        ''')
+        conn.commit()
+    db.rebuild_rollups()
+
+
+def measure(fn, repeat=5):
+    """fn을 repeat번 실행한 실행 시간(ms)의 중앙값"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
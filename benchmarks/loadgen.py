@@ -0,0 +1,368 @@
+"""방문자 API 부하 생성기: 라우트별 p50/p95/p99 지연과 처리량을 재고 JSON으로 저장/비교
+
+    python benchmarks/loadgen.py --years 2 --duration 30 --workers 8 --sse 20 \\
+        --output results/before.json
+    python benchmarks/loadgen.py --years 2 --duration 30 --workers 8 --sse 20 \\
+        --compare results/before.json
+
+임시 DB에 --years년치 합성 데이터(업체, 한글 이름, 퇴실 누락 포함)를 넣고 앱을 띄운다.
+--mode client는 Flask 테스트 클라이언트로 프로세스 안에서, --mode server는 로컬
+스레드 서버를 띄워 HTTP로 요청한다. --url을 주면 이미 떠 있는 서버에 보낸다
+(이 경우 시딩하지 않는다).
+
+워커마다 라우트를 가중치대로 골라 입실, 퇴실, 현재 방문자 폴링, 통계, 월별 내보내기를
+보낸다. 조회 라우트는 브라우저처럼 직전 ETag를 If-None-Match로 보낸다
+(--no-etag로 끔). --sse개의 SSE 연결은 받은 이벤트 수를 센다.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from datetime import date, datetime
+
+from common import (GIVEN_NAMES, LOCATIONS, MANAGERS, POSITIONS, PURPOSES, ROOT, SURNAMES,
+                    company_names, seed_visitors, temp_db)
+
+ROWS_PER_DAY = 60
+DEFAULT_WEIGHTS = {'current': 50, 'analytics': 20, 'checkin': 15, 'checkout': 10,
+                   'by_date': 4, 'export': 1}
+ANALYTICS_ROUTES = ['/api/analytics/companies', '/api/analytics/purposes',
+                    '/api/stats/managers', '/api/stats/companies', '/api/stats/locations']
+
+
+class TestClientTransport:
+    """Flask 테스트 클라이언트 (스레드마다 클라이언트 하나)"""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, headers=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body, headers=headers or {})
+        return response.status_code, response.headers, response.get_data()
+
+    def stream(self, path):
+        response = self.app.test_client().get(path, buffered=False)
+        return response.response, response.close
+
+
+class HTTPTransport:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers=headers)
+        try:
+            with urllib.request.urlopen(req, timeout=60) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, e.read()
+
+    def stream(self, path):
+        response = urllib.request.urlopen(self.base_url + path, timeout=60)
+        return iter(lambda: response.read1(4096), b''), response.close
+
+
+def start_local_server(app):
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timings = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, route, seconds, status):
+        with self._lock:
+            self.timings[route].append(seconds * 1000)
+            self.statuses[route][status] += 1
+
+
+def percentiles(values):
+    if len(values) < 2:
+        value = values[0] if values else 0.0
+        return value, value, value
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return cuts[49], cuts[94], cuts[98]
+
+
+class Worker(threading.Thread):
+    def __init__(self, index, transport, recorder, state, weights, deadline, args):
+        super().__init__(name=f'loadgen-{index}', daemon=True)
+        self.transport = transport
+        self.recorder = recorder
+        self.state = state
+        self.deadline = deadline
+        self.use_etag = not args.no_etag
+        self.rng = random.Random(args.seed + index)
+        self.ops, self.weights = zip(*weights.items())
+        self.etags = {}
+        self.companies = company_names(50)
+        self.months = args.export_months
+
+    def call(self, route, method, path, body=None, conditional=False):
+        headers = {}
+        if conditional and self.use_etag and path in self.etags:
+            headers['If-None-Match'] = self.etags[path]
+        start = time.perf_counter()
+        try:
+            status, response_headers, data = self.transport.request(method, path, body, headers)
+        except OSError:
+            self.recorder.record(route, time.perf_counter() - start, 'error')
+            return None, None
+        self.recorder.record(route, time.perf_counter() - start, status)
+        if conditional and response_headers.get('ETag'):
+            self.etags[path] = response_headers['ETag']
+        return status, data
+
+    def run(self):
+        while time.monotonic() < self.deadline:
+            getattr(self, 'op_' + self.rng.choices(self.ops, self.weights)[0])()
+
+    def op_current(self):
+        self.call('GET /api/current-visitors', 'GET', '/api/current-visitors', conditional=True)
+
+    def op_analytics(self):
+        path = self.rng.choice(ANALYTICS_ROUTES)
+        self.call('GET ' + path, 'GET', path, conditional=True)
+
+    def op_by_date(self):
+        day = self.rng.choice(self.state['dates'])
+        self.call('GET /api/visitors/<date>', 'GET', f'/api/visitors/{day}', conditional=True)
+
+    def op_checkin(self):
+        rng = self.rng
+        body = {'company': rng.choice(self.companies),
+                'name': rng.choice(SURNAMES) + rng.choice(GIVEN_NAMES) + str(rng.randint(1, 999)),
+                'position': rng.choice(POSITIONS), 'contact': f'010-{rng.randint(0, 9999):04d}',
+                'visit_location': rng.choice(LOCATIONS), 'visit_purpose': rng.choice(PURPOSES),
+                'manager': rng.choice(MANAGERS)}
+        status, data = self.call('POST /api/visitors', 'POST', '/api/visitors', body)
+        if status == 201:
+            with self.state['lock']:
+                self.state['checked_in'].append(json.loads(data)['id'])
+
+    def op_checkout(self):
+        with self.state['lock']:
+            checked_in = self.state['checked_in']
+            visitor_id = checked_in.pop(self.rng.randrange(len(checked_in))) if checked_in else None
+        if visitor_id is None:
+            return self.op_checkin()
+        self.call('POST /api/visitors/<id>/checkout', 'POST',
+                  f'/api/visitors/{visitor_id}/checkout')
+
+    def op_export(self):
+        year, month = self.rng.choice(self.months)
+        self.call('GET /api/export/<y>/<m>', 'GET', f'/api/export/{year}/{month}')
+
+
+class SSESubscriber(threading.Thread):
+    def __init__(self, transport, deadline):
+        super().__init__(daemon=True)
+        self.transport = transport
+        self.deadline = deadline
+        self.events = 0
+        self.error = None
+
+    def run(self):
+        try:
+            chunks, close = self.transport.stream('/api/sse')
+        except OSError as e:
+            self.error = str(e)
+            return
+        try:
+            for chunk in chunks:
+                self.events += chunk.count(b'\nevent: ') + chunk.startswith(b'event: ')
+                if time.monotonic() >= self.deadline:
+                    break
+        except Exception as e:  # 종료 시 끊기는 연결
+            self.error = self.error or str(e)
+        finally:
+            close()
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def prepare_app(args):
+    """합성 데이터를 넣은 임시 DB로 앱을 불러온다 (main은 import 시점에 DB를 연다)"""
+    days = int(args.years * 365)
+    db = temp_db()
+    start = time.perf_counter()
+    seed_visitors(db, days * args.rows_per_day, days=days, missed_ratio=args.missed_ratio)
+    print(f"seeded {days * args.rows_per_day:,} visits over {days} days "
+          f"in {time.perf_counter() - start:.1f}s")
+    with db.connection() as conn:
+        dates = [row[0] for row in conn.execute(
+            'SELECT DISTINCT date FROM visitors ORDER BY date DESC LIMIT 60')]
+    db_path = db.db_path
+    db.close()
+
+    os.environ['VISITAPP_DB_PATH'] = db_path
+    os.environ['VISITAPP_SCHEDULER'] = '0'
+    os.environ.setdefault('VISITAPP_EXPORT_DIR', tempfile.mkdtemp(prefix='visitapp-exports-'))
+    import main
+    return main.app, dates
+
+
+def run(args):
+    weights = dict(DEFAULT_WEIGHTS)
+    for item in args.weight:
+        op, value = item.split('=')
+        if op not in DEFAULT_WEIGHTS:
+            raise SystemExit(f"unknown op {op!r} (choose from {', '.join(DEFAULT_WEIGHTS)})")
+        weights[op] = int(value)
+    weights = {op: weight for op, weight in weights.items() if weight > 0}
+
+    server = None
+    if args.url:
+        transport = HTTPTransport(args.url)
+        dates = [date.today().isoformat()]
+    else:
+        app, dates = prepare_app(args)
+        if args.mode == 'server':
+            server, url = start_local_server(app)
+            transport = HTTPTransport(url)
+        else:
+            transport = TestClientTransport(app)
+    today = date.today()
+    args.export_months = [(today.year, today.month)] + [
+        (int(d[:4]), int(d[5:7])) for d in dates[-1:]]
+
+    recorder = Recorder()
+    state = {'lock': threading.Lock(), 'checked_in': [], 'dates': dates}
+    deadline = time.monotonic() + args.duration
+    subscribers = [SSESubscriber(transport, deadline + 1) for _ in range(args.sse)]
+    for subscriber in subscribers:
+        subscriber.start()
+    workers = [Worker(i, transport, recorder, state, weights, deadline, args)
+               for i in range(args.workers)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    for subscriber in subscribers:
+        subscriber.join(timeout=5)
+    if server:
+        server.shutdown()
+
+    routes = {}
+    for route, timings in sorted(recorder.timings.items()):
+        p50, p95, p99 = percentiles(timings)
+        routes[route] = {'count': len(timings), 'throughput': len(timings) / elapsed,
+                         'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99, 'max_ms': max(timings),
+                         'statuses': {str(k): v for k, v in recorder.statuses[route].items()}}
+    total = sum(route['count'] for route in routes.values())
+    return {
+        'meta': {'started_at': datetime.now().isoformat(timespec='seconds'),
+                 'revision': git_revision(), 'python': platform.python_version(),
+                 'mode': 'url' if args.url else args.mode, 'years': args.years,
+                 'rows_per_day': args.rows_per_day, 'workers': args.workers, 'sse': args.sse,
+                 'duration': elapsed, 'weights': weights, 'etag': not args.no_etag},
+        'total': {'count': total, 'throughput': total / elapsed},
+        'sse': {'subscribers': len(subscribers),
+                'events': [subscriber.events for subscriber in subscribers],
+                'errors': sum(1 for subscriber in subscribers if subscriber.error)},
+        'routes': routes,
+    }
+
+
+def print_report(results):
+    meta = results['meta']
+    print(f"\n## {meta['mode']}, {meta['workers']} workers, {meta['sse']} SSE, "
+          f"{meta['duration']:.1f}s (rev {meta['revision']})")
+    print(f"{'route':<36}{'count':>8}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  status")
+    for route, stats in results['routes'].items():
+        statuses = ' '.join(f"{k}:{v}" for k, v in sorted(stats['statuses'].items()))
+        print(f"{route:<36}{stats['count']:>8}{stats['throughput']:>9.1f}{stats['p50_ms']:>9.2f}"
+              f"{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}{stats['max_ms']:>9.1f}  {statuses}")
+    print(f"{'total':<36}{results['total']['count']:>8}{results['total']['throughput']:>9.1f}")
+    sse = results['sse']
+    if sse['subscribers']:
+        events = sse['events']
+        print(f"SSE: {sse['subscribers']} subscribers, events min/max {min(events)}/{max(events)}, "
+              f"errors {sse['errors']}")
+
+
+def print_comparison(baseline, results):
+    """기준 결과 대비 변화율 (지연은 음수, 처리량은 양수가 개선)"""
+    def change(old, new):
+        return f"{(new - old) / old * 100:+.0f}%" if old else 'n/a'
+
+    print(f"\n## vs {baseline['meta'].get('revision')} ({baseline['meta'].get('started_at')})")
+    print(f"{'route':<36}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for route, stats in results['routes'].items():
+        old = baseline['routes'].get(route)
+        if old is None:
+            print(f"{route:<36}{'new':>9}")
+            continue
+        print(f"{route:<36}{change(old['throughput'], stats['throughput']):>9}"
+              f"{change(old['p50_ms'], stats['p50_ms']):>9}"
+              f"{change(old['p95_ms'], stats['p95_ms']):>9}"
+              f"{change(old['p99_ms'], stats['p99_ms']):>9}")
+    print(f"{'total':<36}{change(baseline['total']['throughput'], results['total']['throughput']):>9}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog='\n'.join(__doc__.splitlines()[1:]))
+    parser.add_argument('--years', type=float, default=1)
+    parser.add_argument('--rows-per-day', type=int, default=ROWS_PER_DAY)
+    parser.add_argument('--missed-ratio', type=float, default=0.02)
+    parser.add_argument('--mode', choices=['client', 'server'], default='client')
+    parser.add_argument('--url', help='이미 떠 있는 서버 주소 (시딩 안 함)')
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--sse', type=int, default=10)
+    parser.add_argument('--weight', action='append', default=[], metavar='OP=N',
+                        help=f"라우트 가중치 (기본 {DEFAULT_WEIGHTS})")
+    parser.add_argument('--no-etag', action='store_true')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    parser.add_argument('--compare', help='비교할 이전 결과 JSON')
+    args = parser.parse_args()
+
+    results = run(args)
+    print_report(results)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"saved {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), results)
+    # SSE 연결과 데몬 스레드가 남아 있어도 바로 끝낸다
+    sys.stdout.flush()
+    os._exit(0)
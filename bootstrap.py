@@ -0,0 +1,31 @@
+"""키오스크 첫 화면용 옵션 스냅샷
+
+업체/직급/방문장소/방문목적 목록과 부서별 담당자를 한 번에 모아 JSON으로
+미리 인코딩해 둔다. ETag는 본문 해시라서 워커가 달라도 내용이 같으면 같다.
+"""
+import hashlib
+
+import fastjson
+
+
+class Snapshot:
+    __slots__ = ('body', 'etag', 'data')
+
+    def __init__(self, data):
+        self.data = data
+        self.body = fastjson.dumps(data)
+        self.etag = hashlib.sha1(self.body).hexdigest()[:16]
+
+
+def build_snapshot(db):
+    departments = db.get_departments()
+    return Snapshot({
+        'companies': db.get_companies(),
+        'positions': db.get_positions(),
+        'locations': db.get_locations(),
+        'purposes': db.get_visit_purposes(),
+        'departments': departments,
+        # JSON 객체 키는 문자열이므로 부서 id를 문자열로 둔다
+        'managers': {str(dept_id): managers
+                     for dept_id, managers in db.get_manager_tree().items()},
+    })
@@ -0,0 +1,63 @@
+"""쓰기 경로에서 명시적으로 무효화하는 읽기 캐시"""
+import threading
+
+from cachetools import LRUCache
+
+
+class ReadThroughCache:
+    """키가 없으면 loader로 읽어와 저장하는 캐시
+
+    TTL 없이 데이터를 바꾸는 쪽에서 invalidate()를 호출해 비운다.
+    읽는 도중에 무효화되면 읽어온 값은 저장하지 않는다.
+    """
+
+    def __init__(self, name, maxsize=100):
+        self.name = name
+        self._cache = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key, loader):
+        with self._lock:
+            if key in self._cache:
+                self.hits += 1
+                return self._cache[key]
+            self.misses += 1
+            generation = self._generation
+
+        value = loader()
+        with self._lock:
+            if generation == self._generation:
+                self._cache[key] = value
+        return value
+
+    def update(self, key, fn):
+        """캐시된 값이 있으면 fn(기존 값)으로 바꿔 저장하고 돌려준다 (없으면 None)"""
+        with self._lock:
+            # 진행 중인 loader의 결과는 이 변경 이전 값이므로 저장하지 않는다
+            self._generation += 1
+            if key not in self._cache:
+                return None
+            value = fn(self._cache[key])
+            self._cache[key] = value
+            return value
+
+    def invalidate(self):
+        with self._lock:
+            self._cache.clear()
+            self._generation += 1
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+                'invalidations': self.invalidations,
+                'size': len(self._cache),
+            }
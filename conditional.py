@@ -0,0 +1,133 @@
+"""조회 API용 조건부 GET(ETag/304)과 응답 압축
+
+ETag는 데이터 버전(쓰기 경로와 다른 워커의 이벤트가 올리는 값)과 요청 경로로
+만들므로 DB를 읽지 않고도 304를 돌려줄 수 있다. SQLite 이벤트 백엔드에서는
+버전이 event_log의 이벤트 ID라서 워커가 달라도 같은 ETag가 나온다.
+brotli가 설치되어 있으면 br, 아니면 gzip으로 압축한다.
+"""
+import functools
+import gzip
+import hashlib
+import threading
+from datetime import date
+
+from cachetools import LRUCache
+from flask import Response, make_response, request
+
+from exports import iter_gzip
+
+try:
+    import brotli
+except ImportError:  # brotli 미설치 시 gzip만 사용
+    brotli = None
+
+COMPRESS_MIN_SIZE = 1024  # 이보다 작은 응답은 압축하지 않는다
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+class DataVersion:
+    """조회 응답의 ETag에 쓰는 데이터 버전 (값은 줄어들지 않는다)"""
+
+    def __init__(self, value=0):
+        self._lock = threading.Lock()
+        self._value = value
+
+    @property
+    def value(self):
+        return self._value
+
+    def bump(self, value=None):
+        """value(이벤트 ID)까지 올리고, 없으면 1 올린다"""
+        with self._lock:
+            self._value = self._value + 1 if value is None else max(self._value, value)
+            return self._value
+
+
+def make_etag(version, *parts):
+    # 오늘 날짜를 넣어 자정이 지나면 '오늘' 기준 응답이 다시 만들어지게 한다
+    key = '|'.join(str(part) for part in (version, date.today().isoformat()) + parts)
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+def _encodings():
+    if brotli is not None:
+        yield 'br', lambda data: brotli.compress(data, quality=5)
+    yield 'gzip', lambda data: gzip.compress(data, compresslevel=6, mtime=0)
+
+
+class ConditionalJSON:
+    """뷰를 감싸 ETag/304와 압축을 붙이는 데코레이터
+
+        conditional = ConditionalJSON(data_version)
+
+        @app.route('/api/current-visitors')
+        @conditional
+        def get_current_visitors(): ...
+
+    뷰가 Cache-Control을 직접 정하면(지난 날짜의 immutable 등) 그대로 둔다.
+    """
+
+    def __init__(self, version, cache_size=64):
+        self.version = version
+        self._compressed = LRUCache(maxsize=cache_size)  # (ETag, 인코딩) -> 압축된 본문
+        self._lock = threading.Lock()
+        self.not_modified = 0
+        self.compressed = 0
+
+    def __call__(self, view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = make_etag(self.version.value, request.full_path)
+            if request.if_none_match.contains_weak(etag):
+                self.not_modified += 1
+                response = Response(status=304)
+                response.set_etag(etag, weak=True)
+                response.headers['Cache-Control'] = 'no-cache'
+                response.vary.add('Accept-Encoding')
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            # 압축한 본문도 같은 ETag를 쓰므로 약한 ETag로 둔다
+            response.set_etag(etag, weak=True)
+            response.headers.setdefault('Cache-Control', 'no-cache')
+            self.compress(response, etag)
+            return response
+        return wrapper
+
+    def compress(self, response, etag):
+        response.vary.add('Accept-Encoding')
+        if response.direct_passthrough or 'Content-Encoding' in response.headers:
+            return
+        if response.is_streamed:
+            # 스트리밍 응답은 모으지 않고 청크마다 gzip으로 압축한다 (캐시하지 않음)
+            if request.accept_encodings['gzip']:
+                response.response = iter_gzip(response.response)
+                response.headers['Content-Encoding'] = 'gzip'
+                self.compressed += 1
+            return
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return
+        for encoding, compress in _encodings():
+            if request.accept_encodings[encoding]:
+                key = (etag, encoding)
+                with self._lock:
+                    body = self._compressed.get(key)
+                if body is None:
+                    body = compress(data)
+                    with self._lock:
+                        self._compressed[key] = body
+                self.compressed += 1
+                response.set_data(body)
+                response.headers['Content-Encoding'] = encoding
+                return
+
+    def stats(self):
+        return {
+            'version': self.version.value,
+            'not_modified': self.not_modified,
+            'compressed': self.compressed,
+            'encodings': [encoding for encoding, _ in _encodings()],
+        }
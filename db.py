@@ -1,18 +1,640 @@
+import logging
+import os
 import sqlite3
-from datetime import datetime, timedelta
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from queue import LifoQueue, Empty
+
+from archive import ArchiveCatalog, missed_source, visitors_source
+from rows import Manager, MissedCheckout, Visitor, VisitorHistory
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = '/var/www/visitapp/visitor_log.db'
+DEFAULT_POOL_SIZE = 5
+
+# 커넥션을 열 때마다 한 번씩 적용하는 PRAGMA 설정
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',        # 쓰기 중에도 읽기가 막히지 않도록
+    'synchronous': 'NORMAL',      # WAL 모드에서는 NORMAL로도 안전
+    'busy_timeout': 5000,         # 잠금 대기(ms)
+    'cache_size': -16000,         # 음수는 KiB 단위 (약 16MB)
+    'mmap_size': 134217728,       # 128MB
+    'temp_store': 'MEMORY',
+}
+DEFAULT_CHECKPOINT_INTERVAL = 300  # WAL 체크포인트 주기(초)
+DEFAULT_SELECTION_FLUSH_INTERVAL = 5  # 선택 횟수 모아 쓰기 주기(초)
+MISSED_CHECKOUT_REASON = '자동 퇴실 처리 (자정)'
+EXPORT_BATCH_SIZE = 1000  # 내보내기 시 커서에서 한 번에 가져올 행 수
+
+# 옵션 목록의 선택 횟수(selection_count)를 기록하는 (테이블, 컬럼)
+SELECTION_COUNT_FIELDS = [
+    ('companies', 'name'),
+    ('positions', 'title'),
+    ('locations', 'name'),
+    ('visit_purposes', 'purpose'),
+    ('managers', 'name'),
+]
+SELECTION_COUNT_COLUMNS = dict(SELECTION_COUNT_FIELDS)
+
+# 행 객체(rows.py) 컬럼 순서의 SELECT 목록
+VISITOR_COLUMNS = Visitor.select()
+MISSED_CHECKOUT_COLUMNS = MissedCheckout.select()
+
+
+def duration_sql(check_out_time='check_out_time'):
+    """체류시간(초) 계산식 (UPDATE에서는 새 퇴실 시간을 파라미터로 넘긴다)"""
+    return (f"strftime('%s', date || ' ' || {check_out_time}) - "
+            f"strftime('%s', date || ' ' || check_in_time)")
+
+
+def _backfill_durations(cursor):
+    cursor.execute(f'''
+        UPDATE visitors
+        SET duration_seconds = {duration_sql()}
+        WHERE check_out_time IS NOT NULL AND status = 'NORMAL'
+    ''')
+
+
+# 일별 집계(롤업) 테이블: 방문 등록/퇴실/퇴실 누락 처리와 같은 트랜잭션에서 갱신
+ROLLUP_DIMENSIONS = [
+    ('daily_purpose_stats', 'visit_purpose'),
+    ('daily_location_stats', 'visit_location'),
+    ('daily_manager_stats', 'manager'),
+]
+
+# 업체별 일별 집계 (최장 체류자는 체류시간이 같으면 먼저 등록된 방문자)
+COMPANY_ROLLUP_SQL = '''
+    INSERT INTO daily_company_stats
+        (date, company, visit_count, open_count, total_duration,
+         longest_duration, longest_visitor_id, longest_name, longest_position)
+    SELECT
+        date,
+        company,
+        COUNT(*),
+        SUM(check_out_time IS NULL),
+        COALESCE(SUM(duration_seconds), 0),
+        MAX(duration_seconds),
+        MAX(CASE WHEN longest_rank = 1 AND duration_seconds IS NOT NULL THEN id END),
+        MAX(CASE WHEN longest_rank = 1 AND duration_seconds IS NOT NULL THEN name END),
+        MAX(CASE WHEN longest_rank = 1 AND duration_seconds IS NOT NULL THEN position END)
+    FROM (
+        SELECT
+            id, date, company, name, position, check_out_time, duration_seconds,
+            ROW_NUMBER() OVER (
+                PARTITION BY date, company
+                ORDER BY duration_seconds IS NULL, duration_seconds DESC, id
+            ) as longest_rank
+        FROM {source}
+        {where}
+    )
+    GROUP BY date, company
+    ON CONFLICT (date, company) DO UPDATE SET
+        visit_count = excluded.visit_count,
+        open_count = excluded.open_count,
+        total_duration = excluded.total_duration,
+        longest_duration = excluded.longest_duration,
+        longest_visitor_id = excluded.longest_visitor_id,
+        longest_name = excluded.longest_name,
+        longest_position = excluded.longest_position
+'''
+
+
+def _create_rollup_tables(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_company_stats (
+            date TEXT NOT NULL,
+            company TEXT NOT NULL,
+            visit_count INTEGER NOT NULL DEFAULT 0,
+            open_count INTEGER NOT NULL DEFAULT 0,
+            total_duration INTEGER NOT NULL DEFAULT 0,
+            longest_duration INTEGER,
+            longest_visitor_id INTEGER,
+            longest_name TEXT,
+            longest_position TEXT,
+            PRIMARY KEY (date, company)
+        )
+    ''')
+    for table, column in ROLLUP_DIMENSIONS:
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                date TEXT NOT NULL,
+                {column} TEXT NOT NULL,
+                visit_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (date, {column})
+            )
+        ''')
+
+
+def _rebuild_rollups(cursor, source='visitors'):
+    """원본 방문 기록으로부터 일별 집계 테이블을 다시 만든다 (source: 보관 파일 포함 FROM 절)"""
+    cursor.execute('DELETE FROM daily_company_stats')
+    cursor.execute(COMPANY_ROLLUP_SQL.format(source=source, where='WHERE true'))
+    for table, column in ROLLUP_DIMENSIONS:
+        cursor.execute(f'DELETE FROM {table}')
+        cursor.execute(f'''
+            INSERT INTO {table} (date, {column}, visit_count)
+            SELECT date, {column}, COUNT(*)
+            FROM {source}
+            GROUP BY date, {column}
+        ''')
+
+
+# (company, name)당 한 행만 유지하고 방문 횟수를 센다
+VISITOR_HISTORY_UPSERT_SQL = '''
+    INSERT INTO visitor_history (company, name, position, contact, last_visit_date, visit_count)
+    VALUES (?, ?, ?, ?, ?, 1)
+    ON CONFLICT (company, name) DO UPDATE SET
+        position = excluded.position,
+        contact = excluded.contact,
+        last_visit_date = MAX(last_visit_date, excluded.last_visit_date),
+        visit_count = visit_count + 1
+'''
+
+
+def _dedupe_visitor_history(cursor):
+    """(company, name)마다 가장 최근 행만 남기고 방문 횟수를 채운다"""
+    # 같은 날짜면 나중에 들어간 행(id가 큰 행)을 최근 기록으로 본다
+    cursor.execute('''
+        CREATE TEMP TABLE visitor_history_latest AS
+        SELECT company, name, position, contact, last_visit_date, row_count
+        FROM (
+            SELECT *,
+                   ROW_NUMBER() OVER (PARTITION BY company, name
+                                      ORDER BY last_visit_date DESC, id DESC) AS rn,
+                   COUNT(*) OVER (PARTITION BY company, name) AS row_count
+            FROM visitor_history
+        )
+        WHERE rn = 1
+    ''')
+    cursor.execute('DELETE FROM visitor_history')
+    # 지금까지는 방문마다 행이 쌓였으므로 행 수와 방문 기록 수 중 큰 값을 방문 횟수로 쓴다
+    cursor.execute('''
+        INSERT INTO visitor_history (company, name, position, contact, last_visit_date, visit_count)
+        SELECT h.company, h.name, h.position, h.contact, h.last_visit_date,
+               MAX(h.row_count, (SELECT COUNT(*) FROM visitors v
+                                 WHERE v.company = h.company AND v.name = h.name))
+        FROM visitor_history_latest h
+    ''')
+    cursor.execute('DROP TABLE visitor_history_latest')
+
+
+# 스키마 마이그레이션: (버전, 설명, SQL 또는 cursor를 받는 함수 목록)
+# 이미 적용된 버전은 schema_version 테이블에 기록되어 다시 실행되지 않는다.
+MIGRATIONS = [
+    (1, '조회용 인덱스 추가', [
+        # 날짜별 조회, 월/기간 조회 (ORDER BY check_in_time 포함)
+        'CREATE INDEX IF NOT EXISTS idx_visitors_date_checkin ON visitors (date, check_in_time)',
+        # 미퇴실 방문자만 담는 부분 인덱스 (이중 입실 체크, 자동 퇴실 처리)
+        '''CREATE INDEX IF NOT EXISTS idx_visitors_open
+           ON visitors (date, company, name, position)
+           WHERE check_out_time IS NULL''',
+        # 업체별 통계
+        'CREATE INDEX IF NOT EXISTS idx_visitors_company ON visitors (company)',
+        'CREATE INDEX IF NOT EXISTS idx_missed_checkouts_original_date ON missed_checkouts (original_date)',
+        'CREATE INDEX IF NOT EXISTS idx_missed_checkouts_visitor ON missed_checkouts (visitor_id)',
+        'CREATE INDEX IF NOT EXISTS idx_managers_department ON managers (department_id)',
+    ]),
+    (2, '체류시간 컬럼 추가', [
+        # 정상 퇴실 시에만 채워지고, 퇴실 누락(MISSED)이면 NULL
+        'ALTER TABLE visitors ADD COLUMN duration_seconds INTEGER',
+        _backfill_durations,
+        # 업체별 집계와 최장 체류자 조회 (company 단독 인덱스를 대체)
+        'CREATE INDEX IF NOT EXISTS idx_visitors_company_duration ON visitors (company, duration_seconds)',
+        'DROP INDEX IF EXISTS idx_visitors_company',
+    ]),
+    (3, '일별 집계 테이블 추가', [
+        _create_rollup_tables,
+        '''CREATE INDEX IF NOT EXISTS idx_daily_company_stats_longest
+           ON daily_company_stats (company, longest_duration, longest_visitor_id)''',
+        _rebuild_rollups,
+    ]),
+    (4, '이벤트 로그 테이블 추가', [
+        # 워커 프로세스 간 SSE 이벤트 전달용 변경 로그 (id가 곧 SSE 이벤트 ID)
+        '''CREATE TABLE IF NOT EXISTS event_log (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               type TEXT NOT NULL,
+               data TEXT NOT NULL,
+               origin TEXT NOT NULL,
+               created_at REAL NOT NULL
+           )''',
+    ]),
+    (5, '월별 데이터 버전과 내보내기 작업 테이블 추가', [
+        # 해당 월의 방문/퇴실 누락 기록이 바뀔 때마다 증가 (내보내기 파일 캐시 키)
+        '''CREATE TABLE IF NOT EXISTS period_versions (
+               month TEXT PRIMARY KEY,
+               version INTEGER NOT NULL DEFAULT 0
+           ) WITHOUT ROWID''',
+        '''CREATE TABLE IF NOT EXISTS export_jobs (
+               id TEXT PRIMARY KEY,
+               cache_key TEXT NOT NULL,
+               start_date TEXT NOT NULL,
+               end_date TEXT NOT NULL,
+               company TEXT,
+               filename TEXT NOT NULL,
+               status TEXT NOT NULL,
+               path TEXT,
+               error TEXT,
+               created_at REAL NOT NULL,
+               finished_at REAL
+           )''',
+        'CREATE INDEX IF NOT EXISTS idx_export_jobs_created ON export_jobs (created_at)',
+    ]),
+    (6, '방문자 히스토리 중복 제거와 방문 횟수 추가', [
+        'ALTER TABLE visitor_history ADD COLUMN visit_count INTEGER NOT NULL DEFAULT 1',
+        _dedupe_visitor_history,
+        '''CREATE UNIQUE INDEX IF NOT EXISTS idx_visitor_history_company_name
+           ON visitor_history (company, name)''',
+    ]),
+    (7, '보관 파티션 카탈로그 추가', [
+        # 연도별 보관 파일 (archive.py). archived_until 전까지의 방문은 모두 보관 파일에 있다
+        '''CREATE TABLE IF NOT EXISTS archive_partitions (
+               year INTEGER PRIMARY KEY,
+               filename TEXT NOT NULL,
+               archived_until TEXT NOT NULL,
+               visitor_count INTEGER NOT NULL,
+               missed_count INTEGER NOT NULL,
+               checksum TEXT NOT NULL,
+               archived_at TEXT NOT NULL
+           )''',
+    ]),
+]
+
+
+def month_range(year, month):
+    """[해당 월 1일, 다음 달 1일) 반개구간"""
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+
+def period_range(period, day):
+    """day가 속한 기간(day/week/month/quarter/year)의 [시작, 끝) 반개구간"""
+    if period == 'day':
+        start, end = day, day + timedelta(days=1)
+    elif period == 'week':
+        # 월요일 시작
+        start = day - timedelta(days=day.weekday())
+        end = start + timedelta(days=7)
+    elif period == 'month':
+        return month_range(day.year, day.month)
+    elif period == 'quarter':
+        first_month = (day.month - 1) // 3 * 3 + 1
+        start = date(day.year, first_month, 1)
+        end = date(day.year + 1, 1, 1) if first_month == 10 else date(day.year, first_month + 3, 1)
+    elif period == 'year':
+        start, end = date(day.year, 1, 1), date(day.year + 1, 1, 1)
+    else:
+        raise ValueError(f"Unknown period: {period}")
+    return start.isoformat(), end.isoformat()
+
+
+def parse_pragmas(value):
+    """'cache_size=-32000,mmap_size=0' 형식의 문자열을 dict로 변환"""
+    pragmas = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            key, val = item.split('=', 1)
+            pragmas[key.strip()] = val.strip()
+    return pragmas
+
+
+class PooledConnection(sqlite3.Connection):
+    """풀에서 관리되는 커넥션 (마지막 사용 시각 기록)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.last_used = time.monotonic()
+
+
+class ConnectionPool:
+    """스레드 인식 SQLite 커넥션 풀
+
+    같은 스레드 안에서 중첩 호출되면 이미 빌린 커넥션을 그대로 재사용하고,
+    풀이 가득 찬 경우에는 다른 스레드가 반납할 때까지 대기한다.
+    """
+
+    def __init__(self, db_path, size=DEFAULT_POOL_SIZE, timeout=10.0,
+                 health_check_interval=30.0, pragmas=None, on_acquire=None):
+        self.db_path = db_path
+        self.on_acquire = on_acquire  # 빌려줄 때마다 on_acquire(conn) 호출 (보관 파일 ATTACH)
+        self.size = size
+        self.pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._idle = LifoQueue()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._created = 0
+        self._closed = False
+        self._stats = {
+            'hits': 0,          # 유휴 커넥션 재사용
+            'misses': 0,        # 새 커넥션 생성
+            'reentrant': 0,     # 같은 스레드의 중첩 사용
+            'waits': 0,         # 풀이 가득 차서 대기한 횟수
+            'wait_time': 0.0,   # 누적 대기 시간(초)
+            'max_wait_time': 0.0,
+            'discarded': 0,     # 상태 점검 실패로 폐기
+        }
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout,
+                               check_same_thread=False, factory=PooledConnection)
+        for key, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {key} = {value}')
+        return conn
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _is_healthy(self, conn):
+        # 최근에 사용한 커넥션은 점검 생략
+        if time.monotonic() - conn.last_used < self.health_check_interval:
+            return True
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn):
+        with self._lock:
+            self._created -= 1
+            self._stats['discarded'] += 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _take_idle(self, block):
+        start = time.monotonic()
+        try:
+            conn = self._idle.get(block=block, timeout=self.timeout if block else None)
+        except Empty:
+            if block:
+                raise sqlite3.OperationalError('커넥션 풀 대기 시간 초과')
+            return None
+        if block:
+            waited = time.monotonic() - start
+            with self._lock:
+                self._stats['waits'] += 1
+                self._stats['wait_time'] += waited
+                self._stats['max_wait_time'] = max(self._stats['max_wait_time'], waited)
+        return conn
+
+    def acquire(self):
+        block = False
+        while True:
+            if self._closed:
+                raise sqlite3.ProgrammingError('커넥션 풀이 종료되었습니다.')
+
+            conn = self._take_idle(block)
+            if conn is not None:
+                if self._is_healthy(conn):
+                    self._count('hits')
+                    return conn
+                self._discard(conn)
+                block = False
+                continue
+
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+                    self._stats['misses'] += 1
+            if not can_create:
+                block = True
+                continue
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+    def release(self, conn):
+        # 커밋되지 않은 작업은 반납 전에 되돌린다
+        if conn.in_transaction:
+            conn.rollback()
+        conn.last_used = time.monotonic()
+        if self._closed:
+            self._discard(conn)
+        else:
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            self._count('reentrant')
+            yield held
+            return
+
+        conn = self.acquire()
+        self._local.conn = conn
+        try:
+            if self.on_acquire is not None:
+                self.on_acquire(conn)
+            yield conn
+        finally:
+            self._local.conn = None
+            self.release(conn)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except Empty:
+                break
+            self._discard(conn)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = self.size
+            stats['open'] = self._created
+        stats['idle'] = self._idle.qsize()
+        total = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / total, 4) if total else 0.0
+        return stats
+
+
+class WalCheckpointer(threading.Thread):
+    """주기적으로 WAL 체크포인트를 수행하는 백그라운드 스레드
+
+    PASSIVE 모드는 읽기/쓰기를 막지 않으므로 WAL 파일이 계속
+    커지는 것만 막아준다.
+    """
+
+    def __init__(self, pool, interval=DEFAULT_CHECKPOINT_INTERVAL, mode='PASSIVE'):
+        super().__init__(name='wal-checkpointer', daemon=True)
+        self.pool = pool
+        self.interval = interval
+        self.mode = mode
+        self.last_result = None
+        self._stop_event = threading.Event()
+
+    def checkpoint(self):
+        with self.pool.connection() as conn:
+            # (busy, WAL 프레임 수, 체크포인트된 프레임 수)
+            self.last_result = conn.execute(f'PRAGMA wal_checkpoint({self.mode})').fetchone()
+        return self.last_result
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.checkpoint()
+            except sqlite3.Error as e:
+                logger.warning("WAL checkpoint failed: %s", e)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class SelectionCounter(threading.Thread):
+    """선택 횟수 증가분을 메모리에 모았다가 주기적으로 한 트랜잭션에 반영
+
+    입실 트랜잭션에서 옵션 테이블 UPDATE를 빼서 쓰기 잠금을 짧게 만든다.
+    반영 전 증가분은 pending()으로 읽을 수 있어 옵션 정렬에 바로 쓸 수 있다.
+    interval이 0이면 스레드 없이 증가할 때마다 바로 반영한다.
+    반영할 때마다 on_flush()를 호출한다 (옵션 목록 캐시 무효화).
+    """
+
+    def __init__(self, apply, interval=DEFAULT_SELECTION_FLUSH_INTERVAL):
+        super().__init__(name='selection-counter', daemon=True)
+        self.apply = apply
+        self.interval = interval
+        self.flushes = 0
+        self.on_flush = None
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._stop_event = threading.Event()
+
+    def increment(self, values):
+        """values: {테이블: 값} (값이 None이면 건너뜀)"""
+        with self._lock:
+            for table, value in values.items():
+                if table not in SELECTION_COUNT_COLUMNS:
+                    raise ValueError(f"Unknown selection count table: {table}")
+                if value is not None:
+                    key = (table, value)
+                    self._pending[key] = self._pending.get(key, 0) + 1
+        if self.interval <= 0:
+            self.flush()
+
+    def pending(self, table):
+        """아직 반영하지 않은 {값: 증가분}"""
+        with self._lock:
+            return {value: amount for (t, value), amount in self._pending.items() if t == table}
+
+    def flush(self):
+        with self._lock:
+            deltas, self._pending = self._pending, {}
+        if not deltas:
+            return 0
+        try:
+            self.apply(deltas)
+        except sqlite3.Error:
+            # 실패한 증가분은 다음 반영 때 다시 시도
+            with self._lock:
+                for key, amount in deltas.items():
+                    self._pending[key] = self._pending.get(key, 0) + amount
+            raise
+        self.flushes += 1
+        if self.on_flush is not None:
+            try:
+                self.on_flush()
+            except Exception as e:
+                logger.exception("Selection count flush callback failed: %s", e)
+        return len(deltas)
+
+    def stats(self):
+        with self._lock:
+            pending = sum(self._pending.values())
+        return {'interval': self.interval, 'pending': pending, 'flushes': self.flushes}
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.warning("Selection count flush failed: %s", e)
+
+    def stop(self):
+        """스레드를 멈추고 남은 증가분을 반영"""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+        self.flush()
+
 
 class VisitorDB:
-    def __init__(self):
-        self.db_path = '/var/www/visitapp/visitor_log.db'
+    def __init__(self, db_path=None, pool_size=None, pragmas=None,
+                 checkpoint_interval=None, selection_flush_interval=None, archive_dir=None):
+        self.db_path = db_path or os.environ.get('VISITAPP_DB_PATH', DEFAULT_DB_PATH)
+        if pool_size is None:
+            pool_size = int(os.environ.get('VISITAPP_DB_POOL_SIZE', DEFAULT_POOL_SIZE))
+        if pragmas is None:
+            pragmas = {**DEFAULT_PRAGMAS,
+                       **parse_pragmas(os.environ.get('VISITAPP_DB_PRAGMAS'))}
+        if checkpoint_interval is None:
+            checkpoint_interval = float(os.environ.get('VISITAPP_WAL_CHECKPOINT_INTERVAL',
+                                                       DEFAULT_CHECKPOINT_INTERVAL))
+        self.pool = ConnectionPool(self.db_path, size=pool_size, pragmas=pragmas)
         self.create_tables()
+        # 카탈로그 테이블이 생긴 뒤부터 커넥션마다 보관 파일을 ATTACH
+        self.archive = ArchiveCatalog(self.db_path, archive_dir)
+        self.pool.on_acquire = self.archive.attach
+
+        # WAL 모드일 때만 체크포인트 스레드 실행 (0이면 비활성화)
+        self.checkpointer = None
+        if checkpoint_interval > 0 and str(pragmas.get('journal_mode', '')).upper() == 'WAL':
+            self.checkpointer = WalCheckpointer(self.pool, interval=checkpoint_interval)
+            self.checkpointer.start()
+
+        if selection_flush_interval is None:
+            selection_flush_interval = float(os.environ.get('VISITAPP_SELECTION_FLUSH_INTERVAL',
+                                                            DEFAULT_SELECTION_FLUSH_INTERVAL))
+        self.selection_counter = SelectionCounter(self.apply_selection_counts,
+                                                  interval=selection_flush_interval)
+        if selection_flush_interval > 0:
+            self.selection_counter.start()
+
+    def connection(self):
+        """풀에서 커넥션을 빌려온다 (with 블록이 끝나면 자동 반납)"""
+        return self.pool.connection()
+
+    def pool_stats(self):
+        return self.pool.stats()
 
-    def get_connection(self):
-        return sqlite3.connect(self.db_path)
+    def _visitors(self, conn, start=None, end=None):
+        """[start, end) 방문일의 visitors FROM 절 (겹치는 보관 파일 포함)"""
+        return visitors_source(self.archive.schemas(conn, start, end))
+
+    def _missed_checkouts(self, conn, start=None, end=None):
+        """원래 방문일이 [start, end)인 퇴실 누락 기록 FROM 절 (MissedCheckout 컬럼)"""
+        return missed_source(self.archive.schemas(conn, start, end))
+
+    def is_archive_attached(self, date):
+        """date가 속한 연도가 보관되어 있으면 그 보관 파일이 ATTACH되어 있는지 (보관 전이면 True)"""
+        with self.connection() as conn:
+            return int(date[:4]) not in self.archive.missing(conn)
+
+    def close(self):
+        if self.checkpointer:
+            self.checkpointer.stop()
+        self.selection_counter.stop()
+        self.pool.close()
 
     def create_tables(self):
-        conn = self.get_connection()
-        try:
+        with self.connection() as conn:
             cursor = conn.cursor()
+            # 여러 워커가 동시에 시작해도 스키마 작업은 한 번에 하나씩
+            cursor.execute('BEGIN IMMEDIATE')
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS visitors (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -104,10 +726,40 @@ class VisitorDB:
             ''')
 
             self.insert_initial_data(cursor)
+            self.run_migrations(cursor)
             
             conn.commit()
-        finally:
-            conn.close()
+
+    def run_migrations(self, cursor):
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TEXT NOT NULL
+            )
+        ''')
+        cursor.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version')
+        current_version = cursor.fetchone()[0]
+
+        for version, description, steps in MIGRATIONS:
+            if version <= current_version:
+                continue
+            logger.info("Applying schema migration %s: %s", version, description)
+            for step in steps:
+                if callable(step):
+                    step(cursor)
+                else:
+                    cursor.execute(step)
+            cursor.execute('''
+                INSERT INTO schema_version (version, description, applied_at)
+                VALUES (?, ?, ?)
+            ''', (version, description, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+
+    def get_schema_version(self):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version')
+            return cursor.fetchone()[0]
 
     def insert_initial_data(self, cursor):
         # 기의 초기화 코드 수정
@@ -174,20 +826,42 @@ class VisitorDB:
 
     def add_visitor(self, company, name, position, contact, visit_location, 
                    visit_purpose, manager):
-        # 디버그 로그 추가
-        print(f"Adding visitor: company={company}, name={name}, position={position}")
-        
-        # 이중 입실 체크
-        if self.check_duplicate_visitor(company, name, position):
-            print("Duplicate visitor detected!")  # 중복 감지 로그
-            return -1
-        
-        conn = self.get_connection()
-        try:
+        """방문자 등록 후 id 반환 (이미 입실한 방문자면 -1)"""
+        visitor = self.check_in(company, name, position, contact, visit_location,
+                                visit_purpose, manager)
+        return visitor.id if visitor else -1
+
+    def check_in(self, company, name, position, contact, visit_location,
+                 visit_purpose, manager):
+        """입실 처리를 하나의 트랜잭션으로 수행하고 등록된 행을 돌려준다
+
+        이중 입실 체크, 방문 기록 추가, 방문자 히스토리, 일별 집계를
+        BEGIN IMMEDIATE 트랜잭션 안에서 처리하므로 두 키오스크에서 같은 사람을
+        동시에 등록해도 한 건만 들어간다. 이미 입실한 방문자면 None.
+        옵션 선택 횟수는 selection_counter가 모아서 따로 반영한다.
+        """
+        logger.debug("Adding visitor: company=%s, name=%s, position=%s", company, name, position)
+
+        with self.connection() as conn:
             cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
             current_time = datetime.now()
             date = current_time.strftime('%Y-%m-%d')
             check_in_time = current_time.strftime('%H:%M:%S')
+
+            # 이중 입실 체크
+            cursor.execute('''
+                SELECT id FROM visitors 
+                WHERE date = ? 
+                AND company = ? 
+                AND name = ? 
+                AND position = ? 
+                AND check_out_time IS NULL
+            ''', (date, company, name, position))
+            if cursor.fetchone():
+                logger.debug("Duplicate visitor detected")
+                conn.rollback()
+                return None
             
             # 방문자 등록
             cursor.execute('''
@@ -196,259 +870,448 @@ class VisitorDB:
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (date, company, name, position, contact, visit_location, 
                   visit_purpose, check_in_time, manager))
+            visitor_id = cursor.lastrowid
             
             # 방문자 히스토리 업데이트
-            cursor.execute('''
-                INSERT OR REPLACE INTO visitor_history 
-                (company, name, position, contact, last_visit_date)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (company, name, position, contact, date))
-            
+            cursor.execute(VISITOR_HISTORY_UPSERT_SQL, (company, name, position, contact, date))
+
+            # 일별 집계 갱신
+            self._count_daily_visit(cursor, date, company, visit_purpose,
+                                    visit_location, manager)
+            self._touch_period(cursor, date)
+
+            visitor = self._fetch_visitor(cursor, visitor_id)
             conn.commit()
-            return cursor.lastrowid
-        finally:
-            conn.close()
+
+        # 선택 횟수 (옵션 목록 정렬용)는 트랜잭션 밖에서 모아서 반영
+        self.selection_counter.increment({
+            'companies': company, 'positions': position, 'locations': visit_location,
+            'visit_purposes': visit_purpose, 'managers': manager})
+        return visitor
+
+    def _count_daily_visit(self, cursor, date, company, visit_purpose, visit_location, manager):
+        cursor.execute('''
+            INSERT INTO daily_company_stats (date, company, visit_count, open_count)
+            VALUES (?, ?, 1, 1)
+            ON CONFLICT (date, company) DO UPDATE SET
+                visit_count = visit_count + 1,
+                open_count = open_count + 1
+        ''', (date, company))
+
+        values = {'visit_purpose': visit_purpose, 'visit_location': visit_location,
+                  'manager': manager}
+        for table, column in ROLLUP_DIMENSIONS:
+            cursor.execute(f'''
+                INSERT INTO {table} (date, {column}, visit_count)
+                VALUES (?, ?, 1)
+                ON CONFLICT (date, {column}) DO UPDATE SET visit_count = visit_count + 1
+            ''', (date, values[column]))
+
+    def _refresh_company_day(self, cursor, visitor_id):
+        """퇴실/퇴실 누락 처리 후 해당 방문일·업체의 집계만 다시 계산"""
+        cursor.execute('SELECT date, company FROM visitors WHERE id = ?', (visitor_id,))
+        row = cursor.fetchone()
+        if row:
+            self._refresh_company_rollup(cursor, *row)
+
+    def _refresh_company_rollup(self, cursor, visit_date, company):
+        cursor.execute(COMPANY_ROLLUP_SQL.format(source='visitors',
+                                                 where='WHERE date = ? AND company = ?'),
+                       (visit_date, company))
+
+    def _touch_period(self, cursor, visit_date):
+        """visit_date가 속한 월의 데이터 버전을 올린다 (쓰기와 같은 트랜잭션에서 호출)"""
+        cursor.execute('''
+            INSERT INTO period_versions (month, version) VALUES (?, 1)
+            ON CONFLICT (month) DO UPDATE SET version = version + 1
+        ''', (visit_date[:7],))
+
+    def _fetch_visitor(self, cursor, visitor_id):
+        cursor.execute(f'SELECT {VISITOR_COLUMNS} FROM visitors WHERE id = ?', (visitor_id,))
+        row = cursor.fetchone()
+        return Visitor(*row) if row else None
 
     def check_out_visitor(self, visitor_id):
-        conn = self.get_connection()
-        try:
+        with self.connection() as conn:
             cursor = conn.cursor()
             check_out_time = datetime.now().strftime('%H:%M:%S')
-            cursor.execute('''
+            cursor.execute(f'''
                 UPDATE visitors 
-                SET check_out_time = ? 
-                WHERE id = ?
-            ''', (check_out_time, visitor_id))
+                SET check_out_time = :check_out_time,
+                    duration_seconds = CASE WHEN status = 'NORMAL'
+                        THEN {duration_sql(':check_out_time')}
+                    END
+                WHERE id = :visitor_id
+            ''', {'check_out_time': check_out_time, 'visitor_id': visitor_id})
+            self._refresh_company_day(cursor, visitor_id)
+            visitor = self._fetch_visitor(cursor, visitor_id)
+            if visitor:
+                # 전날 방문자의 늦은 퇴실이면 지난달 내보내기 파일도 무효화된다
+                self._touch_period(cursor, visitor.date)
             conn.commit()
-        finally:
-            conn.close()
+            return visitor
 
     def get_current_visitors(self):
-        conn = self.get_connection()
-        try:
+        # 자정이 지난 미퇴실자 처리는 스케줄러(sweep_missed_checkouts)가 담당
+        with self.connection() as conn:
             cursor = conn.cursor()
             today = datetime.now().strftime('%Y-%m-%d')
             
-            # 자정이 지난 미퇴실자 자동 처리
-            self.auto_checkout_previous_day()
-            
             # 오늘 날짜의 방문자만 조회
-            cursor.execute('''
-                SELECT * FROM visitors 
+            cursor.row_factory = Visitor.from_row
+            cursor.execute(f'''
+                SELECT {VISITOR_COLUMNS} FROM visitors
                 WHERE date = ? 
                 ORDER BY check_in_time DESC
             ''', (today,))
             return cursor.fetchall()
-        finally:
-            conn.close()
 
-    def auto_checkout_previous_day(self):
-        """자정이 지난 전날 미퇴실자 자동 처리"""
-        conn = self.get_connection()
-        try:
+    def sweep_missed_checkouts(self, today=None):
+        """오늘 이전 날짜의 미퇴실자를 한 트랜잭션에서 모두 퇴실 누락 처리
+
+        BEGIN IMMEDIATE로 쓰기 잠금을 먼저 잡고 check_out_time IS NULL인 행만
+        갱신하므로 여러 워커가 동시에 실행해도 한 번만 처리된다.
+        처리한 방문자의 (id, date) 목록을 돌려준다.
+        """
+        now = datetime.now()
+        today = today or now.strftime('%Y-%m-%d')
+        checkout_date = now.strftime('%Y-%m-%d')
+        checkout_time = now.strftime('%H:%M:%S')
+
+        with self.connection() as conn:
             cursor = conn.cursor()
-            yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
-            
-            # 전날 미퇴실자 조회
+            cursor.execute('BEGIN IMMEDIATE')
             cursor.execute('''
-                SELECT id, date 
-                FROM visitors 
-                WHERE date = ? 
+                SELECT id, date, company
+                FROM visitors
+                WHERE date < ?
                 AND check_out_time IS NULL
-            ''', (yesterday,))
-            
+            ''', (today,))
             missed_visitors = cursor.fetchall()
-            
-            # 각 미퇴실자에 대해 자동 퇴실 처리
-            for visitor in missed_visitors:
-                self.add_missed_checkout(
-                    visitor_id=visitor[0],
-                    original_date=visitor[1],
-                    reason='자동 퇴실 처리 (자정)'
-                )
-            
+            if not missed_visitors:
+                conn.rollback()
+                return []
+
+            cursor.executemany('''
+                UPDATE visitors
+                SET check_out_time = ?,
+                    status = 'MISSED',
+                    duration_seconds = NULL
+                WHERE id = ?
+            ''', [(checkout_time, visitor_id) for visitor_id, _, _ in missed_visitors])
+            cursor.executemany('''
+                INSERT INTO missed_checkouts
+                (visitor_id, original_date, checkout_date, reason)
+                VALUES (?, ?, ?, ?)
+            ''', [(visitor_id, visit_date, checkout_date, MISSED_CHECKOUT_REASON)
+                  for visitor_id, visit_date, _ in missed_visitors])
+
+            for visit_date, company in {(v[1], v[2]) for v in missed_visitors}:
+                self._refresh_company_rollup(cursor, visit_date, company)
+            for month in {v[1][:7] for v in missed_visitors}:
+                self._touch_period(cursor, month)
+
             conn.commit()
-        finally:
-            conn.close()
+            return [(visitor_id, visit_date) for visitor_id, visit_date, _ in missed_visitors]
+
+    def auto_checkout_previous_day(self):
+        """자정이 지난 미퇴실자 자동 처리 (sweep_missed_checkouts 사용)"""
+        return self.sweep_missed_checkouts()
 
     def get_visitors_by_date(self, date):
-        """특정 날짜의 방문 기록 조회 (이력 조회용)"""
-        conn = self.get_connection()
-        try:
+        """특정 날짜의 방문 기록 조회 (이력 조회용, 보관된 날짜면 보관 파일에서)"""
+        next_day = (datetime.strptime(date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+        with self.connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT * FROM visitors 
+            cursor.row_factory = Visitor.from_row
+            cursor.execute(f'''
+                SELECT {VISITOR_COLUMNS} FROM {self._visitors(conn, date, next_day)}
                 WHERE date = ? 
                 ORDER BY check_in_time DESC
             ''', (date,))
             return cursor.fetchall()
-        finally:
-            conn.close()
 
     def get_visitors_by_month(self, year, month):
-        conn = self.get_connection()
-        try:
+        start, end = month_range(year, month)
+        return self.get_visitors_in_range(start, end)
+
+    def get_visitors_in_range(self, start, end, limit=None, after=None):
+        """[start, end) 기간의 방문 기록 (최신순)
+
+        after에 이전 페이지 마지막 행의 (date, check_in_time, id)를 넘기면
+        그 다음 행부터 limit개를 돌려준다 (keyset 페이지네이션).
+        """
+        query = '''
+            SELECT {columns} FROM {visitors}
+            WHERE date >= ? AND date < ?
+        '''
+        params = [start, end]
+        if after:
+            query += ' AND (date, check_in_time, id) < (?, ?, ?)'
+            params.extend(after)
+        query += ' ORDER BY date DESC, check_in_time DESC, id DESC'
+        if limit is not None:
+            if limit < 1:
+                raise ValueError(f"limit must be at least 1: {limit}")
+            query += ' LIMIT ?'
+            params.append(limit)
+
+        with self.connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT * FROM visitors 
-                WHERE strftime('%Y', date) = ? AND strftime('%m', date) = ?
-                ORDER BY date DESC, check_in_time DESC
-            ''', (str(year), str(month).zfill(2)))
+            cursor.row_factory = Visitor.from_row
+            cursor.execute(query.format(columns=VISITOR_COLUMNS,
+                                        visitors=self._visitors(conn, start, end)), params)
             return cursor.fetchall()
-        finally:
-            conn.close()
 
     def get_company_analytics(self):
-        conn = self.get_connection()
-        try:
+        """업체별 방문 통계 (방문 수, 현재 방문자, 총 체류시간, 최장 체류자)
+
+        일별 집계 테이블만 읽는다. 원본 기록으로 계산한 결과는
+        get_company_analytics_raw 참고.
+        """
+        with self.connection() as conn:
             cursor = conn.cursor()
             current_date = datetime.now().strftime('%Y-%m-%d')
-            
+
             cursor.execute('''
+                WITH stats AS (
+                    SELECT
+                        company,
+                        SUM(visit_count) as visit_count,
+                        SUM(CASE WHEN date = ? THEN open_count ELSE 0 END) as current_visitors,
+                        SUM(total_duration) as total_duration,
+                        MAX(longest_duration) as longest_duration
+                    FROM daily_company_stats
+                    GROUP BY company
+                ),
+                longest AS (
+                    SELECT d.company, MIN(d.longest_visitor_id) as visitor_id
+                    FROM stats s
+                    JOIN daily_company_stats d
+                        ON d.company = s.company AND d.longest_duration = s.longest_duration
+                    GROUP BY d.company
+                )
+                SELECT
+                    s.company,
+                    s.visit_count,
+                    s.current_visitors,
+                    s.total_duration,
+                    d.longest_name as longest_visitor_name,
+                    d.longest_position as longest_visitor_position,
+                    s.longest_duration
+                FROM stats s
+                LEFT JOIN longest l ON l.company = s.company
+                LEFT JOIN daily_company_stats d
+                    ON d.company = l.company AND d.longest_visitor_id = l.visitor_id
+                ORDER BY s.visit_count DESC
+            ''', (current_date,))
+
+            return cursor.fetchall()
+
+    def get_company_analytics_raw(self):
+        """원본 방문 기록으로 계산한 업체별 방문 통계 (집계 테이블 검증용)
+
+        체류시간은 퇴실 시 duration_seconds에 저장해두므로 다시 계산하지 않는다.
+        visitors를 한 번 집계한 뒤, 업체별 최장 체류자는 (company, duration_seconds)
+        인덱스 조회로 찾는다 (동률이면 먼저 등록된 방문자). 보관 파일도 포함한다.
+        """
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            current_date = datetime.now().strftime('%Y-%m-%d')
+            visitors = self._visitors(conn)
+            
+            cursor.execute(f'''
+                WITH stats AS (
+                    SELECT 
+                        company,
+                        COUNT(*) as visit_count,
+                        SUM(CASE WHEN date = ? AND check_out_time IS NULL THEN 1 ELSE 0 END) as current_visitors,
+                        COALESCE(SUM(duration_seconds), 0) as total_duration,
+                        MAX(duration_seconds) as longest_duration
+                    FROM {visitors}
+                    GROUP BY company
+                ),
+                longest AS (
+                    SELECT v.company, MIN(v.id) as visitor_id
+                    FROM stats s
+                    JOIN {visitors} v
+                        ON v.company = s.company AND v.duration_seconds = s.longest_duration
+                    GROUP BY v.company
+                )
                 SELECT 
-                    company,
-                    COUNT(*) as visit_count,
-                    SUM(CASE WHEN date = ? AND check_out_time IS NULL THEN 1 ELSE 0 END) as current_visitors,
-                    SUM(CASE 
-                        WHEN check_out_time IS NOT NULL 
-                        AND status = 'NORMAL'  -- 정상 퇴실인 경우만 포함
-                        THEN (
-                            strftime('%s', date || ' ' || check_out_time) - 
-                            strftime('%s', date || ' ' || check_in_time)
-                        )
-                        ELSE 0 
-                    END) as total_duration,
-                    (
-                        SELECT name 
-                        FROM visitors v2 
-                        WHERE v2.company = v1.company 
-                        AND v2.check_out_time IS NOT NULL
-                        AND v2.status = 'NORMAL'  -- 정상 퇴실인 경우만 포함
-                        ORDER BY (
-                            strftime('%s', v2.date || ' ' || v2.check_out_time) - 
-                            strftime('%s', v2.date || ' ' || v2.check_in_time)
-                        ) DESC LIMIT 1
-                    ) as longest_visitor_name,
-                    (
-                        SELECT position 
-                        FROM visitors v2 
-                        WHERE v2.company = v1.company 
-                        AND v2.check_out_time IS NOT NULL
-                        AND v2.status = 'NORMAL'  -- 정상 퇴실인 경우만 포함
-                        ORDER BY (
-                            strftime('%s', v2.date || ' ' || v2.check_out_time) - 
-                            strftime('%s', v2.date || ' ' || v2.check_in_time)
-                        ) DESC LIMIT 1
-                    ) as longest_visitor_position,
-                    (
-                        SELECT MAX(
-                            strftime('%s', date || ' ' || check_out_time) - 
-                            strftime('%s', date || ' ' || check_in_time)
-                        )
-                        FROM visitors v2 
-                        WHERE v2.company = v1.company 
-                        AND v2.check_out_time IS NOT NULL
-                        AND v2.status = 'NORMAL'  -- 정상 퇴실인 경우만 포함
-                    ) as longest_duration
-                FROM visitors v1
-                GROUP BY company
-                ORDER BY visit_count DESC
+                    s.company,
+                    s.visit_count,
+                    s.current_visitors,
+                    s.total_duration,
+                    v.name as longest_visitor_name,
+                    v.position as longest_visitor_position,
+                    s.longest_duration
+                FROM stats s
+                LEFT JOIN longest l ON l.company = s.company
+                LEFT JOIN {visitors} v ON v.id = l.visitor_id
+                ORDER BY s.visit_count DESC
             ''', (current_date,))
             
             return cursor.fetchall()
-        finally:
-            conn.close()
 
     def get_purpose_ranking(self):
-        conn = self.get_connection()
-        try:
+        with self.connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT 
                     visit_purpose,
-                    COUNT(*) as visit_count
-                FROM visitors
+                    SUM(visit_count) as visit_count
+                FROM daily_purpose_stats
                 GROUP BY visit_purpose
                 ORDER BY visit_count DESC
                 LIMIT 5
             ''')
             return cursor.fetchall()
-        finally:
-            conn.close()
 
-    def get_companies(self):
-        conn = self.get_connection()
-        try:
+    def get_company_stats(self):
+        return self._rollup_totals('daily_company_stats', 'company')
+
+    def get_location_stats(self):
+        return self._rollup_totals('daily_location_stats', 'visit_location')
+
+    def get_manager_stats(self):
+        return self._rollup_totals('daily_manager_stats', 'manager')
+
+    def _rollup_totals(self, table, column):
+        with self.connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT name 
-                FROM companies 
-                ORDER BY selection_count DESC, name ASC
+            cursor.execute(f'''
+                SELECT {column}, SUM(visit_count) as visit_count
+                FROM {table}
+                GROUP BY {column}
+                ORDER BY visit_count DESC
             ''')
-            return [row[0] for row in cursor.fetchall()]
-        finally:
-            conn.close()
+            return cursor.fetchall()
 
-    def get_positions(self):
-        conn = self.get_connection()
-        try:
+    def rebuild_rollups(self):
+        with self.connection() as conn:
+            # 열리지 않은 보관 파일이 있으면 그 연도 집계가 사라지므로 다시 만들지 않는다
+            missing = self.archive.missing(conn)
+            if missing:
+                raise sqlite3.OperationalError(f"Archive files are not attached for years: {missing}")
             cursor = conn.cursor()
-            cursor.execute('SELECT title FROM positions ORDER BY selection_count DESC')
-            return [row[0] for row in cursor.fetchall()]
-        finally:
-            conn.close()
+            cursor.execute('BEGIN IMMEDIATE')
+            _rebuild_rollups(cursor, self._visitors(conn))
+            conn.commit()
+
+    def verify_rollups(self):
+        """집계 테이블과 원본 방문 기록을 비교해 어긋난 항목 목록을 돌려준다"""
+        mismatches = []
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            expected = {row[0]: row for row in self.get_company_analytics_raw()}
+            actual = {row[0]: row for row in self.get_company_analytics()}
+            for company in sorted(expected.keys() | actual.keys()):
+                if expected.get(company) != actual.get(company):
+                    mismatches.append(('daily_company_stats', company,
+                                       expected.get(company), actual.get(company)))
+
+            for table, column in ROLLUP_DIMENSIONS:
+                cursor.execute(f'''
+                    SELECT {column}, COUNT(*) FROM {self._visitors(conn)} GROUP BY {column}
+                ''')
+                expected = dict(cursor.fetchall())
+                actual = dict(self._rollup_totals(table, column))
+                for key in sorted(expected.keys() | actual.keys()):
+                    if expected.get(key) != actual.get(key):
+                        mismatches.append((table, key, expected.get(key), actual.get(key)))
+        return mismatches
+
+    def get_companies(self):
+        return self.get_ranked_options('companies')
+
+    def get_positions(self):
+        return self.get_ranked_options('positions')
 
     def get_locations(self):
-        conn = self.get_connection()
-        try:
+        return self.get_ranked_options('locations')
+
+    def get_ranked_options(self, table):
+        """선택 횟수(아직 반영 안 된 증가분 포함) 내림차순, 같으면 이름순 옵션 목록"""
+        field = SELECTION_COUNT_COLUMNS[table]
+        with self.connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('SELECT name FROM locations ORDER BY selection_count DESC')
-            return [row[0] for row in cursor.fetchall()]
-        finally:
-            conn.close()
+            cursor.execute(f'SELECT {field}, selection_count FROM {table} ORDER BY {field}')
+            rows = cursor.fetchall()
+        pending = self.selection_counter.pending(table)
+        rows.sort(key=lambda row: -((row[1] or 0) + pending.get(row[0], 0)))
+        return [row[0] for row in rows]
+
+    def apply_selection_counts(self, deltas):
+        """{(테이블, 값): 증가분}을 한 트랜잭션으로 반영"""
+        by_table = {}
+        for (table, value), amount in deltas.items():
+            by_table.setdefault(table, []).append((amount, value))
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            for table, params in by_table.items():
+                field = SELECTION_COUNT_COLUMNS[table]
+                cursor.executemany(f'''
+                    UPDATE {table}
+                    SET selection_count = selection_count + ?
+                    WHERE {field} = ?
+                ''', params)
+            conn.commit()
 
     def get_departments(self):
-        conn = self.get_connection()
-        try:
+        with self.connection() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT id, name FROM departments ORDER BY name')
             departments = [(row[0], row[1]) for row in cursor.fetchall()]
-            print("Departments from DB:", departments)  # 부서 데이터 확인
+            logger.debug("Departments from DB: %s", departments)
             return departments
-        finally:
-            conn.close()
 
     def get_managers_by_department(self, dept_id):
-        conn = self.get_connection()
-        try:
+        with self.connection() as conn:
             cursor = conn.cursor()
-            print(f"Searching for managers with department_id: {dept_id}")  # 검색하는 부서 ID 확인
-            
+            logger.debug("Searching for managers with department_id: %s", dept_id)
+            if logger.isEnabledFor(logging.DEBUG):
+                # 디버그 로그용 조회는 DEBUG일 때만 실행
+                cursor.execute('''
+                    SELECT m.*, d.name as dept_name
+                    FROM managers m
+                    LEFT JOIN departments d ON m.department_id = d.id
+                    WHERE m.department_id = ?
+                ''', (dept_id,))
+                logger.debug("Raw query results: %s", cursor.fetchall())
+
+            cursor.row_factory = Manager.from_row
             cursor.execute('''
-                SELECT m.*, d.name as dept_name
+                SELECT m.name, m.position, d.name
                 FROM managers m
                 LEFT JOIN departments d ON m.department_id = d.id
                 WHERE m.department_id = ?
-            ''', (dept_id,))
-            all_results = cursor.fetchall()
-            print(f"Raw query results: {all_results}")  # 쿼리 결과 확인
-
-            cursor.execute('''
-                SELECT name, position 
-                FROM managers 
-                WHERE department_id = ?
-                ORDER BY name
+                ORDER BY m.name
             ''', (dept_id,))
             managers = cursor.fetchall()
-            print(f"Formatted managers: {managers}")  # 최종 결과 확인
+            logger.debug("Formatted managers: %s", managers)
             return managers
-        finally:
-            conn.close()
+
+    def get_manager_tree(self):
+        """{부서 id: [Manager, ...]} (부서별 이름순)"""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT m.department_id, m.name, m.position, d.name
+                FROM managers m
+                JOIN departments d ON m.department_id = d.id
+                ORDER BY m.department_id, m.name
+            ''')
+            tree = {}
+            for dept_id, name, position, department in cursor.fetchall():
+                tree.setdefault(dept_id, []).append(Manager(name, position, department))
+            return tree
 
     def search_managers(self, query):
-        conn = self.get_connection()
-        try:
+        with self.connection() as conn:
             cursor = conn.cursor()
+            cursor.row_factory = Manager.from_row
             cursor.execute('''
                 SELECT m.name, m.position, d.name as department
                 FROM managers m
@@ -457,63 +1320,58 @@ class VisitorDB:
                 ORDER BY m.selection_count DESC
             ''', (f'%{query}%',))
             return cursor.fetchall()
-        finally:
-            conn.close()
 
-    def get_visitor_history(self, company, name):
-        conn = self.get_connection()
-        try:
+    def get_manager_entries(self):
+        """자동 완성 인덱스용 (id, name, position, department, selection_count)"""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT m.id, m.name, m.position, d.name, m.selection_count
+                FROM managers m
+                LEFT JOIN departments d ON m.department_id = d.id
+            ''')
+            return cursor.fetchall()
+
+    def get_visitor_history_entries(self):
+        """자동 완성 인덱스용 (company, name, position, contact, last_visit_date, visit_count)"""
+        with self.connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                SELECT position, contact
+                SELECT company, name, position, contact, last_visit_date, visit_count
+                FROM visitor_history
+            ''')
+            return cursor.fetchall()
+
+    def get_visitor_history(self, company, name):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = VisitorHistory.from_row
+            cursor.execute(f'''
+                SELECT {VisitorHistory.select()}
                 FROM visitor_history
                 WHERE company = ? AND name = ?
-                ORDER BY last_visit_date DESC
-                LIMIT 1
             ''', (company, name))
             return cursor.fetchone()
-        finally:
-            conn.close()
 
     def update_selection_count(self, table, field, value):
-        conn = self.get_connection()
-        try:
-            cursor = conn.cursor()
-            cursor.execute(f'''
-                UPDATE {table}
-                SET selection_count = selection_count + 1
-                WHERE {field} = ?
-            ''', (value,))
-            conn.commit()
-        finally:
-            conn.close()
+        # 테이블/컬럼 이름은 SQL에 그대로 들어가므로 허용 목록만 받는다
+        if SELECTION_COUNT_COLUMNS.get(table) != field:
+            raise ValueError(f"Unknown selection count field: {table}.{field}")
+        self.selection_counter.increment({table: value})
 
     def update_visitor_history(self, company, name, position, contact):
-        conn = self.get_connection()
-        try:
+        with self.connection() as conn:
             cursor = conn.cursor()
             current_date = datetime.now().strftime('%Y-%m-%d')
-            cursor.execute('''
-                INSERT OR REPLACE INTO visitor_history 
-                (company, name, position, contact, last_visit_date)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (company, name, position, contact, current_date))
+            cursor.execute(VISITOR_HISTORY_UPSERT_SQL,
+                           (company, name, position, contact, current_date))
             conn.commit()
-        finally:
-            conn.close()
 
     def get_visit_purposes(self):
-        conn = self.get_connection()
-        try:
-            cursor = conn.cursor()
-            cursor.execute('SELECT purpose FROM visit_purposes ORDER BY selection_count DESC')
-            return [row[0] for row in cursor.fetchall()]
-        finally:
-            conn.close()
+        return self.get_ranked_options('visit_purposes')
 
     def add_company(self, name):
-        conn = self.get_connection()
-        try:
+        with self.connection() as conn:
             cursor = conn.cursor()
             # 중복 체크
             cursor.execute('SELECT name FROM companies WHERE name = ?', (name,))
@@ -524,16 +1382,13 @@ class VisitorDB:
             cursor.execute('INSERT INTO companies (name, selection_count) VALUES (?, 0)', (name,))
             conn.commit()
             return True, "업체가 추가되었습니다."
-        finally:
-            conn.close()
 
     # 퇴실 누락 처리 메서드 추가
     def add_missed_checkout(self, visitor_id, original_date, reason='auto_checkout'):
         if not visitor_id:
             raise ValueError("visitor_id is required")
         
-        conn = self.get_connection()
-        try:
+        with self.connection() as conn:
             cursor = conn.cursor()
             checkout_date = datetime.now().strftime('%Y-%m-%d')
             checkout_time = datetime.now().strftime('%H:%M:%S')
@@ -542,7 +1397,8 @@ class VisitorDB:
             cursor.execute('''
                 UPDATE visitors 
                 SET check_out_time = ?,
-                    status = 'MISSED'
+                    status = 'MISSED',
+                    duration_seconds = NULL
                 WHERE id = ?
             ''', (checkout_time, visitor_id))
 
@@ -555,42 +1411,34 @@ class VisitorDB:
                 (visitor_id, original_date, checkout_date, reason)
                 VALUES (?, ?, ?, ?)
             ''', (visitor_id, original_date, checkout_date, reason))
+
+            self._refresh_company_day(cursor, visitor_id)
+            visitor = self._fetch_visitor(cursor, visitor_id)
+            self._touch_period(cursor, visitor.date)
+            if original_date[:7] != visitor.date[:7]:
+                self._touch_period(cursor, original_date)
             
             conn.commit()
-        finally:
-            conn.close()
+            return visitor
 
     # 퇴실 누락 목록 조회
     def get_missed_checkouts(self):
-        conn = self.get_connection()
-        try:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT 
-                    m.id,
-                    v.company,
-                    v.name,
-                    v.position,
-                    v.visit_location,
-                    v.check_in_time,
-                    m.original_date,
-                    m.checkout_date,
-                    m.reason
-                FROM missed_checkouts m
-                JOIN visitors v ON m.visitor_id = v.id
-                ORDER BY m.checkout_date DESC, v.check_in_time DESC
-            ''')
-            return cursor.fetchall()
-        finally:
-            conn.close()
+        return list(self.iter_missed_checkouts())
+
+    def iter_missed_checkouts(self, batch_size=EXPORT_BATCH_SIZE):
+        """전체 퇴실 누락 기록 (처리일 최신순, 배치 단위로 읽음)"""
+        return self._iter_query(lambda conn: f'''
+            SELECT {MISSED_CHECKOUT_COLUMNS}
+            FROM {self._missed_checkouts(conn)}
+            ORDER BY checkout_date DESC, check_in_time DESC
+        ''', (), batch_size, MissedCheckout)
 
     # 이중 입실 체크 메서드 추가
     def check_duplicate_visitor(self, company, name, position):
-        conn = self.get_connection()
-        try:
+        with self.connection() as conn:
             cursor = conn.cursor()
-            # 디버그 로그 추가
-            print(f"Checking duplicate for: company={company}, name={name}, position={position}")
+            logger.debug("Checking duplicate for: company=%s, name=%s, position=%s",
+                         company, name, position)
             
             cursor.execute('''
                 SELECT id, company, name, position, check_in_time 
@@ -607,34 +1455,137 @@ class VisitorDB:
                 position
             ))
             result = cursor.fetchone()
-            print(f"Duplicate check result: {result}")  # 결과 로그
+            logger.debug("Duplicate check result: %s", result)
             return result is not None
-        finally:
-            conn.close()
 
     def get_missed_checkouts_by_month(self, year, month):
-        conn = self.get_connection()
-        try:
+        start, end = month_range(year, month)
+        return self.get_missed_checkouts_in_range(start, end)
+
+    def get_missed_checkouts_in_range(self, start, end):
+        """원래 방문일이 [start, end) 기간인 퇴실 누락 기록"""
+        return list(self.iter_missed_checkouts_in_range(start, end))
+
+    def iter_missed_checkouts_in_range(self, start, end, company=None,
+                                       batch_size=EXPORT_BATCH_SIZE):
+        return self._iter_query(lambda conn: f'''
+            SELECT {MISSED_CHECKOUT_COLUMNS}
+            FROM {self._missed_checkouts(conn, start, end)}
+            WHERE original_date >= ? AND original_date < ?
+            AND (? IS NULL OR company = ?)
+            ORDER BY original_date DESC, check_in_time DESC
+        ''', (start, end, company, company), batch_size, MissedCheckout)
+
+    def iter_visitors_in_range(self, start, end, company=None, batch_size=EXPORT_BATCH_SIZE):
+        """[start, end) 기간의 방문 기록을 최신순으로 batch_size씩 읽어오는 이터레이터"""
+        return self._iter_query(lambda conn: f'''
+            SELECT {VISITOR_COLUMNS} FROM {self._visitors(conn, start, end)}
+            WHERE date >= ? AND date < ?
+            AND (? IS NULL OR company = ?)
+            ORDER BY date DESC, check_in_time DESC, id DESC
+        ''', (start, end, company, company), batch_size, Visitor)
+
+    def _iter_query(self, build_query, params, batch_size, row_class):
+        # 끝까지 읽거나 이터레이터가 닫힐 때까지 커넥션을 빌려둔다
+        # (쿼리는 커넥션에 ATTACH된 보관 파일에 따라 달라지므로 빌린 뒤에 만든다)
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = row_class.from_row
+            cursor.execute(build_query(conn), params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield from rows
+
+    def append_event(self, event_type, data, origin):
+        """이벤트 로그에 한 건 추가하고 전역 이벤트 ID를 돌려준다 (data는 JSON 문자열)"""
+        with self.connection() as conn:
             cursor = conn.cursor()
-            start_date = f"{year}-{month:02d}-01"
-            end_date = f"{year}-{month:02d}-31"  # 31일로 해도 DB에서 알아서 처리
-            
             cursor.execute('''
-                SELECT 
-                    m.id,
-                    v.company,
-                    v.name,
-                    v.position,
-                    v.visit_location,
-                    v.check_in_time,
-                    m.original_date,
-                    m.checkout_date,
-                    m.reason
-                FROM missed_checkouts m
-                JOIN visitors v ON m.visitor_id = v.id
-                WHERE m.original_date BETWEEN ? AND ?
-                ORDER BY m.original_date DESC, v.check_in_time DESC
-            ''', (start_date, end_date))
+                INSERT INTO event_log (type, data, origin, created_at)
+                VALUES (?, ?, ?, ?)
+            ''', (event_type, data, origin, time.time()))
+            conn.commit()
+            return cursor.lastrowid
+
+    def get_events_after(self, after_id, limit=1000):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, type, data, origin FROM event_log
+                WHERE id > ? ORDER BY id LIMIT ?
+            ''', (after_id, limit))
             return cursor.fetchall()
-        finally:
-            conn.close()
+
+    def get_recent_events(self, limit):
+        """최근 limit건을 id 오름차순으로"""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, type, data, origin FROM (
+                    SELECT * FROM event_log ORDER BY id DESC LIMIT ?
+                ) ORDER BY id
+            ''', (limit,))
+            return cursor.fetchall()
+
+    def prune_events(self, keep):
+        """최근 keep건만 남기고 삭제 (AUTOINCREMENT라 삭제 후에도 ID는 재사용되지 않음)"""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                DELETE FROM event_log
+                WHERE id <= (SELECT MAX(id) FROM event_log) - ?
+            ''', (keep,))
+            conn.commit()
+            return cursor.rowcount
+
+    def get_period_versions(self, start, end):
+        """[start, end) 기간에 걸친 월들의 (month, version) 목록 (기록이 없던 월은 빠짐)"""
+        last_month = (date.fromisoformat(end) - timedelta(days=1)).strftime('%Y-%m')
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT month, version FROM period_versions
+                WHERE month BETWEEN ? AND ?
+                ORDER BY month
+            ''', (start[:7], last_month))
+            return cursor.fetchall()
+
+    def create_export_job(self, job_id, cache_key, start, end, company, filename, status):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO export_jobs (id, cache_key, start_date, end_date, company,
+                                         filename, status, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (job_id, cache_key, start, end, company, filename, status, time.time()))
+            conn.commit()
+
+    def update_export_job(self, job_id, status, path=None, error=None):
+        finished_at = time.time() if status in ('done', 'failed') else None
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE export_jobs
+                SET status = ?, path = COALESCE(?, path), error = ?, finished_at = ?
+                WHERE id = ?
+            ''', (status, path, error, finished_at, job_id))
+            conn.commit()
+
+    def get_export_job(self, job_id):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM export_jobs WHERE id = ?', (job_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            return dict(zip([column[0] for column in cursor.description], row))
+
+    def prune_export_jobs(self, before):
+        """created_at이 before(epoch 초)보다 오래된 작업 기록 삭제"""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM export_jobs WHERE created_at < ?', (before,))
+            conn.commit()
+            return cursor.rowcount
@@ -0,0 +1,409 @@
+"""SSE 이벤트 허브: 타입별 변경 이벤트, 증가하는 이벤트 ID, 재연결용 링 버퍼
+
+이벤트 전달은 백엔드가 맡는다 (VISITAPP_EVENT_BACKEND).
+- sqlite (기본): event_log 테이블에 기록하고 각 워커 프로세스가 폴링해서 전달
+- memory: 한 프로세스 안에서만 전달
+
+연결마다 크기가 제한된 버퍼를 두고, 버퍼가 가득 찰 만큼 느린 클라이언트는
+연결을 끊는다 (재연결하면 Last-Event-ID로 링 버퍼에서 이어 받는다).
+WSGI(Flask) 스트림과 asyncio 기반 ASGI 스트림을 모두 지원한다.
+"""
+import asyncio
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from urllib.parse import parse_qs
+
+import fastjson
+
+logger = logging.getLogger(__name__)
+
+# 방문자 목록 변경 이벤트 종류
+# options_changed는 선택 횟수 반영으로 옵션 순서가 바뀐 것 (워커 간 캐시 무효화용)
+EVENT_TYPES = ('checkin', 'checkout', 'missed', 'company_added', 'options_changed')
+
+DEFAULT_CLIENT_BUFFER = 100   # 연결당 대기 이벤트 수
+DEFAULT_HEARTBEAT = 15.0      # 하트비트 주석 전송 간격(초)
+DEFAULT_POLL_INTERVAL = 0.1   # event_log 폴링 간격(초)
+DEFAULT_RETENTION = 10000     # event_log에 남겨둘 최근 이벤트 수
+PRUNE_INTERVAL = 60           # event_log 정리 주기(초)
+
+# 스트림 종료 신호
+_CLOSED = object()
+
+
+class Event:
+    __slots__ = ('id', 'type', 'data', 'origin', 'payload', '_encoded')
+
+    def __init__(self, event_id, event_type, data, origin=None, payload=None):
+        self.id = event_id
+        self.type = event_type
+        self.data = data
+        self.origin = origin  # 이벤트를 발행한 허브 (다른 워커에서 온 이벤트 구분용)
+        self.payload = payload  # 이미 인코딩된 data JSON (event_log에서 읽은 경우)
+        self._encoded = None
+
+    def encode(self):
+        """SSE 형식 bytes (id/event/data)
+
+        연결이 몇 개든 이벤트마다 한 번만 인코딩하고 같은 bytes를 보낸다.
+        """
+        if self._encoded is None:
+            payload = self.payload if self.payload is not None else fastjson.dumps(self.data)
+            self._encoded = b'id: %d\nevent: %s\ndata: %s\n\n' % (self.id, self.type.encode(),
+                                                                    payload)
+        return self._encoded
+
+
+def parse_last_event_id(value):
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+class Subscription:
+    """클라이언트 연결 하나 (연결마다 고유 ID와 크기가 제한된 버퍼)
+
+    loop가 주어지면 asyncio 큐를, 아니면 스레드용 큐를 사용한다.
+    """
+
+    def __init__(self, hub, backlog, reset_id, buffer_size, loop=None):
+        self.id = uuid.uuid4().hex
+        self.hub = hub
+        self.backlog = backlog
+        self.reset_id = reset_id
+        self.loop = loop
+        self.evicted = False
+        if loop:
+            self.queue = asyncio.Queue(maxsize=buffer_size)
+        else:
+            self.queue = queue.Queue(maxsize=buffer_size)
+
+    def offer(self, item):
+        if self.loop:
+            try:
+                self.loop.call_soon_threadsafe(self._put, item)
+            except RuntimeError:
+                # 이벤트 루프가 이미 종료됨
+                self.hub.unsubscribe(self)
+        else:
+            self._put(item)
+
+    def close(self):
+        self.offer(_CLOSED)
+
+    def _put(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except (queue.Full, asyncio.QueueFull):
+            # 느린 클라이언트: 쌓인 이벤트를 버리고 연결 종료
+            self.evicted = True
+            self._drain()
+            self.queue.put_nowait(_CLOSED)
+            self.hub.evict(self)
+
+    def _drain(self):
+        while True:
+            try:
+                self.queue.get_nowait()
+            except (queue.Empty, asyncio.QueueEmpty):
+                return
+
+    def _preamble(self):
+        yield b"retry: 3000\n\n"
+        yield f": connection {self.id}\n\n".encode()
+        if self.backlog is None:
+            # 놓친 이벤트를 알 수 없으면 목록 전체를 다시 읽도록 알림
+            yield f"id: {self.reset_id}\nevent: reset\ndata: {{}}\n\n".encode()
+        else:
+            for event in self.backlog:
+                yield event.encode()
+
+    def stream(self, heartbeat=DEFAULT_HEARTBEAT):
+        """WSGI 응답용 제너레이터 (유휴 시간에는 하트비트 주석 전송)"""
+        try:
+            yield from self._preamble()
+            while True:
+                try:
+                    item = self.queue.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield b": heartbeat\n\n"
+                    continue
+                if item is _CLOSED:
+                    return
+                yield item.encode()
+        finally:
+            self.hub.unsubscribe(self)
+
+    async def stream_async(self, heartbeat=DEFAULT_HEARTBEAT):
+        """ASGI 응답용 비동기 제너레이터"""
+        try:
+            for chunk in self._preamble():
+                yield chunk
+            while True:
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": heartbeat\n\n"
+                    continue
+                if item is _CLOSED:
+                    return
+                yield item.encode()
+        finally:
+            self.hub.unsubscribe(self)
+
+
+class MemoryBackend:
+    """한 프로세스 안에서만 전달 (워커가 하나일 때)"""
+
+    name = 'memory'
+
+    def attach(self, hub):
+        self.hub = hub
+        self._lock = threading.Lock()
+        # 시작 시각(ms)부터 증가하므로 서버를 재시작해도 ID가 줄어들지 않는다
+        self._last_id = int(time.time() * 1000)
+        hub.load_history([], self._last_id)
+
+    def publish(self, event_type, data):
+        with self._lock:
+            self._last_id += 1
+            event = Event(self._last_id, event_type, data, self.hub.origin)
+            self.hub.deliver(event)
+        return event
+
+    def sync(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class SQLiteBackend:
+    """event_log 테이블을 변경 피드로 사용 (같은 DB 파일을 쓰는 모든 워커에 전달)
+
+    이벤트 ID는 event_log.id라서 워커가 달라도 같은 이벤트는 같은 ID를 가진다.
+    자기 프로세스에서 발행한 이벤트는 폴링을 기다리지 않고 바로 읽어온다.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, db, poll_interval=DEFAULT_POLL_INTERVAL, retention=DEFAULT_RETENTION):
+        self.db = db
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._poll_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_seen = 0
+
+    def attach(self, hub):
+        self.hub = hub
+        # 재시작 직후에도 Last-Event-ID로 이어 받을 수 있도록 최근 이벤트를 채워둔다
+        events = [self._event(row) for row in self.db.get_recent_events(hub.history_size)]
+        self._last_seen = events[-1].id if events else 0
+        hub.load_history(events, self._last_seen)
+        self._thread = threading.Thread(target=self._run, name='event-log-poller', daemon=True)
+        self._thread.start()
+
+    def publish(self, event_type, data):
+        payload = fastjson.dumps(data)
+        event_id = self.db.append_event(event_type, payload.decode(), self.hub.origin)
+        self._wake.set()
+        return Event(event_id, event_type, data, self.hub.origin, payload)
+
+    def _event(self, row):
+        # event_log의 JSON 문자열을 SSE data로 그대로 다시 쓴다
+        event_id, event_type, data, origin = row
+        return Event(event_id, event_type, fastjson.loads(data), origin, data.encode())
+
+    def sync(self):
+        """새로 기록된 이벤트를 읽어 허브에 전달하고 건수를 돌려준다"""
+        with self._poll_lock:
+            rows = self.db.get_events_after(self._last_seen)
+            for row in rows:
+                event = self._event(row)
+                self._last_seen = event.id
+                self.hub.deliver(event)
+            return len(rows)
+
+    def _run(self):
+        next_prune = time.monotonic() + PRUNE_INTERVAL
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                self.sync()
+                if time.monotonic() >= next_prune:
+                    self.db.prune_events(self.retention)
+                    next_prune = time.monotonic() + PRUNE_INTERVAL
+            except sqlite3.Error as e:
+                logger.warning("Event log poll error: %s", e)
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+
+
+def backend_from_env(db):
+    name = os.environ.get('VISITAPP_EVENT_BACKEND', SQLiteBackend.name)
+    if name == MemoryBackend.name:
+        return MemoryBackend()
+    if name == SQLiteBackend.name:
+        poll_interval = float(os.environ.get('VISITAPP_EVENT_POLL_INTERVAL',
+                                             DEFAULT_POLL_INTERVAL))
+        return SQLiteBackend(db, poll_interval=poll_interval)
+    raise ValueError(f"Unknown event backend: {name}")
+
+
+class EventHub:
+    """변경 이벤트를 모든 연결에 전달하고 최근 이벤트를 링 버퍼에 보관"""
+
+    def __init__(self, backend=None, history_size=1000, client_buffer=DEFAULT_CLIENT_BUFFER,
+                 heartbeat=DEFAULT_HEARTBEAT):
+        self.history_size = history_size
+        self.client_buffer = client_buffer
+        self.heartbeat = heartbeat
+        self.origin = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._history = deque(maxlen=history_size)
+        self._subscribers = {}
+        self._listeners = []
+        self._last_id = 0
+        self.published = 0
+        self.evictions = 0
+        self.backend = backend or MemoryBackend()
+        self.backend.attach(self)
+
+    @property
+    def last_event_id(self):
+        return self._last_id
+
+    def publish(self, event_type, data):
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f"Unknown event type: {event_type}")
+        return self.backend.publish(event_type, data)
+
+    def load_history(self, events, last_event_id):
+        with self._lock:
+            self._history.extend(events)
+            self._last_id = last_event_id
+
+    def add_listener(self, listener):
+        """전달되는 모든 이벤트마다 listener(event) 호출 (다른 워커의 이벤트 포함)"""
+        self._listeners.append(listener)
+
+    def deliver(self, event):
+        """백엔드가 받은 이벤트를 연결들과 리스너에 전달 (이미 받은 ID는 무시)"""
+        with self._lock:
+            if event.id <= self._last_id:
+                return
+            self._last_id = event.id
+            self._history.append(event)
+            self.published += 1
+            subscribers = list(self._subscribers.values())
+        for subscription in subscribers:
+            subscription.offer(event)
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.exception("Event listener error: %s", e)
+
+    def events_since(self, last_event_id):
+        """last_event_id 이후 이벤트 목록 (링 버퍼에서 이미 밀려났으면 None)"""
+        with self._lock:
+            return self._events_since(last_event_id)
+
+    def _events_since(self, last_event_id):
+        if last_event_id is None or last_event_id == self._last_id:
+            return []
+        if last_event_id > self._last_id:
+            # 다른 서버 인스턴스에서 받은 ID
+            return None
+        if not self._history or self._history[0].id > last_event_id + 1:
+            return None
+        return [event for event in self._history if event.id > last_event_id]
+
+    def subscribe(self, last_event_id=None, loop=None, catch_up=True):
+        if catch_up and last_event_id and last_event_id > self._last_id:
+            # 다른 워커에서 받은 ID일 수 있으니 폴링을 기다리지 않고 따라잡는다
+            self.backend.sync()
+        with self._lock:
+            backlog = self._events_since(last_event_id)
+            subscription = Subscription(self, backlog, self._last_id,
+                                        self.client_buffer, loop=loop)
+            self._subscribers[subscription.id] = subscription
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.pop(subscription.id, None)
+
+    def evict(self, subscription):
+        with self._lock:
+            if self._subscribers.pop(subscription.id, None) is not None:
+                self.evictions += 1
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': self.backend.name,
+                'subscribers': len(self._subscribers),
+                'published': self.published,
+                'evictions': self.evictions,
+                'last_event_id': self._last_id,
+                'history': len(self._history),
+            }
+
+    def close(self):
+        self.backend.stop()
+
+    async def serve_asgi(self, scope, receive, send):
+        """ASGI HTTP 요청을 SSE 스트림으로 처리 (연결당 스레드를 쓰지 않음)"""
+        headers = dict(scope.get('headers') or [])
+        query = parse_qs(scope.get('query_string', b'').decode())
+        last_event_id = parse_last_event_id(headers.get(b'last-event-id', b'').decode()) \
+            or parse_last_event_id((query.get('last_event_id') or [''])[0])
+        loop = asyncio.get_running_loop()
+        if last_event_id and last_event_id > self._last_id:
+            # SQLite 백엔드의 sync()는 DB를 읽으므로 이벤트 루프 밖에서 따라잡는다
+            await loop.run_in_executor(None, self.backend.sync)
+        subscription = self.subscribe(last_event_id, loop=loop, catch_up=False)
+
+        async def watch_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            subscription.close()
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', b'text/event-stream'),
+                    (b'cache-control', b'no-cache'),
+                    (b'x-accel-buffering', b'no'),
+                ],
+            })
+            async for chunk in subscription.stream_async(self.heartbeat):
+                await send({'type': 'http.response.body', 'body': chunk,
+                            'more_body': True})
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            watcher.cancel()
+            self.unsubscribe(subscription)
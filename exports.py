@@ -0,0 +1,293 @@
+"""방문 기록 내보내기 (XLSX, CSV/NDJSON/JSON 스트리밍)
+
+write-only 워크북으로 커서에서 읽은 행을 바로 기록하므로 기간이 길어도
+메모리에 전체 시트를 올리지 않는다. 스타일은 이름 붙은 스타일 두 개를 공유한다.
+lxml이 설치되어 있으면 openpyxl이 XML 기록에 사용한다 (순수 파이썬보다 빠름).
+"""
+import csv
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, NamedStyle, PatternFill
+from openpyxl.utils import get_column_letter
+
+import fastjson
+from rows import MissedCheckout, Visitor
+
+logger = logging.getLogger(__name__)
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+VISITOR_HEADERS = ['날짜', '업체명', '성명', '직급', '연락처', '방문장소',
+                   '방문목적', '입실시간', '퇴실시간', '담당자', '상태']
+MISSED_HEADERS = ['날짜', '업체명', '성명', '직급', '방문장소', '입실시간',
+                  '처리일자', '처리사유']
+
+# write-only 시트는 첫 행보다 열 너비를 먼저 써야 하므로 앞쪽 행만 보고 너비를 정한다
+WIDTH_SAMPLE_ROWS = 1000
+MIN_COLUMN_WIDTH = 10
+
+
+def _named_styles():
+    header = NamedStyle(name='visit_header')
+    header.font = Font(bold=True)
+    header.fill = PatternFill(start_color="CCE5FF", end_color="CCE5FF", fill_type="solid")
+    header.alignment = Alignment(horizontal='center')
+
+    body = NamedStyle(name='visit_body')
+    body.alignment = Alignment(horizontal='center')
+    return header, body
+
+
+def display_width(value):
+    """한글은 1.5칸으로 계산한 표시 너비"""
+    text = str(value)
+    korean = sum(1 for c in text if '가' <= c <= '힣')
+    return len(text) + korean * 0.5
+
+
+def visitor_row(v):
+    status = '정상' if v.check_out_time else '미퇴실'
+    return [v.date, v.company, v.name, v.position, v.contact, v.visit_location,
+            v.visit_purpose, v.check_in_time, v.check_out_time or '-', v.manager, status]
+
+
+def missed_row(m):
+    return [m.original_date, m.company, m.name, m.position, m.visit_location,
+            m.check_in_time, m.checkout_date, m.reason]
+
+
+def write_sheet(wb, title, headers, rows):
+    ws = wb.create_sheet(title=title)
+    rows = iter(rows)
+    sample = list(islice(rows, WIDTH_SAMPLE_ROWS))
+
+    widths = [display_width(header) for header in headers]
+    for row in sample:
+        for col, value in enumerate(row):
+            if value is not None:
+                widths[col] = max(widths[col], display_width(value))
+    for col, width in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(col)].width = max(width + 2, MIN_COLUMN_WIDTH)
+
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.style = 'visit_header'
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    # append 시점에 바로 기록되므로 열마다 셀 하나를 재사용한다
+    cells = [WriteOnlyCell(ws) for _ in headers]
+    for cell in cells:
+        cell.style = 'visit_body'
+    count = 0
+    for row in chain(sample, rows):
+        for cell, value in zip(cells, row):
+            cell.value = value
+        ws.append(cells)
+        count += 1
+    return count
+
+
+def write_visitor_workbook(fileobj, visitors, missed_checkouts):
+    """방문 기록/퇴실 누락 기록 두 시트를 fileobj에 저장 (visitors와 missed_checkouts는 DB 행 이터레이터)"""
+    wb = Workbook(write_only=True)
+    for style in _named_styles():
+        wb.add_named_style(style)
+    write_sheet(wb, "방문 기록", VISITOR_HEADERS, map(visitor_row, visitors))
+    write_sheet(wb, "퇴실 누락 기록", MISSED_HEADERS, map(missed_row, missed_checkouts))
+    wb.save(fileobj)
+
+
+class ExportJobs:
+    """내보내기 작업 큐와 디스크 파일 캐시
+
+    파일 이름은 (기간, 업체) 해시와 해당 월들의 데이터 버전 해시로 정해지므로
+    마감된 달은 한 번 만든 파일을 계속 내려주고, 늦은 퇴실이나 퇴실 누락 처리로
+    그 달의 버전이 바뀌었을 때만 다시 만든다. 작업 상태는 DB(export_jobs)에
+    기록되어 다른 워커 프로세스에서도 조회할 수 있다.
+    """
+
+    def __init__(self, db, directory, workers=2, job_retention=7 * 24 * 3600):
+        self.db = db
+        self.directory = directory
+        self.job_retention = job_retention
+        os.makedirs(directory, exist_ok=True)
+        self.prune()
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix='export')
+        self._lock = threading.Lock()
+        self._building = {}  # cache_key -> Future (같은 파일을 동시에 두 번 만들지 않도록)
+
+    def cache_key(self, start, end, company=None):
+        scope = hashlib.sha1(f"{start}|{end}|{company or ''}".encode()).hexdigest()[:16]
+        versions = self.db.get_period_versions(start, end)
+        stamp = hashlib.sha1(repr(versions).encode()).hexdigest()[:12]
+        return f"{scope}-{stamp}"
+
+    def artifact_path(self, cache_key):
+        return os.path.join(self.directory, f"{cache_key}.xlsx")
+
+    def _build(self, cache_key, start, end, company):
+        path = self.artifact_path(cache_key)
+        if os.path.exists(path):
+            return path
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as fileobj:
+                write_visitor_workbook(fileobj,
+                                       self.db.iter_visitors_in_range(start, end, company),
+                                       self.db.iter_missed_checkouts_in_range(start, end, company))
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        # 같은 기간의 이전 버전 파일 정리
+        scope = cache_key.split('-')[0]
+        for name in os.listdir(self.directory):
+            if name.startswith(scope + '-') and name != os.path.basename(path):
+                try:
+                    os.unlink(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+        return path
+
+    def _schedule(self, cache_key, start, end, company):
+        with self._lock:
+            future = self._building.get(cache_key)
+            if future is None:
+                future = self._executor.submit(self._build, cache_key, start, end, company)
+                self._building[cache_key] = future
+                future.add_done_callback(lambda _: self._forget(cache_key))
+            return future
+
+    def _forget(self, cache_key):
+        with self._lock:
+            self._building.pop(cache_key, None)
+
+    def export(self, start, end, company=None):
+        """캐시된 파일 경로를 돌려주고, 없으면 만들 때까지 기다린다"""
+        cache_key = self.cache_key(start, end, company)
+        path = self.artifact_path(cache_key)
+        if os.path.exists(path):
+            return path
+        return self._schedule(cache_key, start, end, company).result()
+
+    def submit(self, start, end, filename, company=None):
+        """작업을 등록하고 작업 정보를 돌려준다 (캐시된 파일이 있으면 바로 done)"""
+        cache_key = self.cache_key(start, end, company)
+        path = self.artifact_path(cache_key)
+        job_id = uuid.uuid4().hex
+        if os.path.exists(path):
+            self.db.create_export_job(job_id, cache_key, start, end, company, filename, 'done')
+            self.db.update_export_job(job_id, 'done', path=path)
+            return self.get(job_id)
+
+        self.db.create_export_job(job_id, cache_key, start, end, company, filename, 'pending')
+        future = self._schedule(cache_key, start, end, company)
+        future.add_done_callback(lambda f: self._finish(job_id, f))
+        return self.get(job_id)
+
+    def _finish(self, job_id, future):
+        if future.cancelled():
+            # 종료할 때 아직 시작하지 않은 작업은 취소된다
+            logger.warning("Export job %s cancelled", job_id)
+            self.db.update_export_job(job_id, 'failed', error='cancelled')
+            return
+        error = future.exception()
+        if error:
+            logger.error("Export job %s failed: %s", job_id, error)
+            self.db.update_export_job(job_id, 'failed', error=str(error))
+        else:
+            self.db.update_export_job(job_id, 'done', path=future.result())
+
+    def get(self, job_id):
+        job = self.db.get_export_job(job_id)
+        if job and job['status'] == 'done' and not os.path.exists(job['path'] or ''):
+            # 새 버전이 만들어지면서 이전 파일이 정리됨
+            job['status'] = 'expired'
+        return job
+
+    def prune(self):
+        return self.db.prune_export_jobs(time.time() - self.job_retention)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# CSV/NDJSON/JSON 스트리밍 내보내기 (BI 동기화용)
+VISITOR_FIELDS = list(Visitor.COLUMNS)
+MISSED_FIELDS = list(MissedCheckout.COLUMNS)
+
+STREAM_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson',
+                  'json': 'application/json'}
+STREAM_CHUNK_ROWS = 500  # 한 번에 내보내는 행 수
+
+
+def _chunked(rows, size=STREAM_CHUNK_ROWS):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_csv(fields, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for batch in _chunked(rows):
+        writer.writerows([row.values() for row in batch])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_ndjson(fields, rows):
+    # 행 객체는 컬럼 이름을 키로 인코딩된다 (fields는 iter_csv와 인자를 맞추기 위함)
+    for batch in _chunked(rows):
+        yield b''.join([fastjson.dumps(row) + b'\n' for row in batch])
+
+
+def iter_json(fields, rows):
+    # 하나의 JSON 배열을 STREAM_CHUNK_ROWS개씩 나눠 인코딩한다
+    return fastjson.iter_array(rows, STREAM_CHUNK_ROWS)
+
+
+STREAM_WRITERS = {'csv': iter_csv, 'ndjson': iter_ndjson, 'json': iter_json}
+
+
+def iter_gzip(chunks, level=6):
+    """문자열/bytes 청크를 받아 gzip 스트림으로 압축 (전체를 모으지 않고 청크마다 내보냄)"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode() if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_rows(db, dataset, fmt, start, end, company=None):
+    """dataset(visitors|missed-checkouts)의 [start, end) 행을 fmt 청크로 내보내는 제너레이터"""
+    if dataset == 'visitors':
+        fields, rows = VISITOR_FIELDS, db.iter_visitors_in_range(start, end, company)
+    else:
+        fields, rows = MISSED_FIELDS, db.iter_missed_checkouts_in_range(start, end, company)
+    return STREAM_WRITERS[fmt](fields, rows)
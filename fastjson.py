@@ -0,0 +1,125 @@
+"""JSON 인코더 선택: orjson이 설치되어 있으면 쓰고, 없으면 표준 json + rows.dumps
+
+    VISITAPP_JSON=auto(기본)|orjson|stdlib
+
+dumps()는 공백 없는 UTF-8 bytes를 돌려준다. SSE 이벤트, 부트스트랩 스냅샷,
+스트리밍 배열 응답이 모두 이 인코더를 쓰고, 응답용 Flask provider는
+provider_class()로 고른다.
+"""
+import json
+import os
+from decimal import Decimal
+
+import rows
+from rows import Row, RowJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson 미설치 시 표준 json만 사용
+    orjson = None
+
+
+def _default(value):
+    # orjson이 모르는 타입 (행 객체는 데이터클래스라 orjson이 직접 인코딩한다)
+    if isinstance(value, Row):
+        return value.to_dict()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class StdlibEncoder:
+    name = 'stdlib'
+
+    def dumps(self, obj):
+        return rows.dumps(obj, ensure_ascii=False).encode()
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonEncoder:
+    name = 'orjson'
+
+    def dumps(self, obj):
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+def encoder_from_env():
+    name = os.environ.get('VISITAPP_JSON', 'auto')
+    if name == 'auto':
+        return OrjsonEncoder() if orjson is not None else StdlibEncoder()
+    if name == StdlibEncoder.name:
+        return StdlibEncoder()
+    if name == OrjsonEncoder.name:
+        if orjson is None:
+            raise ValueError("VISITAPP_JSON=orjson but orjson is not installed")
+        return OrjsonEncoder()
+    raise ValueError(f"Unknown JSON encoder: {name}")
+
+
+ENCODER = encoder_from_env()
+
+
+def dumps(obj):
+    return ENCODER.dumps(obj)
+
+
+def loads(data):
+    return ENCODER.loads(data)
+
+
+def iter_array(items, batch_size=500):
+    """items를 JSON 배열 bytes 청크로 (batch_size개씩 인코딩, 전체를 모으지 않음)"""
+    yield b'['
+    batch = []
+    first = True
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield (b'' if first else b',') + dumps(batch)[1:-1]
+            batch = []
+            first = False
+    if batch:
+        yield (b'' if first else b',') + dumps(batch)[1:-1]
+    yield b']'
+
+
+class OrjsonProvider(RowJSONProvider):
+    """orjson으로 응답을 만드는 provider (indent 등 orjson에 없는 인자는 표준 json으로)"""
+
+    def _option(self):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self._default, option=self._option()).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def _default(self, value):
+        if isinstance(value, Row):
+            return value.to_dict()
+        return self.default(value)
+
+    def response(self, *args, **kwargs):
+        # str로 바꿨다가 다시 인코딩하지 않고 bytes를 그대로 응답 본문으로 쓴다
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self._default,
+                            option=self._option() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def provider_class():
+    """ENCODER에 맞는 Flask JSON provider 클래스"""
+    return OrjsonProvider if ENCODER.name == OrjsonEncoder.name else RowJSONProvider
@@ -1,22 +1,26 @@
 from flask import Flask, request, jsonify, render_template, send_file, Response, send_from_directory
 from flask_cors import CORS
-from db import VisitorDB
-import csv
-from io import StringIO
-from datetime import datetime
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
-from io import BytesIO
-from openpyxl.utils import get_column_letter
-import json
-import time
-from cachetools import TTLCache, LRUCache
-from collections import defaultdict
-import threading
-from queue import Queue, Empty
+from db import VisitorDB, month_range, period_range
+from datetime import datetime, timedelta
+import logging
+from cache import ReadThroughCache
+from scheduler import DailyJob
+from events import EventHub, backend_from_env
+from autocomplete import Autocomplete
+from bootstrap import build_snapshot
+from conditional import IMMUTABLE, ConditionalJSON, DataVersion
+import metrics
+import fastjson
+from exports import STREAM_FORMATS, XLSX_MIMETYPE, ExportJobs, iter_gzip, stream_rows
 import os
+import atexit
 from werkzeug.middleware.proxy_fix import ProxyFix
 
+# 디버그 로그는 VISITAPP_LOG_LEVEL=DEBUG일 때만 출력
+logging.basicConfig(level=os.environ.get('VISITAPP_LOG_LEVEL', 'INFO').upper(),
+                    format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__, 
            static_url_path='/visit/static',  # static URL 경로
            static_folder='static')           # static 폴더 위치
@@ -26,45 +30,138 @@ app.wsgi_app = ProxyFix(app.wsgi_app)
 
 CORS(app)
 db = VisitorDB()
-
-# 디버그 로그 추가
-print(f"Database initialized at: {db.db_path}")
-print(f"Static URL path: {app.static_url_path}")
-print(f"Static folder: {app.static_folder}")
-
-# 더 큰 캐시와 긴 TTL
-visitors_cache = TTLCache(maxsize=100, ttl=5)  # 5초 TTL
-analytics_cache = LRUCache(maxsize=50)  # LRU 캐시 추가
-
-# 클라이언트 연결 관리
-clients = defaultdict(list)
-client_lock = threading.Lock()
-
-def notify_clients(data):
-    with client_lock:
-        for client_list in clients.values():
-            for client in client_list:
-                client.put(data)
-
-def adjust_column_width(worksheet):
-    for column in worksheet.columns:
-        max_length = 0
-        column_letter = get_column_letter(column[0].column)
-        
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-            
-            # 한글 문자 길이 보정
-            korean_char_count = sum(1 for c in str(cell.value) if ord('가') <= ord(c) <= ord('힣'))
-            max_length += korean_char_count * 0.5
-        
-        # 최소 너비 설정
-        adjusted_width = max(max_length + 2, 10)
-        worksheet.column_dimensions[column_letter].width = adjusted_width
+atexit.register(db.close)  # 종료 시 커넥션 풀 정리
+
+# 방문 기록/퇴실 누락/담당자 행은 키가 있는 JSON 객체로 내보낸다 (orjson이 있으면 orjson)
+app.json_provider_class = fastjson.provider_class()
+app.json = app.json_provider_class(app)
+logger.info("JSON encoder: %s", fastjson.ENCODER.name)
+
+# 라우트/DB 메서드별 지연 계측 (GET /metrics, 느린 호출은 경고 로그)
+metrics.instrument_db(db)
+metrics.instrument_app(app)
+
+logger.info("Database initialized at: %s", db.db_path)
+logger.debug("Static URL path: %s", app.static_url_path)
+logger.debug("Static folder: %s", app.static_folder)
+
+# 읽기 캐시 (TTL 없이 쓰기 경로에서 무효화)
+visitors_cache = ReadThroughCache('current_visitors', maxsize=4)
+analytics_cache = ReadThroughCache('analytics', maxsize=50)
+options_cache = ReadThroughCache('options', maxsize=50)
+
+def invalidate_caches(*caches):
+    for cache in caches:
+        cache.invalidate()
+
+def today_str():
+    return datetime.now().strftime('%Y-%m-%d')
+
+# 자정이 지난 미퇴실자 자동 처리 (하루 한 번, 시작 시 밀린 건 처리)
+def run_missed_checkout_sweep():
+    missed = db.sweep_missed_checkouts()
+    if missed:
+        logger.info("Auto checkout processed %d missed visitors", len(missed))
+        invalidate_caches(visitors_cache, analytics_cache)
+        publish_change('missed', {'ids': [visitor_id for visitor_id, _ in missed]})
+    return missed
+
+# 실시간 알림 (SSE): 변경된 방문자만 이벤트로 전달
+# 연결마다 버퍼를 제한하고 느린 클라이언트는 끊는다 (ASGI 서버는 asgi.py 참고)
+# 기본 백엔드는 event_log 테이블이라 다른 워커 프로세스의 변경도 전달된다
+hub = EventHub(backend_from_env(db))
+atexit.register(hub.close)
+
+def invalidate_on_remote_event(event):
+    """다른 워커에서 일어난 변경이면 이 워커의 캐시를 비운다"""
+    if event.origin == hub.origin:
+        return
+    if event.type in ('company_added', 'options_changed'):
+        invalidate_caches(options_cache)
+    else:
+        invalidate_caches(visitors_cache, analytics_cache)
+
+hub.add_listener(invalidate_on_remote_event)
+
+# 조회 API의 ETag는 데이터 버전으로 만든다 (쓰기 경로와 다른 워커의 이벤트가 올림)
+data_version = DataVersion(hub.last_event_id)
+conditional = ConditionalJSON(data_version)
+
+def bump_data_version(event):
+    data_version.bump(event.id)
+
+hub.add_listener(bump_data_version)
+
+def publish_change(event_type, data):
+    """변경 알림을 보내고 데이터 버전을 바로 올린다
+
+    SQLite 백엔드는 이벤트를 폴링 스레드가 전달하므로, 리스너만 기다리면
+    쓰기 직후의 조회가 이전 ETag로 304를 받을 수 있다.
+    """
+    event = hub.publish(event_type, data)
+    data_version.bump(event.id)
+    return event
+
+# 옵션 목록 순서(선택 횟수)는 입실마다가 아니라 모아둔 증가분을 반영할 때 바뀐다
+# (부트스트랩 스냅샷과 ETag도 그때만 다시 만든다)
+def on_selection_flush():
+    invalidate_caches(options_cache)
+    publish_change('options_changed', {})
+
+db.selection_counter.on_flush = on_selection_flush
+
+# 담당자 검색/방문자 히스토리는 메모리 인덱스에서 조회 (입실 이벤트로 갱신)
+autocomplete = Autocomplete(db)
+
+def update_autocomplete(event):
+    if event.type == 'checkin':
+        autocomplete.record_visit(event.data)
+
+hub.add_listener(update_autocomplete)
+
+# 엑셀 내보내기: 요청 스레드 밖에서 만들고 월별 데이터 버전이 같으면 만든 파일을 재사용
+export_jobs = ExportJobs(
+    db,
+    os.environ.get('VISITAPP_EXPORT_DIR',
+                   os.path.join(os.path.dirname(os.path.abspath(db.db_path)), 'exports')),
+    workers=int(os.environ.get('VISITAPP_EXPORT_WORKERS', 2)))
+atexit.register(export_jobs.shutdown)
+
+def replace_cached_visitor(visitor):
+    """캐시된 오늘 목록에서 같은 id의 방문자를 바뀐 행으로 교체"""
+    visitors_cache.update(today_str(), lambda cached: [
+        visitor if v.id == visitor.id else v for v in cached
+    ])
+
+# 기간 조회 페이지 크기
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+def parse_date_range(args):
+    """요청 인자에서 [start, end) 반개구간을 만든다
+
+    - from/to: 시작일과 종료일 (종료일 포함)
+    - period=week|month|quarter|year, date=기준일 (기본 오늘)
+    """
+    if 'from' in args or 'to' in args:
+        start = datetime.strptime(args['from'], '%Y-%m-%d').date()
+        end = datetime.strptime(args['to'], '%Y-%m-%d').date() + timedelta(days=1)
+        if end <= start:
+            raise ValueError('종료일이 시작일보다 빠릅니다.')
+        return start.isoformat(), end.isoformat()
+
+    day = datetime.strptime(args['date'], '%Y-%m-%d').date() if 'date' in args \
+        else datetime.now().date()
+    return period_range(args.get('period', 'day'), day)
+
+def encode_page_cursor(visitor):
+    # (date, check_in_time, id) 기준 keyset 커서
+    return f"{visitor.date}_{visitor.check_in_time}_{visitor.id}"
+
+def decode_page_cursor(cursor):
+    visit_date, check_in_time, visitor_id = cursor.split('_')
+    datetime.strptime(f"{visit_date} {check_in_time}", '%Y-%m-%d %H:%M:%S')
+    return visit_date, check_in_time, int(visitor_id)
 
 # URL prefix 처리를 위한 함수
 def get_prefix():
@@ -72,7 +169,7 @@ def get_prefix():
 
 @app.route('/')
 def index():
-    print(f"Serving index page from {get_prefix()}")  # 디버그 로그
+    logger.debug("Serving index page from %s", get_prefix())
     return render_template('index.html')
 
 @app.route('/api/visitors', methods=['POST'])
@@ -92,9 +189,9 @@ def add_visitor():
                 'message': f'{field} 필드가 필요합니다.'
             }), 400
 
-    print(f"Received visitor data: {data}")  # 디버그 로그
+    logger.debug("Received visitor data: %s", data)
     
-    visitor_id = db.add_visitor(
+    visitor = db.check_in(
         company=data['company'],
         name=data['name'],
         position=data['position'],
@@ -104,211 +201,290 @@ def add_visitor():
         manager=data['manager']
     )
     
-    if visitor_id == -1:
-        print("Duplicate visitor rejected")  # 거부 로그
+    if visitor is None:
+        logger.info("Duplicate visitor rejected")
         return jsonify({
             'status': 'error',
             'message': '이미 입실한 방문자입니다.'
         }), 400
     
-    print(f"Visitor added successfully with id: {visitor_id}")  # 성공 로그
-    visitors = db.get_current_visitors()
-    update_visitors(visitors)  # 변경 시에만 알림
+    visitor_id = visitor.id
+    logger.debug("Visitor added successfully with id: %s", visitor_id)
+    # 옵션 목록 순서는 선택 횟수를 반영할 때 갱신된다 (on_selection_flush)
+    invalidate_caches(analytics_cache)
+    # 캐시된 오늘 목록에 새 방문자를 추가하고, 새 행만 알림
+    visitors_cache.update(today_str(), lambda cached: [visitor] + cached)
+    publish_change('checkin', visitor.to_dict())
     return jsonify({'id': visitor_id}), 201
 
+@app.route('/api/visitors', methods=['GET'])
+@conditional
+def get_visitors_in_range():
+    try:
+        start, end = parse_date_range(request.args)
+        limit = min(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), MAX_PAGE_SIZE)
+        cursor = request.args.get('cursor')
+        after = decode_page_cursor(cursor) if cursor else None
+    except (KeyError, ValueError):
+        return jsonify({'error': '잘못된 조회 기간입니다.'}), 400
+    if limit < 1:
+        # 0이나 음수면 LIMIT 없이 기간 전체를 읽게 되므로 받지 않는다
+        return jsonify({'error': '페이지 크기는 1 이상이어야 합니다.'}), 400
+
+    visitors = db.get_visitors_in_range(start, end, limit=limit, after=after)
+    next_cursor = encode_page_cursor(visitors[-1]) if len(visitors) == limit else None
+    return jsonify({
+        'from': start,
+        'to': (datetime.strptime(end, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d'),
+        'visitors': visitors,
+        'next_cursor': next_cursor
+    })
+
 @app.route('/api/visitors/<int:visitor_id>/checkout', methods=['POST'])
 def checkout_visitor(visitor_id):
-    db.check_out_visitor(visitor_id)
+    visitor = db.check_out_visitor(visitor_id)
+    if visitor:
+        invalidate_caches(analytics_cache)
+        replace_cached_visitor(visitor)
+        publish_change('checkout', visitor.to_dict())
     return jsonify({'status': 'success'}), 200
 
 @app.route('/api/current-visitors', methods=['GET'])
+@conditional
 def get_current_visitors():
     try:
-        visitors = db.get_current_visitors()
-        print(f"Retrieved visitors: {visitors}")  # 디버그 로그
+        visitors = get_cached_visitors()
+        logger.debug("Retrieved visitors: %s", visitors)
         return jsonify(visitors)
     except Exception as e:
-        print(f"Error getting visitors: {e}")  # 에러 로그
+        logger.exception("Error getting visitors: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/stats/managers', methods=['GET'])
+@conditional
 def get_manager_stats():
-    stats = db.get_manager_stats()
+    stats = analytics_cache.get('manager_stats', db.get_manager_stats)
     return jsonify(stats)
 
 @app.route('/api/stats/companies', methods=['GET'])
+@conditional
 def get_company_stats():
-    stats = db.get_company_stats()
+    stats = analytics_cache.get('company_stats', db.get_company_stats)
+    return jsonify(stats)
+
+@app.route('/api/stats/locations', methods=['GET'])
+@conditional
+def get_location_stats():
+    stats = analytics_cache.get('location_stats', db.get_location_stats)
     return jsonify(stats)
 
 @app.route('/api/visitors/<date>', methods=['GET'])
+@conditional
 def get_visitors_by_date(date):
     try:
         # 날짜 형식 검증
         datetime.strptime(date, '%Y-%m-%d')
         visitors = db.get_visitors_by_date(date)
-        print(f"Retrieved visitors for {date}: {visitors}")  # 디버그 로그
-        return jsonify(visitors)
+        logger.debug("Retrieved visitors for %s: %s", date, visitors)
+        response = jsonify(visitors)
+        # 지난 날짜는 모두 퇴실 처리되면(자정 자동 퇴실 포함) 더 바뀌지 않는다
+        # 빈 목록은 데이터를 옮기는 중이거나 보관 파일을 못 연 것일 수 있어 제외한다
+        if (visitors and date < today_str() and all(v.check_out_time for v in visitors)
+                and db.is_archive_attached(date)):
+            response.headers['Cache-Control'] = IMMUTABLE
+        return response
     except ValueError:
         return jsonify({'error': '잘못된 날짜 형식입니다.'}), 400
     except Exception as e:
-        print(f"Error getting visitors for {date}: {e}")  # 에러 로그
+        logger.exception("Error getting visitors for %s: %s", date, e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/export/<int:year>/<int:month>', methods=['GET'])
 def export_excel(year, month):
-    visitors = db.get_visitors_by_month(year, month)
-    missed_checkouts = db.get_missed_checkouts_by_month(year, month)
-    
-    wb = Workbook()
-    
-    # 방문 기록 시트
-    ws1 = wb.active
-    ws1.title = "방문 기록"
-    
-    # 헤더 스타일
-    header_font = Font(bold=True)
-    header_fill = PatternFill(start_color="CCE5FF", end_color="CCE5FF", fill_type="solid")
-    
-    # 방문 기록 헤더
-    headers = ['날짜', '업체명', '성명', '직급', '연락처', '방문장소', 
-              '방문목적', '입실시간', '퇴실시간', '담당자', '상태']
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws1.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center')
-    
-    # 방문 기록 데이터
-    for row, v in enumerate(visitors, 2):
-        status = '정상' if v[9] else '미퇴실'
-        data = [v[1], v[2], v[3], v[4], v[5], v[6], v[7], v[8], 
-                v[9] or '-', v[10], status]
-        for col, value in enumerate(data, 1):
-            cell = ws1.cell(row=row, column=col, value=value)
-            cell.alignment = Alignment(horizontal='center')
-    
-    # 열 너비 자동 조정
-    adjust_column_width(ws1)
-    
-    # 퇴실 누락 기록 시트
-    ws2 = wb.create_sheet(title="퇴실 누락 기록")
-    
-    # 퇴실 누락 헤더
-    missed_headers = ['날짜', '업체명', '성명', '직급', '방문장소', '입실시간', 
-                     '처리일자', '처리사유']
-    
-    for col, header in enumerate(missed_headers, 1):
-        cell = ws2.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center')
-    
-    # 퇴실 누락 데이터
-    for row, m in enumerate(missed_checkouts, 2):
-        data = [m[6], m[1], m[2], m[3], m[4], m[5], m[7], m[8]]
-        for col, value in enumerate(data, 1):
-            cell = ws2.cell(row=row, column=col, value=value)
-            cell.alignment = Alignment(horizontal='center')
-    
-    # 열 너비 자동 조정
-    adjust_column_width(ws2)
-    
-    # 파일 저장
-    excel_file = BytesIO()
-    wb.save(excel_file)
-    excel_file.seek(0)
-    
+    start, end = month_range(year, month)
     return send_file(
-        excel_file,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        export_jobs.export(start, end),
+        mimetype=XLSX_MIMETYPE,
         as_attachment=True,
         download_name=f'방문기록_{year}_{month}.xlsx'
     )
 
+@app.route('/api/export/<any(visitors, "missed-checkouts"):dataset>.<any(csv, ndjson, json):fmt>',
+           methods=['GET'])
+def stream_export(dataset, fmt):
+    # 기간은 /api/visitors와 같은 방식 (from/to 또는 period+date), company는 선택
+    try:
+        start, end = parse_date_range(request.args)
+    except (KeyError, ValueError):
+        return jsonify({'error': '잘못된 조회 기간입니다.'}), 400
+
+    chunks = stream_rows(db, dataset, fmt, start, end, request.args.get('company') or None)
+    last_day = (datetime.strptime(end, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+    headers = {'Content-Disposition': f'attachment; filename={dataset}_{start}_{last_day}.{fmt}'}
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        chunks = iter_gzip(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    headers['Vary'] = 'Accept-Encoding'
+    return Response(chunks, mimetype=STREAM_FORMATS[fmt], headers=headers)
+
+def export_job_response(job):
+    return {
+        'id': job['id'],
+        'status': job['status'],
+        'from': job['start_date'],
+        'to': (datetime.strptime(job['end_date'], '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d'),
+        'company': job['company'],
+        'error': job['error'],
+        'download_url': f"{get_prefix()}/api/exports/{job['id']}/download"
+                        if job['status'] == 'done' else None
+    }
+
+@app.route('/api/exports', methods=['POST'])
+def submit_export():
+    # 기간은 /api/visitors와 같은 방식 (from/to 또는 period+date), company는 선택
+    data = request.get_json(silent=True) or {}
+    try:
+        start, end = parse_date_range(data)
+    except (KeyError, ValueError):
+        return jsonify({'error': '잘못된 조회 기간입니다.'}), 400
+
+    company = data.get('company') or None
+    last_day = (datetime.strptime(end, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+    filename = f"방문기록_{start}_{last_day}" + (f"_{company}" if company else '') + '.xlsx'
+    job = export_jobs.submit(start, end, filename, company=company)
+    return jsonify(export_job_response(job)), 200 if job['status'] == 'done' else 202
+
+@app.route('/api/exports/<job_id>', methods=['GET'])
+def get_export_job(job_id):
+    job = export_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': '내보내기 작업을 찾을 수 없습니다.'}), 404
+    return jsonify(export_job_response(job))
+
+@app.route('/api/exports/<job_id>/download', methods=['GET'])
+def download_export(job_id):
+    job = export_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': '내보내기 작업을 찾을 수 없습니다.'}), 404
+    if job['status'] != 'done':
+        return jsonify(export_job_response(job)), 409
+    return send_file(job['path'], mimetype=XLSX_MIMETYPE, as_attachment=True,
+                     download_name=job['filename'])
+
 @app.route('/api/analytics/companies', methods=['GET'])
+@conditional
 def get_company_analytics():
-    analytics = db.get_company_analytics()
+    # 현재 방문자 수가 포함되므로 날짜별로 캐시
+    analytics = analytics_cache.get(('companies', today_str()), db.get_company_analytics)
     return jsonify(analytics)
 
 @app.route('/api/analytics/purposes', methods=['GET'])
+@conditional
 def get_purpose_ranking():
-    ranking = db.get_purpose_ranking()
+    ranking = analytics_cache.get('purposes', db.get_purpose_ranking)
     return jsonify(ranking)
 
+@app.route('/api/bootstrap', methods=['GET'])
+def get_bootstrap():
+    # 옵션 목록 전체를 한 응답으로 (옵션이 바뀌어 options_cache가 비워질 때만 다시 만든다)
+    snapshot = options_cache.get('bootstrap', lambda: build_snapshot(db))
+    response = Response(snapshot.body, mimetype='application/json',
+                        headers={'Cache-Control': 'no-cache'})
+    response.set_etag(snapshot.etag)
+    return response.make_conditional(request)
+
 @app.route('/api/options/companies', methods=['GET'])
+@conditional
 def get_companies():
     try:
-        companies = db.get_companies()
-        print(f"Companies API response: {companies}")  # 디버그 로그
+        companies = options_cache.get('companies', db.get_companies)
+        logger.debug("Companies API response: %s", companies)
         return jsonify(companies)
     except Exception as e:
-        print(f"Error in companies API: {str(e)}")  # 에러 로그
+        logger.exception("Error in companies API: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/options/positions', methods=['GET'])
+@conditional
 def get_positions():
-    return jsonify(db.get_positions())
+    return jsonify(options_cache.get('positions', db.get_positions))
 
 @app.route('/api/options/locations', methods=['GET'])
+@conditional
 def get_locations():
-    return jsonify(db.get_locations())
+    return jsonify(options_cache.get('locations', db.get_locations))
 
 @app.route('/api/options/departments', methods=['GET'])
+@conditional
 def get_departments():
-    departments = db.get_departments()
-    print("Departments:", departments)
+    departments = options_cache.get('departments', db.get_departments)
+    logger.debug("Departments: %s", departments)
     return jsonify(departments)
 
 @app.route('/api/managers/search', methods=['GET'])
 def search_managers():
     query = request.args.get('q', '')
-    return jsonify(db.search_managers(query))
+    return jsonify(autocomplete.search_managers(query))
 
 @app.route('/api/managers/department/<int:dept_id>', methods=['GET'])
+@conditional
 def get_managers_by_department(dept_id):
-    managers = db.get_managers_by_department(dept_id)
-    print(f"Managers for department {dept_id}:", managers)
+    managers = options_cache.get(('managers', dept_id),
+                                 lambda: db.get_managers_by_department(dept_id))
+    logger.debug("Managers for department %s: %s", dept_id, managers)
     return jsonify(managers)
 
 @app.route('/api/visitor-history', methods=['GET'])
 def get_visitor_history():
     company = request.args.get('company')
     name = request.args.get('name')
-    return jsonify(db.get_visitor_history(company, name))
+    return jsonify(autocomplete.visitor_history(company, name))
+
+@app.route('/api/visitor-history/suggest', methods=['GET'])
+def suggest_visitors():
+    # 이름 일부나 초성으로 이전 방문자 찾기 (company를 주면 그 업체만)
+    query = request.args.get('q', '')
+    limit = min(request.args.get('limit', 10, type=int), 50)
+    return jsonify(autocomplete.suggest_visitors(query, request.args.get('company'), limit))
 
 @app.route('/api/options/purposes', methods=['GET'])
+@conditional
 def get_visit_purposes():
-    return jsonify(db.get_visit_purposes())
+    return jsonify(options_cache.get('purposes', db.get_visit_purposes))
 
 @app.route('/api/options/companies', methods=['POST'])
 def add_company():
     data = request.json
     success, message = db.add_company(data['name'])
     if success:
+        invalidate_caches(options_cache)
+        publish_change('company_added', {'name': data['name']})
         return jsonify({'status': 'success', 'message': message}), 201
     else:
         return jsonify({'status': 'error', 'message': message}), 400
 
 @app.route('/api/missed-checkouts', methods=['GET'])
+@conditional
 def get_missed_checkouts():
-    return jsonify(db.get_missed_checkouts())
+    # 기간 제한이 없는 목록이라 행을 모으지 않고 배열을 나눠 인코딩하며 보낸다
+    return Response(fastjson.iter_array(db.iter_missed_checkouts()), mimetype='application/json')
 
 @app.route('/api/visitors/<int:visitor_id>/missed-checkout', methods=['POST'])
 def mark_missed_checkout(visitor_id):
     data = request.json
-    db.add_missed_checkout(visitor_id, data['original_date'], data['reason'])
+    visitor = db.add_missed_checkout(visitor_id, data['original_date'], data['reason'])
+    invalidate_caches(analytics_cache)
+    replace_cached_visitor(visitor)
+    publish_change('missed', {'ids': [visitor.id], 'check_out_time': visitor.check_out_time})
     return jsonify({'status': 'success'}), 200
 
 @app.route('/api/visitors/check-duplicate', methods=['POST'])
 def check_duplicate_visitor():
     data = request.json
-    print(f"Checking duplicate for: {data}")  # 디버그 로그
+    logger.debug("Checking duplicate for: %s", data)
     
     # 기존 방문자 조회
-    conn = db.get_connection()
-    try:
+    with db.connection() as conn:
         cursor = conn.cursor()
         cursor.execute('''
             SELECT id, company, name, position, check_in_time 
@@ -339,55 +515,59 @@ def check_duplicate_visitor():
             })
         
         return jsonify({'isDuplicate': False})
-        
-    finally:
-        conn.close()
 
 @app.route('/mobile-register')
 def mobile_register():
-    print(f"Serving mobile register page from {get_prefix()}")  # 디버그 로그
+    logger.debug("Serving mobile register page from %s", get_prefix())
     return render_template('mobile-register.html')
 
 @app.route('/qr')
 def qr_code():
     mobile_url = request.host_url.rstrip('/') + url_for('mobile_register')
-    print(f"QR code URL: {mobile_url}")  # 디버그 로그
+    logger.debug("QR code URL: %s", mobile_url)
     return render_template('qr.html', mobile_url=mobile_url)
 
 @app.route('/api/sse')
 def sse():
-    client_id = request.remote_addr
-    queue = Queue()
-    
-    with client_lock:
-        clients[client_id].append(queue)
-    
-    def generate():
-        try:
-            while True:
-                data = queue.get(timeout=30)  # 30초 타임아웃
-                yield f"data: {data}\n\n"
-        except Empty:
-            pass
-        finally:
-            with client_lock:
-                clients[client_id].remove(queue)
-                if not clients[client_id]:
-                    del clients[client_id]
-    
-    return Response(generate(), mimetype='text/event-stream')
-
-# 데이터 변경 시에만 알림
-def update_visitors(visitor_data):
-    data = json.dumps(visitor_data)
-    notify_clients(data)
+    # 마지막으로 받은 이벤트 ID (브라우저 자동 재연결은 헤더, 직접 재연결은 쿼리로 전달)
+    last_event_id = request.headers.get('Last-Event-ID', type=int) \
+        or request.args.get('last_event_id', type=int)
+    subscription = hub.subscribe(last_event_id)
+    # 유휴 연결은 하트비트 주석으로 유지 (프록시 버퍼링 비활성화)
+    return Response(subscription.stream(hub.heartbeat), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/sse/stats')
+def sse_stats():
+    return jsonify(hub.stats())
 
 def get_cached_visitors():
-    cache_key = 'current_visitors'
-    if cache_key not in visitors_cache:
-        visitors = db.get_current_visitors()
-        visitors_cache[cache_key] = visitors
-    return visitors_cache[cache_key]
+    # 날짜가 바뀌면 키도 바뀌므로 자정 이후 첫 요청은 DB에서 다시 읽는다
+    return visitors_cache.get(today_str(), db.get_current_visitors)
+
+@app.route('/api/cache-stats')
+def cache_stats():
+    stats = {cache.name: cache.stats()
+             for cache in (visitors_cache, analytics_cache, options_cache)}
+    stats['conditional'] = conditional.stats()
+    return jsonify(stats)
+
+metrics.REGISTRY.gauge('visitapp_db_pool_connections', 'Open and idle pooled connections',
+                       lambda: {(state,): db.pool_stats()[state] for state in ('open', 'idle')},
+                       ['state'])
+metrics.REGISTRY.gauge('visitapp_cache_hit_ratio', 'Read cache hit ratio',
+                       lambda: {(cache.name,): cache.stats()['hit_ratio']
+                                for cache in (visitors_cache, analytics_cache, options_cache)},
+                       ['cache'])
+metrics.REGISTRY.gauge('visitapp_sse_subscribers', 'Connected SSE clients', hub.subscriber_count)
+metrics.REGISTRY.gauge('visitapp_data_version', 'Data version used for ETags',
+                       lambda: data_version.value)
+metrics.REGISTRY.gauge('visitapp_selection_counts_pending', 'Selection count increments not yet flushed',
+                       lambda: db.selection_counter.stats()['pending'])
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.REGISTRY.render(), content_type=metrics.PROMETHEUS_CONTENT_TYPE)
 
 # 이미지 파일 서빙을 위한 라우트 추가
 @app.route('/static/images/<path:filename>')
@@ -398,24 +578,24 @@ def serve_image(filename):
 def test_db():
     try:
         # 데이터베이스 연결 테스트
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        
-        # 테이블 존재 확인
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = cursor.fetchall()
-        
-        # 방문자 수 확인
-        cursor.execute("SELECT COUNT(*) FROM visitors")
-        visitor_count = cursor.fetchone()[0]
-        
-        conn.close()
+        with db.connection() as conn:
+            cursor = conn.cursor()
+            
+            # 테이블 존재 확인
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+            tables = cursor.fetchall()
+            
+            # 방문자 수 확인
+            cursor.execute("SELECT COUNT(*) FROM visitors")
+            visitor_count = cursor.fetchone()[0]
         
         return jsonify({
             'status': 'success',
             'tables': tables,
             'visitor_count': visitor_count,
-            'db_path': db.db_path
+            'db_path': db.db_path,
+            'pool': db.pool_stats(),
+            'selection_counter': db.selection_counter.stats()
         })
     except Exception as e:
         return jsonify({
@@ -433,23 +613,21 @@ def serve_static(filename):
 def test_db_connection():
     try:
         # 데이터베이스 파일 존재 확인
-        print(f"DB Path: {db.db_path}")
-        print(f"DB File exists: {os.path.exists(db.db_path)}")
+        logger.debug("DB Path: %s", db.db_path)
+        logger.debug("DB File exists: %s", os.path.exists(db.db_path))
         
         # 테이블 목록 조회
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = cursor.fetchall()
-        
-        # 각 테이블의 레코드 수 확인
-        table_counts = {}
-        for table in tables:
-            cursor.execute(f"SELECT COUNT(*) FROM {table[0]}")
-            count = cursor.fetchone()[0]
-            table_counts[table[0]] = count
-        
-        conn.close()
+        with db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+            tables = cursor.fetchall()
+            
+            # 각 테이블의 레코드 수 확인
+            table_counts = {}
+            for table in tables:
+                cursor.execute(f"SELECT COUNT(*) FROM {table[0]}")
+                count = cursor.fetchone()[0]
+                table_counts[table[0]] = count
         
         return jsonify({
             'status': 'success',
@@ -464,5 +642,12 @@ def test_db_connection():
             'db_path': db.db_path
         }), 500
 
+# 시작 직후 밀린 건을 바로 처리하므로 hub/publish_change/리스너가 모두 준비된 뒤에 시작한다
+# 별도 cron으로 `python manage.py sweep-missed-checkouts`를 돌린다면 VISITAPP_SCHEDULER=0
+if os.environ.get('VISITAPP_SCHEDULER', '1') != '0':
+    sweep_job = DailyJob('missed-checkout-sweep', run_missed_checkout_sweep)
+    sweep_job.start()
+    atexit.register(sweep_job.stop)
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,104 @@
+"""방문자 DB 관리 명령
+
+    python manage.py rebuild-rollups   # 일별 집계 테이블 재생성 후 검증
+    python manage.py verify-rollups    # 집계 테이블과 원본 기록 비교
+    python manage.py sweep-missed-checkouts  # 지난 날짜 미퇴실자 퇴실 누락 처리 (cron용)
+    python manage.py archive [--before YYYY-MM | --keep-months N] [--dry-run] [--vacuum]
+                                       # 마감된 달을 연도별 보관 파일로 옮김
+    python manage.py verify-archive    # 보관 파일과 카탈로그, hot DB 비교
+"""
+import argparse
+import sys
+
+import archive
+from db import VisitorDB
+
+
+def print_mismatches(mismatches):
+    for table, key, expected, actual in mismatches[:20]:
+        print(f"  {table} [{key}]: expected={expected} actual={actual}")
+    if len(mismatches) > 20:
+        print(f"  ... 외 {len(mismatches) - 20}건")
+
+
+def rebuild_rollups(db, args):
+    db.rebuild_rollups()
+    print("일별 집계 테이블을 다시 만들었습니다.")
+    return verify_rollups(db, args)
+
+
+def verify_rollups(db, args):
+    mismatches = db.verify_rollups()
+    if mismatches:
+        print(f"집계 불일치 {len(mismatches)}건")
+        print_mismatches(mismatches)
+        return 1
+    print("집계 테이블이 원본 기록과 일치합니다.")
+    return 0
+
+
+def sweep_missed_checkouts(db, args):
+    missed = db.sweep_missed_checkouts()
+    print(f"퇴실 누락 처리: {len(missed)}명")
+    return 0
+
+
+def archive_months(db, args):
+    before = f'{args.before}-01' if args.before else archive.archive_cutoff(keep_months=args.keep_months)
+    results = archive.archive_months(db, before, dry_run=args.dry_run)
+    if not results:
+        print(f"{before} 전에 보관할 기록이 없습니다.")
+        return 0
+    for year, moved, path in results:
+        action = '보관 예정' if args.dry_run else '보관'
+        print(f"{year}년: {moved}건 {action} -> {path}")
+    if args.dry_run:
+        return 0
+    if args.vacuum:
+        archive.vacuum(db)
+        print("hot DB를 VACUUM했습니다.")
+    return verify_archive(db, args)
+
+
+def verify_archive(db, args):
+    problems = archive.verify(db)
+    if problems:
+        print(f"보관 파일 문제 {len(problems)}건")
+        for year, problem in problems:
+            print(f"  {year}: {problem}")
+        return 1
+    print("보관 파일이 카탈로그와 일치합니다.")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='방문자 DB 관리 명령')
+    parser.add_argument('--db', help='DB 파일 경로 (기본: VISITAPP_DB_PATH)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('rebuild-rollups', help='일별 집계 테이블 재생성 후 검증') \
+        .set_defaults(handler=rebuild_rollups)
+    commands.add_parser('verify-rollups', help='집계 테이블과 원본 기록 비교') \
+        .set_defaults(handler=verify_rollups)
+    commands.add_parser('sweep-missed-checkouts', help='지난 날짜 미퇴실자 퇴실 누락 처리') \
+        .set_defaults(handler=sweep_missed_checkouts)
+    archive_parser = commands.add_parser('archive', help='마감된 달을 연도별 보관 파일로 옮김')
+    archive_parser.add_argument('--before', metavar='YYYY-MM',
+                                help='이 달 전까지 보관 (기본: 최근 --keep-months개월은 남김)')
+    archive_parser.add_argument('--keep-months', type=int, default=archive.DEFAULT_KEEP_MONTHS,
+                                help=f'hot DB에 남길 개월 수 (기본 {archive.DEFAULT_KEEP_MONTHS})')
+    archive_parser.add_argument('--dry-run', action='store_true', help='옮기지 않고 대상만 출력')
+    archive_parser.add_argument('--vacuum', action='store_true', help='보관 후 hot DB VACUUM')
+    archive_parser.set_defaults(handler=archive_months)
+    commands.add_parser('verify-archive', help='보관 파일과 카탈로그, hot DB 비교') \
+        .set_defaults(handler=verify_archive)
+
+    args = parser.parse_args(argv)
+    db = VisitorDB(args.db, checkpoint_interval=0)
+    try:
+        return args.handler(db, args)
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""요청/DB 지연 계측과 Prometheus 텍스트 형식 내보내기
+
+    metrics.instrument_db(db)    # VisitorDB 공개 메서드마다 시간/반환 행 수
+    metrics.instrument_app(app)  # 라우트별 응답 시간, JSON 직렬화 시간
+
+GET /metrics가 REGISTRY.render()를 돌려준다. DB 메서드가
+VISITAPP_SLOW_QUERY_MS(기본 200ms)보다 오래 걸리면 경고 로그를 남긴다.
+"""
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, has_request_context, request
+
+logger = logging.getLogger(__name__)
+
+# 초 단위 (rows는 ROW_BUCKETS)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                   2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+DEFAULT_SLOW_QUERY_MS = 200
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join('{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                     for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # 라벨 값 -> [버킷별 개수..., 합계, 개수]
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                le = _format_labels(self.labelnames + ('le',), labels + (_format_value(bound),))
+                yield f"{self.name}_bucket{le} {cumulative}"
+            le = _format_labels(self.labelnames + ('le',), labels + ('+Inf',))
+            yield f"{self.name}_bucket{le} {values[-1]}"
+            label_text = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {_format_value(float(values[-2]))}"
+            yield f"{self.name}_count{label_text} {values[-1]}"
+
+
+class Gauge:
+    """렌더링할 때 fn()을 불러 값을 읽는다 (fn은 숫자나 {라벨 값 튜플: 숫자})"""
+
+    def __init__(self, name, documentation, fn, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+        try:
+            value = self.fn()
+        except Exception as e:
+            logger.warning("Gauge %s failed: %s", self.name, e)
+            return
+        values = value.items() if isinstance(value, dict) else [((), value)]
+        for labels, number in sorted(values):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(number)}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, *args, **kwargs):
+        return self.register(Histogram(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs):
+        return self.register(Gauge(*args, **kwargs))
+
+    def render(self):
+        return '\n'.join(line for metric in self._metrics for line in metric.collect()) + '\n'
+
+
+REGISTRY = Registry()
+
+DB_SECONDS = REGISTRY.histogram('visitapp_db_call_seconds', 'VisitorDB method duration',
+                                ['method'])
+DB_ROWS = REGISTRY.histogram('visitapp_db_rows_returned', 'Rows returned by VisitorDB methods',
+                             ['method'], buckets=ROW_BUCKETS)
+REQUEST_SECONDS = REGISTRY.histogram('visitapp_request_seconds', 'HTTP request duration',
+                                     ['method', 'route', 'status'])
+SERIALIZE_SECONDS = REGISTRY.histogram('visitapp_json_serialize_seconds',
+                                       'JSON encoding time per response', ['route'])
+
+
+def _row_count(result):
+    if result is None:
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    return 1
+
+
+def _current_route():
+    if has_request_context() and request.url_rule is not None:
+        return request.url_rule.rule
+    return ''
+
+
+class _Timer:
+    """메서드 하나의 시간/행 수 기록과 느린 호출 로그"""
+
+    def __init__(self, name, slow_seconds):
+        self.name = name
+        self.slow_seconds = slow_seconds
+
+    def done(self, started, rows, args):
+        self.record(time.perf_counter() - started, rows, args)
+
+    def record(self, elapsed, rows, args):
+        DB_SECONDS.observe(elapsed, self.name)
+        DB_ROWS.observe(rows, self.name)
+        if elapsed >= self.slow_seconds:
+            logger.warning("Slow query %s took %.1f ms (%d rows) args=%.200r route=%s",
+                           self.name, elapsed * 1000, rows, args, _current_route())
+
+
+def _timed_iter(iterator, timer, elapsed, args):
+    """이터레이터를 다 읽거나 닫을 때까지의 행 수와 시간을 기록
+
+    내보내기 응답처럼 소비자가 느릴 수 있으므로 next() 안에서 쓴 시간만 더한다.
+    """
+    rows = 0
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                row = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed += time.perf_counter() - started
+            rows += 1
+            yield row
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            close()  # 중간에 닫히면 빌린 커넥션을 바로 돌려주도록
+        timer.record(elapsed, rows, args)
+
+
+def _wrap_method(method, timer):
+    # 제너레이터(제너레이터 함수나 _iter_query가 돌려준 것)는 다 읽을 때까지의 시간과
+    # 내보낸 행 수를 잰다
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        rows = 0
+        generator = False
+        try:
+            result = method(*args, **kwargs)
+            if inspect.isgenerator(result):
+                generator = True
+                return _timed_iter(result, timer, time.perf_counter() - started, args)
+            rows = _row_count(result)
+            return result
+        finally:
+            if not generator:
+                timer.done(started, rows, args)
+    return wrapper
+
+
+# 커넥션 관리/통계용 메서드는 계측하지 않는다
+SKIP_DB_METHODS = {'connection', 'close', 'pool_stats'}
+
+
+def instrument_db(db, slow_query_ms=None):
+    """db 인스턴스의 공개 메서드를 계측 래퍼로 바꾼다"""
+    if slow_query_ms is None:
+        slow_query_ms = float(os.environ.get('VISITAPP_SLOW_QUERY_MS', DEFAULT_SLOW_QUERY_MS))
+    for name, method in inspect.getmembers(db, inspect.ismethod):
+        if name.startswith('_') or name in SKIP_DB_METHODS:
+            continue
+        setattr(db, name, _wrap_method(method, _Timer(name, slow_query_ms / 1000)))
+    return db
+
+
+def timed_provider(provider_class):
+    """provider_class의 응답 인코딩(jsonify) 시간을 라우트별로 기록하는 하위 클래스
+
+    provider에 따라 response()가 dumps()를 거치지 않으므로 response()를 잰다.
+    """
+
+    class TimedJSONProvider(provider_class):
+        def response(self, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return super().response(*args, **kwargs)
+            finally:
+                SERIALIZE_SECONDS.observe(time.perf_counter() - started, _current_route())
+
+    TimedJSONProvider.__name__ = f'Timed{provider_class.__name__}'
+    return TimedJSONProvider
+
+
+def instrument_app(app):
+    """라우트별 응답 시간과 JSON 직렬화 시간을 기록 (JSON provider를 정한 뒤에 호출)"""
+    app.json_provider_class = timed_provider(app.json_provider_class)
+    app.json = app.json_provider_class(app)
+
+    @app.before_request
+    def start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.teardown_request
+    def observe_request(exc=None):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        status = getattr(g, 'metrics_status', 500 if exc else 0)
+        REQUEST_SECONDS.observe(time.perf_counter() - started, request.method, route, status)
+
+    @app.after_request
+    def remember_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    return app
@@ -0,0 +1,162 @@
+"""방문 기록/퇴실 누락/담당자/방문자 히스토리 행 객체와 키가 있는 JSON 직렬화
+
+DB에서 읽은 행은 __slots__ 데이터클래스로 만든다 (행마다 __dict__가 없어 가볍다).
+SELECT 컬럼 목록은 클래스의 컬럼 정의에서 만들고, 커서의 row_factory로
+바로 행 객체를 만든다.
+
+    cursor.row_factory = Visitor.from_row
+    cursor.execute(f'SELECT {Visitor.select()} FROM visitors WHERE date = ?', ...)
+
+dumps()는 행 객체를 중간 dict 없이 {"id":1,"date":...} 형태로 바로 인코딩한다.
+"""
+import json
+from dataclasses import dataclass
+from json.encoder import encode_basestring, encode_basestring_ascii
+from operator import attrgetter
+
+from flask.json.provider import DefaultJSONProvider
+
+
+class Row:
+    __slots__ = ()
+    COLUMNS = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.COLUMNS = tuple(cls.__slots__)
+        cls._values = attrgetter(*cls.COLUMNS)
+        # 키는 고정이므로 값 자리만 비워 둔 템플릿 ('{"id":%s,"date":%s,...}')
+        cls._template = '{' + ','.join(f'"{column}":%s' for column in cls.COLUMNS) + '}'
+
+    @classmethod
+    def from_row(cls, cursor, row):
+        return cls(*row)
+
+    @classmethod
+    def select(cls, alias=None):
+        """SELECT 컬럼 목록 (alias를 주면 'v.id, v.date, ...')"""
+        prefix = f'{alias}.' if alias else ''
+        return ', '.join(prefix + column for column in cls.COLUMNS)
+
+    def values(self):
+        """컬럼 순서의 값 튜플 (CSV 등 위치 기반 출력용)"""
+        return self._values(self)
+
+    def to_dict(self):
+        return dict(zip(self.COLUMNS, self._values(self)))
+
+
+@dataclass
+class Visitor(Row):
+    __slots__ = ('id', 'date', 'company', 'name', 'position', 'contact', 'visit_location',
+                 'visit_purpose', 'check_in_time', 'check_out_time', 'manager', 'status',
+                 'duration_seconds')
+    id: int
+    date: str
+    company: str
+    name: str
+    position: str
+    contact: str
+    visit_location: str
+    visit_purpose: str
+    check_in_time: str
+    check_out_time: str
+    manager: str
+    status: str
+    duration_seconds: int
+
+
+@dataclass
+class MissedCheckout(Row):
+    __slots__ = ('id', 'company', 'name', 'position', 'visit_location', 'check_in_time',
+                 'original_date', 'checkout_date', 'reason')
+    id: int
+    company: str
+    name: str
+    position: str
+    visit_location: str
+    check_in_time: str
+    original_date: str
+    checkout_date: str
+    reason: str
+
+
+@dataclass
+class Manager(Row):
+    __slots__ = ('name', 'position', 'department')
+    name: str
+    position: str
+    department: str
+
+
+@dataclass
+class VisitorHistory(Row):
+    __slots__ = ('company', 'name', 'position', 'contact')
+    company: str
+    name: str
+    position: str
+    contact: str
+
+
+def _encode_value(value, encode_str):
+    cls = value.__class__
+    if cls is str:
+        return encode_str(value)
+    if value is None:
+        return 'null'
+    if cls is int:
+        return int.__repr__(value)
+    if cls is bool:
+        return 'true' if value else 'false'
+    if cls is float:
+        return json.dumps(value)  # NaN/Infinity 처리는 표준 인코더에 맡긴다
+    return json.dumps(value, ensure_ascii=encode_str is encode_basestring_ascii)
+
+
+def encode_row(row, ensure_ascii=True):
+    encode_str = encode_basestring_ascii if ensure_ascii else encode_basestring
+    # 대부분인 문자열/NULL/정수는 함수 호출 없이 바로 인코딩한다
+    return row._template % tuple([encode_str(value) if value.__class__ is str
+                                  else 'null' if value is None
+                                  else int.__repr__(value) if value.__class__ is int
+                                  else _encode_value(value, encode_str)
+                                  for value in row._values(row)])
+
+
+def _is_row_list(value):
+    return isinstance(value, (list, tuple)) and bool(value) and isinstance(value[0], Row)
+
+
+def dumps(obj, ensure_ascii=True, fallback=None, sort_keys=False):
+    """행 객체(또는 행 목록)가 들어 있는 값을 JSON 문자열로
+
+    행 객체가 없는 값은 fallback(기본 json.dumps)으로 한 번에 인코딩한다.
+    sort_keys는 dict 키에만 적용된다 (행 객체는 컬럼 순서).
+    """
+    if fallback is None:
+        def fallback(value):
+            return json.dumps(value, ensure_ascii=ensure_ascii, separators=(',', ':'),
+                              sort_keys=sort_keys)
+    if isinstance(obj, Row):
+        return encode_row(obj, ensure_ascii)
+    if _is_row_list(obj):
+        return '[' + ','.join([dumps(item, ensure_ascii, fallback, sort_keys)
+                               for item in obj]) + ']'
+    if isinstance(obj, dict) and any(isinstance(v, Row) or _is_row_list(v) or isinstance(v, dict)
+                                     for v in obj.values()):
+        key = encode_basestring_ascii if ensure_ascii else encode_basestring
+        items = sorted(obj.items(), key=lambda item: str(item[0])) if sort_keys else obj.items()
+        return '{' + ','.join([key(str(k)) + ':' + dumps(v, ensure_ascii, fallback, sort_keys)
+                               for k, v in items]) + '}'
+    return fallback(obj)
+
+
+class RowJSONProvider(DefaultJSONProvider):
+    """jsonify가 행 객체를 키가 있는 객체로 내보내도록 한 provider"""
+
+    def dumps(self, obj, **kwargs):
+        kwargs.setdefault('default', self.default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return dumps(obj, kwargs['ensure_ascii'], lambda value: json.dumps(value, **kwargs),
+                     kwargs['sort_keys'])
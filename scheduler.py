@@ -0,0 +1,45 @@
+"""매일 정해진 시각에 작업을 실행하는 간단한 백그라운드 스케줄러"""
+import logging
+import threading
+from datetime import datetime, time, timedelta
+
+logger = logging.getLogger(__name__)
+
+
+class DailyJob(threading.Thread):
+    """매일 at 시각에 job을 실행하는 데몬 스레드
+
+    시작할 때 한 번 바로 실행해서, 서버가 꺼져 있던 동안 밀린 작업도 처리한다.
+    """
+
+    def __init__(self, name, job, at=time(0, 0, 5), run_on_start=True):
+        super().__init__(name=name, daemon=True)
+        self.job = job
+        self.at = at
+        self.run_on_start = run_on_start
+        self.last_run = None
+        self._stop_event = threading.Event()
+
+    def seconds_until_next_run(self, now=None):
+        now = now or datetime.now()
+        next_run = datetime.combine(now.date(), self.at)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        return (next_run - now).total_seconds()
+
+    def run_once(self):
+        try:
+            result = self.job()
+            self.last_run = datetime.now()
+            return result
+        except Exception as e:
+            logger.exception("Scheduled job %s failed: %s", self.name, e)
+
+    def run(self):
+        if self.run_on_start:
+            self.run_once()
+        while not self._stop_event.wait(self.seconds_until_next_run()):
+            self.run_once()
+
+    def stop(self):
+        self._stop_event.set()
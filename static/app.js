@@ -203,10 +203,15 @@ async function loadVisitorsByDate(date) {
     }
 }
 
+// 오늘 방문자 목록 (SSE 이벤트로 변경분만 반영)
+window.currentVisitors = [];
+window.lastEventId = null;
+
 async function loadCurrentVisitors() {
     try {
         const response = await fetch('/visit/api/current-visitors');
         const visitors = await response.json();
+        window.currentVisitors = visitors;
         
         // 현재 날짜로 헤더 업데이트
         const today = new Date();
@@ -220,7 +225,7 @@ async function loadCurrentVisitors() {
         updateVisitorsTable(visitors, today);
 
  	// 현재 입실 인원 현황 업데이트
-	const currentVisitors = visitors.filter(v => !v[9]); // 퇴실하지 않은 방문자만
+	const currentVisitors = visitors.filter(v => !v.check_out_time); // 퇴실하지 않은 방문자만
         updateCurrentVisitorStatus(currentVisitors);
                 // 통계 업데이트 (새로 추가)
         updateCompanyAnalytics();
@@ -241,16 +246,16 @@ function updateVisitorsTable(visitors, selectedDate = new Date()) {
             const visitor = visitors[i];
             html += `
                 <tr>
-                    <td>${visitor[2]}</td>
-                    <td>${visitor[3]}</td>
-                    <td>${visitor[6]}</td>
-                    <td>${visitor[10]}</td>
-                    <td>${visitor[8]}</td>
-                    <td>${visitor[9] || '-'}</td>
+                    <td>${visitor.company}</td>
+                    <td>${visitor.name}</td>
+                    <td>${visitor.visit_location}</td>
+                    <td>${visitor.manager}</td>
+                    <td>${visitor.check_in_time}</td>
+                    <td>${visitor.check_out_time || '-'}</td>
                     <td>
-                        ${!visitor[9] && isSameDay(new Date(visitor[1]), new Date()) ? 
-                            `<button class="checkout-btn" onclick="checkoutVisitor(${visitor[0]})">퇴실</button>` : 
-                            (visitor[9] ? `<button class="completed-btn" disabled>퇴실완료</button>` : '-')}
+                        ${!visitor.check_out_time && isSameDay(new Date(visitor.date), new Date()) ? 
+                            `<button class="checkout-btn" onclick="checkoutVisitor(${visitor.id})">퇴실</button>` : 
+                            (visitor.check_out_time ? `<button class="completed-btn" disabled>퇴실완료</button>` : '-')}
                     </td>
                 </tr>
             `;
@@ -273,7 +278,7 @@ function updateVisitorsTable(visitors, selectedDate = new Date()) {
     
     // 현재 상태 업데이트 (현재 입실한 방문자만 표시)
     if (isSameDay(selectedDate, new Date())) {
-        const currentVisitors = visitors.filter(v => !v[9]);  // 퇴실시간이 없는 방문자만
+        const currentVisitors = visitors.filter(v => !v.check_out_time);  // 퇴실시간이 없는 방문자만
         updateCurrentVisitorStatus(currentVisitors);
         updateCompanyAnalytics();
         updateVisitPurposeRanking();
@@ -336,18 +341,18 @@ function updateCurrentVisitorStatus(currentVisitors) {
     document.getElementById('currentVisitorCount').textContent = currentVisitors.length;
 
     statusContainer.innerHTML = currentVisitors.map(visitor => {
-        const checkInTime = new Date(`${new Date().toDateString()} ${visitor[8]}`);
+        const checkInTime = new Date(`${new Date().toDateString()} ${visitor.check_in_time}`);
         const duration = Math.floor((new Date() - checkInTime) / (1000 * 60)); // 분 단위
 
         return `
             <div class="visitor-card">
                 <div class="visitor-info">
-                    <strong>${visitor[2]}</strong> - 
-                    ${visitor[3]}
-                    <span class="position">(${visitor[4] || '-'})</span>
+                    <strong>${visitor.company}</strong> - 
+                    ${visitor.name}
+                    <span class="position">(${visitor.position || '-'})</span>
                 </div>
                 <div class="visit-details">
-                    <span class="location">${visitor[6]}</span>
+                    <span class="location">${visitor.visit_location}</span>
                     <span class="duration">체류시간: ${formatDuration(duration)}</span>
                 </div>
             </div>
@@ -480,11 +485,23 @@ function isSameDay(date1, date2) {
            date1.getDate() === date2.getDate();
 }
 
+// 옵션 목록과 부서별 담당자를 한 번에 받아온다 (ETag로 바뀌지 않았으면 304)
+let bootstrapPromise = null;
+function loadBootstrap() {
+    if (!bootstrapPromise) {
+        bootstrapPromise = fetch('/visit/api/bootstrap').then(r => r.json());
+        bootstrapPromise.catch(() => { bootstrapPromise = null; });
+    }
+    return bootstrapPromise;
+}
+
 // 선택 옵션 초기화 함수
 async function initializeSelectOptions() {
     try {
+        const options = await loadBootstrap();
+
         // 업체명 옵션 로드
-        const companies = await fetch('/visit/api/options/companies').then(r => r.json());
+        const companies = options.companies;
         const companySelect = document.getElementById('company');
         companies.forEach(company => {
             const option = new Option(company, company);
@@ -492,7 +509,7 @@ async function initializeSelectOptions() {
         });
 
         // 직급 옵션 로드
-        const positions = await fetch('/visit/api/options/positions').then(r => r.json());
+        const positions = options.positions;
         const positionSelect = document.getElementById('position');
         positions.forEach(position => {
             const option = new Option(position, position);
@@ -500,7 +517,7 @@ async function initializeSelectOptions() {
         });
 
         // 방문장소 옵션 로드
-        const locations = await fetch('/visit/api/options/locations').then(r => r.json());
+        const locations = options.locations;
         const locationSelect = document.getElementById('visit_location');
         locations.forEach(location => {
             const option = new Option(location, location);
@@ -508,7 +525,7 @@ async function initializeSelectOptions() {
         });
 
         // 방문목적 옵션 로드
-        const purposes = await fetch('/visit/api/options/purposes').then(r => r.json());
+        const purposes = options.purposes;
         const purposeSelect = document.getElementById('visit_purpose');
         purposes.forEach(purpose => {
             const option = new Option(purpose, purpose);
@@ -579,8 +596,7 @@ function setupManagerSelect() {
 
     async function loadDepartments() {
         try {
-            const response = await fetch('/visit/api/options/departments');
-            const departments = await response.json();
+            const { departments } = await loadBootstrap();
             console.log("Received departments:", departments);  // 받은 부서 데이터 확인
             
             departmentSelect.innerHTML = '<option value="">부서 선택</option>';
@@ -604,11 +620,10 @@ function setupManagerSelect() {
         if (!selectedId) return;
 
         try {
-            const response = await fetch(`/visit/api/managers/department/${selectedId}`);
-            const managers = await response.json();
+            const managers = (await loadBootstrap()).managers[selectedId] || [];
             console.log("Received managers:", managers);  // 받은 담당자 데이터 확인
             
-            managers.forEach(([name, position]) => {
+            managers.forEach(({ name, position }) => {
                 const option = new Option(`${name} ${position}`, `${name} ${position}`);
                 managerSelect.add(option);
             });
@@ -638,9 +653,9 @@ function setupVisitorAutoComplete() {
 
                 if (history) {
                     console.log("Found visitor history:", history);
-                    if (history[0]) positionInput.value = history[0];
-                    if (history[1]) {
-                        contactInput.value = history[1];
+                    if (history.position) positionInput.value = history.position;
+                    if (history.contact) {
+                        contactInput.value = history.contact;
                         contactInput.classList.add('auto-filled');
                         setTimeout(() => contactInput.classList.remove('auto-filled'), 1000);
                     }
@@ -838,13 +853,13 @@ async function loadMissedCheckouts() {
         
         tbody.innerHTML = missedCheckouts.map(checkout => `
             <tr>
-                <td>${checkout[1]}</td>
-                <td>${checkout[2]}</td>
-                <td>${checkout[4]}</td>
-                <td>${checkout[6]}</td>
-                <td>${checkout[5]}</td>
-                <td>${checkout[7]}</td>
-                <td>${checkout[8]}</td>
+                <td>${checkout.company}</td>
+                <td>${checkout.name}</td>
+                <td>${checkout.visit_location}</td>
+                <td>${checkout.original_date}</td>
+                <td>${checkout.check_in_time}</td>
+                <td>${checkout.checkout_date}</td>
+                <td>${checkout.reason}</td>
             </tr>
         `).join('');
     } catch (error) {
@@ -948,16 +963,20 @@ function setupSSE() {
         window.eventSource.close();
     }
     console.log('Setting up new SSE connection'); 
-    window.eventSource = new EventSource('/visit/api/sse');
+    // 재연결 시 마지막으로 받은 이벤트 이후의 변경분만 받는다
+    const query = window.lastEventId ? `?last_event_id=${window.lastEventId}` : '';
+    window.eventSource = new EventSource(`/visit/api/sse${query}`);
     
     window.eventSource.onopen = function(event) {
 	    console.log('SSE connection opend');
     };
 
-    window.eventSource.onmessage = function(event) {
-        const visitors = JSON.parse(event.data);
-        debouncedUpdate(visitors);
-    };
+    ['checkin', 'checkout', 'missed', 'company_added', 'reset'].forEach(type => {
+        window.eventSource.addEventListener(type, function(event) {
+            window.lastEventId = event.lastEventId;
+            applyVisitorEvent(type, JSON.parse(event.data));
+        });
+    });
 
     window.eventSource.onerror = function(error) {
         console.error('SSE Error:', error);
@@ -968,9 +987,46 @@ function setupSSE() {
     };
 }
 
+// SSE 이벤트를 오늘 방문자 목록에 반영
+function applyVisitorEvent(type, data) {
+    switch (type) {
+        case 'checkin':
+            if (!window.currentVisitors.some(v => v.id === data.id)) {
+                window.currentVisitors.unshift(data);
+            }
+            break;
+        case 'checkout':
+            window.currentVisitors = window.currentVisitors.map(v => v.id === data.id ? data : v);
+            break;
+        case 'missed':
+            window.currentVisitors = window.currentVisitors.map(v => {
+                if (!data.ids.includes(v.id)) return v;
+                return { ...v, check_out_time: data.check_out_time || v.check_out_time, status: 'MISSED' };
+            });
+            loadMissedCheckouts();
+            break;
+        case 'company_added':
+            addCompanyOption(data.name);
+            return;
+        case 'reset':
+            // 놓친 이벤트가 있으므로 전체 목록을 다시 읽는다
+            loadCurrentVisitors();
+            return;
+    }
+    debouncedUpdate(window.currentVisitors);
+}
+
+// 다른 화면에서 추가된 업체를 선택 목록에 추가 ('직접 입력' 옵션 앞)
+function addCompanyOption(name) {
+    const companySelect = document.getElementById('company');
+    if (Array.from(companySelect.options).some(option => option.value === name)) return;
+    companySelect.add(new Option(name, name), companySelect.options[companySelect.options.length - 1]);
+}
+
 // SSE 메시지 처리에 디바운싱 적용
 const debouncedUpdate = debounce((visitors) => {
     updateVisitorsTable(visitors, new Date());
+    updateCurrentVisitorStatus(visitors.filter(v => !v.check_out_time));
 }, 300);  // 300ms 디바운스
 
 // 핸드폰 번호 유효성 검사 함수
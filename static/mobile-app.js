@@ -41,11 +41,23 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 });
 
+// 옵션 목록과 부서별 담당자를 한 번에 받아온다 (ETag로 바뀌지 않았으면 304)
+let bootstrapPromise = null;
+function loadBootstrap() {
+    if (!bootstrapPromise) {
+        bootstrapPromise = fetch('/api/bootstrap').then(r => r.json());
+        bootstrapPromise.catch(() => { bootstrapPromise = null; });
+    }
+    return bootstrapPromise;
+}
+
 // 선택 옵션 초기화
 async function initializeSelectOptions() {
     try {
+        const options = await loadBootstrap();
+
         // 업체명 옵션 로드
-        const companies = await fetch('/api/options/companies').then(r => r.json());
+        const companies = options.companies;
         const companySelect = document.getElementById('company');
         companies.forEach(company => {
             const option = new Option(company, company);
@@ -53,7 +65,7 @@ async function initializeSelectOptions() {
         });
 
         // 직급 옵션 로드
-        const positions = await fetch('/api/options/positions').then(r => r.json());
+        const positions = options.positions;
         const positionSelect = document.getElementById('position');
         positions.forEach(position => {
             const option = new Option(position, position);
@@ -61,7 +73,7 @@ async function initializeSelectOptions() {
         });
 
         // 방문장소 옵션 로드
-        const locations = await fetch('/api/options/locations').then(r => r.json());
+        const locations = options.locations;
         const locationSelect = document.getElementById('visit_location');
         locations.forEach(location => {
             const option = new Option(location, location);
@@ -69,7 +81,7 @@ async function initializeSelectOptions() {
         });
 
         // 방문목적 옵션 로드
-        const purposes = await fetch('/api/options/purposes').then(r => r.json());
+        const purposes = options.purposes;
         const purposeSelect = document.getElementById('visit_purpose');
         purposes.forEach(purpose => {
             const option = new Option(purpose, purpose);
@@ -87,8 +99,7 @@ function setupManagerSelect() {
 
     async function loadDepartments() {
         try {
-            const response = await fetch('/api/options/departments');
-            const departments = await response.json();
+            const { departments } = await loadBootstrap();
             
             departmentSelect.innerHTML = '<option value="">부서 선택</option>';
             
@@ -108,10 +119,9 @@ function setupManagerSelect() {
         if (!selectedId) return;
 
         try {
-            const response = await fetch(`/api/managers/department/${selectedId}`);
-            const managers = await response.json();
+            const managers = (await loadBootstrap()).managers[selectedId] || [];
             
-            managers.forEach(([name, position]) => {
+            managers.forEach(({ name, position }) => {
                 const option = new Option(`${name} ${position}`, `${name} ${position}`);
                 managerSelect.add(option);
             });
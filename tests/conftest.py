@@ -0,0 +1,63 @@
+import importlib
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import db as db_module  # noqa: E402
+
+
+@pytest.fixture
+def visitor_db(tmp_path):
+    """임시 파일의 VisitorDB (백그라운드 스레드 없이)"""
+    db = db_module.VisitorDB(str(tmp_path / 'visitor_log.db'), checkpoint_interval=0,
+                             selection_flush_interval=0)
+    yield db
+    db.close()
+
+
+class Clock:
+    """db 모듈이 읽는 현재 시각 (clock.set('2024-03-01 09:00:00'))"""
+
+    def __init__(self, now):
+        self.now = now
+
+    def set(self, text):
+        self.now = datetime.strptime(text, '%Y-%m-%d %H:%M:%S')
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(datetime.now())
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return clock.now
+
+    monkeypatch.setattr(db_module, 'datetime', FrozenDatetime)
+    return clock
+
+
+@pytest.fixture(scope='session')
+def main(tmp_path_factory):
+    """임시 DB를 쓰도록 환경 변수를 맞춰 가져온 main 모듈 (프로세스당 한 번만 import된다)"""
+    path = tmp_path_factory.mktemp('app') / 'visitor_log.db'
+    env = {'VISITAPP_DB_PATH': str(path), 'VISITAPP_SCHEDULER': '0',
+           'VISITAPP_EVENT_BACKEND': 'memory', 'VISITAPP_SELECTION_FLUSH_INTERVAL': '0',
+           'VISITAPP_WAL_CHECKPOINT_INTERVAL': '0'}
+    saved = {key: os.environ.get(key) for key in env}
+    os.environ.update(env)
+    try:
+        yield importlib.import_module('main')
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
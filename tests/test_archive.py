@@ -0,0 +1,141 @@
+"""연도별 보관 파일로 옮긴 뒤의 조회 경로, 보관 파일 장애, 중단된 보관 재실행"""
+import os
+import sqlite3
+
+import pytest
+
+import archive
+from db import VisitorDB
+
+CUTOFF = '2024-03-01'  # 2023년 전체와 2024년 1~2월을 보관
+
+# (방문일, 업체, 이름, 퇴실 시각 또는 None이면 퇴실 누락)
+VISITS = [
+    ('2023-06-12', 'PIXEL', '홍길동', '11:00:00'),
+    ('2023-06-12', 'KCC', '김민수', None),
+    ('2023-12-31', 'PIXEL', '이서연', '17:30:00'),
+    ('2024-01-01', 'KCC', '박지훈', '10:00:00'),
+    ('2024-02-29', 'GENESEM', '최수빈', None),
+    ('2024-03-01', 'PIXEL', '정하늘', '12:00:00'),
+    ('2024-04-15', 'KCC', '한유진', '15:00:00'),
+]
+
+
+@pytest.fixture
+def seeded_db(visitor_db, clock):
+    for visit_date, company, name, check_out in VISITS:
+        clock.set(f'{visit_date} 09:00:00')
+        visitor = visitor_db.check_in(company, name, '과장', '010', '1층 로비', '미팅/회의', '김태건')
+        if check_out:
+            clock.set(f'{visit_date} {check_out}')
+            visitor_db.check_out_visitor(visitor.id)
+        else:
+            # 그날 밤 스윕으로 퇴실 누락 처리 (today를 먼 날짜로 주어 방금 입실한 방문도 대상)
+            clock.set(f'{visit_date} 23:59:59')
+            visitor_db.sweep_missed_checkouts(today='9999-12-31')
+    clock.set('2024-05-01 09:00:00')
+    return visitor_db
+
+
+def snapshot(db):
+    """보관 전후에 같아야 하는 조회 결과"""
+    return {
+        'by_date': {day: db.get_visitors_by_date(day) for day in sorted({v[0] for v in VISITS})},
+        'range': db.get_visitors_in_range('2023-01-01', '2025-01-01'),
+        'page': db.get_visitors_in_range('2023-01-01', '2025-01-01', limit=3),
+        'month': db.get_visitors_in_range('2024-02-01', '2024-03-01'),
+        'export': list(db.iter_visitors_in_range('2023-06-01', '2024-04-01')),
+        'missed': db.get_missed_checkouts(),
+        'missed_range': list(db.iter_missed_checkouts_in_range('2023-01-01', '2024-12-31')),
+        'analytics_raw': db.get_company_analytics_raw(),
+        'analytics': db.get_company_analytics(),
+    }
+
+
+def hot_dates(db):
+    with db.connection() as conn:
+        return [day for (day,) in conn.execute('SELECT date FROM main.visitors ORDER BY date')]
+
+
+def archive_file(db, year):
+    return db.archive.path(db.archive.filename(year))
+
+
+def test_reads_are_unchanged_after_archiving(seeded_db):
+    db = seeded_db
+    before = snapshot(db)
+
+    results = archive.archive_months(db, CUTOFF)
+    assert [(year, moved) for year, moved, _ in results] == [(2023, 3), (2024, 2)]
+    assert hot_dates(db) == ['2024-03-01', '2024-04-15']
+
+    assert snapshot(db) == before
+    assert archive.verify(db) == []
+    assert db.verify_rollups() == []
+
+    # 다시 실행해도 옮길 것이 없다
+    assert archive.archive_months(db, CUTOFF) == []
+    assert snapshot(db) == before
+
+
+@pytest.mark.parametrize('damage', ['missing', 'corrupt', 'empty'])
+def test_unreadable_archive_file_only_hides_that_year(seeded_db, damage, request):
+    archive.archive_months(seeded_db, CUTOFF)
+    path = archive_file(seeded_db, 2023)
+    os.remove(path)
+    if damage == 'corrupt':
+        with open(path, 'wb') as f:
+            f.write(b'not a database' * 100)
+    elif damage == 'empty':
+        sqlite3.connect(path).close()
+    # 재시작한 워커처럼 새 커넥션으로 보관 파일을 ATTACH
+    db = VisitorDB(seeded_db.db_path, checkpoint_interval=0, selection_flush_interval=0)
+    request.addfinalizer(db.close)
+
+    with db.connection() as conn:
+        assert sorted(conn.archive_partitions) == [2024]
+
+    # 날짜 조건이 없는 조회도 hot DB와 남은 연도로 동작한다
+    assert [m.original_date for m in db.get_missed_checkouts()] == ['2024-02-29']
+    assert {row[0] for row in db.get_company_analytics_raw()} == {'PIXEL', 'KCC', 'GENESEM'}
+    assert [v.date for v in db.get_visitors_in_range('2023-01-01', '2025-01-01')] == \
+        ['2024-04-15', '2024-03-01', '2024-02-29', '2024-01-01']
+    assert db.get_visitors_by_date('2023-06-12') == []
+    assert not db.is_archive_attached('2023-06-12')
+    assert db.is_archive_attached('2024-01-01')
+
+    problems = archive.verify(db)
+    assert [year for year, _ in problems] == [2023]
+
+    # 집계를 다시 만들면 2023년 집계가 사라지므로 거부한다
+    analytics = db.get_company_analytics()
+    with pytest.raises(sqlite3.OperationalError):
+        db.rebuild_rollups()
+    assert db.get_company_analytics() == analytics
+
+
+def test_rerun_after_crash_between_copy_and_delete(seeded_db, monkeypatch):
+    db = seeded_db
+    before = snapshot(db)
+
+    # 보관 파일 복사를 커밋한 직후 (hot DB 삭제 전) 중단
+    checksum = archive._checksum
+
+    def crash(conn, schema):
+        raise sqlite3.OperationalError('disk I/O error')
+
+    monkeypatch.setattr(archive, '_checksum', crash)
+    with pytest.raises(sqlite3.OperationalError):
+        archive.archive_months(db, CUTOFF)
+
+    # 복사본은 남았지만 카탈로그에 없으므로 조회는 hot DB만 읽고 중복되지 않는다
+    assert os.path.exists(archive_file(db, 2023))
+    assert len(hot_dates(db)) == len(VISITS)
+    assert snapshot(db) == before
+
+    monkeypatch.setattr(archive, '_checksum', checksum)
+    results = archive.archive_months(db, CUTOFF)
+    assert [(year, moved) for year, moved, _ in results] == [(2023, 3), (2024, 2)]
+    assert hot_dates(db) == ['2024-03-01', '2024-04-15']
+    assert snapshot(db) == before
+    assert archive.verify(db) == []
@@ -0,0 +1,144 @@
+"""ASGI 진입점: Flask 요청은 스레드 풀에서 동시에, SSE 따라잡기는 이벤트 루프 밖에서"""
+import asyncio
+import json
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def asgi(main):
+    import asgi
+    return asgi
+
+
+def http_scope(method, path, query=b'', headers=()):
+    return {'type': 'http', 'http_version': '1.1', 'method': method, 'scheme': 'http',
+            'path': path, 'root_path': '', 'query_string': query, 'headers': list(headers),
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 50000)}
+
+
+async def request(app, method, path, body=b'', headers=()):
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    await app(http_scope(method, path, headers=headers), receive, send)
+    start = sent[0]
+    assert start['type'] == 'http.response.start'
+    assert not sent[-1].get('more_body')
+    return start['status'], dict(start['headers']), b''.join(m.get('body', b'') for m in sent[1:])
+
+
+def test_slow_request_does_not_block_other_requests(asgi):
+    release = threading.Event()
+
+    def wsgi_app(environ, start_response):
+        if environ['PATH_INFO'] == '/slow':
+            release.wait(5)
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return [environ['PATH_INFO'].encode()]
+
+    adapter = asgi.ThreadPoolWSGI(wsgi_app, threads=2)
+
+    async def run():
+        slow = asyncio.ensure_future(request(adapter, 'GET', '/slow'))
+        await asyncio.sleep(0.05)
+        fast = await asyncio.wait_for(request(adapter, 'GET', '/fast'), 2)
+        assert not slow.done()
+        release.set()
+        return fast, await slow
+
+    try:
+        fast, slow = asyncio.run(run())
+    finally:
+        release.set()
+        adapter.shutdown()
+    assert fast == (200, {b'content-type': b'text/plain'}, b'/fast')
+    assert slow[2] == b'/slow'
+
+
+def test_response_is_closed_when_client_goes_away(asgi):
+    closed = threading.Event()
+
+    class Response:
+        def __iter__(self):
+            yield b'first'
+            yield b'second'
+
+        def close(self):
+            closed.set()
+
+    def wsgi_app(environ, start_response):
+        start_response('200 OK', [])
+        return Response()
+
+    async def send(message):
+        if message['type'] == 'http.response.body':
+            raise OSError('connection reset')
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    adapter = asgi.ThreadPoolWSGI(wsgi_app, threads=1)
+    try:
+        with pytest.raises(OSError):
+            asyncio.run(adapter(http_scope('GET', '/export'), receive, send))
+    finally:
+        adapter.shutdown()
+    assert closed.is_set()
+
+
+def test_flask_request_through_asgi(asgi, main):
+    body = json.dumps({'company': 'PIXEL', 'name': 'ASGI 방문자', 'position': '과장',
+                       'visit_location': '1층 로비', 'visit_purpose': '미팅/회의',
+                       'manager': '김태건'}).encode()
+    status, _, response = asyncio.run(request(
+        asgi.app, 'POST', '/api/visitors', body,
+        headers=[(b'content-type', b'application/json'),
+                 (b'content-length', str(len(body)).encode())]))
+    assert status == 201
+    visitor_id = json.loads(response)['id']
+
+    status, headers, response = asyncio.run(request(asgi.app, 'GET', '/api/current-visitors'))
+    assert status == 200
+    assert headers[b'content-type'].startswith(b'application/json')
+    assert visitor_id in [v['id'] for v in json.loads(response)]
+
+
+def test_sse_catch_up_runs_off_the_event_loop(asgi, main, monkeypatch):
+    threads = []
+    monkeypatch.setattr(main.hub.backend, 'sync',
+                        lambda: threads.append(threading.current_thread()))
+    last_event_id = str(main.hub.stats()['last_event_id'] + 100).encode()
+
+    async def run():
+        started = asyncio.Event()
+        messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+        sent = []
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await started.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+            started.set()
+
+        scope = http_scope('GET', '/api/sse', headers=[(b'last-event-id', last_event_id)])
+        await asyncio.wait_for(asgi.app(scope, receive, send), 5)
+        return sent
+
+    sent = asyncio.run(run())
+    assert sent[0]['status'] == 200
+    assert len(threads) == 1
+    assert threads[0] is not threading.main_thread()
@@ -0,0 +1,64 @@
+"""지난 날짜 조회의 Cache-Control: immutable (GET /api/visitors/<date>)"""
+import pytest
+
+from conditional import IMMUTABLE
+
+
+@pytest.fixture
+def client(main):
+    return main.app.test_client()
+
+
+def visit(main, clock, date, check_out=True):
+    clock.set(f'{date} 09:00:00')
+    visitor = main.db.check_in('PIXEL', '홍길동', '과장', '010', '1층 로비', '미팅/회의', '김태건')
+    if check_out:
+        clock.set(f'{date} 11:00:00')
+        main.db.check_out_visitor(visitor.id)
+    return visitor
+
+
+def test_past_date_with_no_visits_is_not_immutable(client):
+    response = client.get('/api/visitors/2021-02-03')
+    assert response.status_code == 200
+    assert response.get_json() == []
+    assert response.headers.get('Cache-Control') != IMMUTABLE
+
+
+def test_closed_past_date_is_immutable(main, client, clock):
+    visit(main, clock, '2022-05-10')
+    response = client.get('/api/visitors/2022-05-10')
+    assert len(response.get_json()) == 1
+    assert response.headers['Cache-Control'] == IMMUTABLE
+
+
+def test_past_date_with_open_visit_is_not_immutable(main, client, clock):
+    visit(main, clock, '2022-05-11', check_out=False)
+    response = client.get('/api/visitors/2022-05-11')
+    assert len(response.get_json()) == 1
+    assert response.headers.get('Cache-Control') != IMMUTABLE
+
+
+def test_date_in_unattached_archive_year_is_not_immutable(main, client, clock):
+    visit(main, clock, '2023-08-01')
+    # 2023년 보관 파일이 카탈로그에 있지만 열 수 없는 경우
+    with main.db.connection() as conn:
+        conn.execute('''
+            INSERT INTO archive_partitions
+                (year, filename, archived_until, visitor_count, missed_count, checksum, archived_at)
+            VALUES (2023, 'missing_2023.db', '2023-03-01', 0, 0, '', '2023-03-01')
+        ''')
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        conn.execute(f'PRAGMA user_version = {version + 1}')
+        conn.commit()
+    try:
+        response = client.get('/api/visitors/2023-08-01')
+        assert len(response.get_json()) == 1
+        assert response.headers.get('Cache-Control') != IMMUTABLE
+        # 보관되지 않은 연도는 그대로 immutable
+        assert client.get('/api/visitors/2022-05-10').headers['Cache-Control'] == IMMUTABLE
+    finally:
+        with main.db.connection() as conn:
+            conn.execute('DELETE FROM archive_partitions WHERE year = 2023')
+            conn.execute(f'PRAGMA user_version = {version + 2}')
+            conn.commit()
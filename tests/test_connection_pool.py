@@ -0,0 +1,135 @@
+"""ConnectionPool: 같은 스레드 중첩 사용, 풀이 가득 찼을 때 대기, 유휴 커넥션 점검"""
+import sqlite3
+import threading
+
+import pytest
+
+from db import ConnectionPool
+
+
+@pytest.fixture
+def make_pool(tmp_path):
+    pools = []
+
+    def make_pool(**kwargs):
+        pool = ConnectionPool(str(tmp_path / 'pool.db'), **kwargs)
+        pools.append(pool)
+        return pool
+
+    yield make_pool
+    for pool in pools:
+        pool.close()
+
+
+def _borrow(pool):
+    with pool.connection() as conn:
+        return conn
+
+
+def test_nested_connection_on_one_thread_reuses_connection(make_pool):
+    pool = make_pool(size=2)
+    with pool.connection() as outer:
+        with pool.connection() as inner:
+            assert inner is outer
+            with pool.connection() as innermost:
+                assert innermost is outer
+        # 안쪽 블록이 끝나도 바깥 블록의 커넥션은 반납되지 않는다
+        assert pool.stats()['idle'] == 0
+    stats = pool.stats()
+    assert stats['reentrant'] == 2
+    assert stats['open'] == 1
+    assert stats['idle'] == 1
+
+
+def test_threads_get_separate_connections(make_pool):
+    pool = make_pool(size=2)
+    seen = []
+    with pool.connection() as mine:
+        thread = threading.Thread(target=lambda: seen.append(_borrow(pool)))
+        thread.start()
+        thread.join()
+    assert seen and seen[0] is not mine
+
+
+def test_extra_thread_waits_until_a_connection_is_released(make_pool):
+    size = 3
+    pool = make_pool(size=size, timeout=10)
+    holding = threading.Barrier(size + 1)
+    release = [threading.Event() for _ in range(size)]
+
+    def hold(index):
+        with pool.connection():
+            holding.wait()
+            release[index].wait(10)
+
+    holders = [threading.Thread(target=hold, args=(i,)) for i in range(size)]
+    for thread in holders:
+        thread.start()
+    holding.wait()
+
+    acquired = threading.Event()
+
+    def extra():
+        with pool.connection() as conn:
+            conn.execute('SELECT 1')
+            acquired.set()
+
+    waiter = threading.Thread(target=extra)
+    waiter.start()
+    # 풀이 가득 차 있으므로 N+1번째 스레드는 기다린다
+    assert not acquired.wait(0.3)
+    assert pool.stats()['open'] == size
+
+    release[0].set()
+    assert acquired.wait(5)
+    for event in release:
+        event.set()
+    for thread in holders + [waiter]:
+        thread.join(5)
+
+    stats = pool.stats()
+    assert stats['open'] == size  # 새 커넥션을 만들지 않고 반납된 것을 재사용
+    assert stats['waits'] >= 1
+    assert stats['max_wait_time'] > 0
+
+
+def test_wait_times_out_when_pool_stays_full(make_pool):
+    pool = make_pool(size=1, timeout=0.2)
+    errors = []
+
+    def borrow():
+        try:
+            with pool.connection():
+                pass
+        except sqlite3.OperationalError as e:
+            errors.append(e)
+
+    with pool.connection():
+        thread = threading.Thread(target=borrow)
+        thread.start()
+        thread.join(5)
+    assert len(errors) == 1
+
+
+def test_broken_idle_connection_is_replaced(make_pool):
+    pool = make_pool(size=1, health_check_interval=0)
+    with pool.connection() as broken:
+        pass
+    broken.close()  # 유휴 상태에서 끊긴 커넥션
+
+    with pool.connection() as conn:
+        assert conn is not broken
+        assert conn.execute('SELECT 1').fetchone() == (1,)
+    stats = pool.stats()
+    assert stats['discarded'] == 1
+    assert stats['open'] == 1
+
+
+def test_release_rolls_back_uncommitted_work(make_pool):
+    pool = make_pool(size=1)
+    with pool.connection() as conn:
+        conn.execute('CREATE TABLE t (x INTEGER)')
+        conn.commit()
+        conn.execute('INSERT INTO t VALUES (1)')
+    with pool.connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM t').fetchone() == (0,)
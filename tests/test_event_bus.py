@@ -0,0 +1,63 @@
+"""워커 프로세스 간 SSE 이벤트 전달 (SQLite event_log 백엔드)"""
+import multiprocessing
+import queue
+import time
+
+from db import VisitorDB
+from events import EventHub, SQLiteBackend
+
+WORKERS = 3
+TIMEOUT = 20
+
+
+def worker(index, db_path, barrier, results):
+    """이벤트 하나를 발행하고, 모든 워커의 이벤트를 받으면 받은 목록을 보고"""
+    db = VisitorDB(db_path, checkpoint_interval=0)
+    hub = EventHub(SQLiteBackend(db, poll_interval=0.05))
+    subscription = hub.subscribe()
+    try:
+        barrier.wait(TIMEOUT)
+        hub.publish('company_added', {'name': f'워커{index}', 'worker': index})
+        received = []
+        deadline = time.monotonic() + TIMEOUT
+        while len(received) < WORKERS and time.monotonic() < deadline:
+            try:
+                event = subscription.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            received.append((event.id, event.data['worker'], event.origin == hub.origin))
+        results.put((index, received))
+    finally:
+        hub.close()
+        db.close()
+
+
+def test_events_reach_every_worker_process(tmp_path):
+    db_path = str(tmp_path / 'visitor_log.db')
+    VisitorDB(db_path, checkpoint_interval=0).close()  # 스키마는 시작 전에 한 번 만든다
+
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(WORKERS)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(index, db_path, barrier, results))
+                 for index in range(WORKERS)]
+    for process in processes:
+        process.start()
+    try:
+        received = dict(results.get(timeout=TIMEOUT * 2) for _ in processes)
+    finally:
+        for process in processes:
+            process.join(TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+
+    assert sorted(received) == list(range(WORKERS))
+    for index, events in received.items():
+        # 자기 이벤트와 다른 모든 워커의 이벤트를 한 번씩 받는다
+        assert sorted(worker for _, worker, _ in events) == list(range(WORKERS))
+        assert [local for _, worker, local in events if worker == index] == [True]
+        assert all(not local for _, worker, local in events if worker != index)
+    # 이벤트 ID는 event_log.id라서 모든 워커에서 같은 순서, 같은 값이다
+    orders = [[(event_id, worker) for event_id, worker, _ in events]
+              for events in received.values()]
+    assert all(order == orders[0] for order in orders)